@@ -8,9 +8,9 @@ import hashlib
 
 # Import custom modules
 from modules.data_generator import generate_inventory_data, generate_all_parts_data
-from modules.forecasting import generate_forecast
-from modules.insight_engine import generate_insights
-from modules.analytics import calculate_part_statistics, generate_leaderboard
+from modules.forecasting import generate_cached_forecast, compute_data_version
+from modules.insight_engine import generate_insights, evaluate_what_if_scenarios, lookup_what_if_insights
+from modules.analytics import calculate_cached_part_statistics, build_leaderboard_metrics, rank_leaderboard
 
 # Configure Streamlit page
 st.set_page_config(
@@ -1074,6 +1074,7 @@ def main():
     with st.spinner("Loading inventory data..."):
         inventory_data = load_or_generate_data()
         st.session_state.inventory_data = inventory_data
+        data_version = compute_data_version(inventory_data)
     
     # Sidebar controls
     st.sidebar.header("📊 Control Panel")
@@ -1138,20 +1139,37 @@ def main():
     tab1, tab2, tab3 = st.tabs(["📈 Dashboard", "🏆 Leaderboard", "📊 Analytics"])
     
     with tab1:
-        # Generate forecast
-        forecast_df = generate_forecast(
+        # Generate forecast (served from the shared cache when inputs are unchanged)
+        forecast_df = generate_cached_forecast(
             inventory_data, 
             selected_part, 
             window_size, 
-            forecast_horizon
+            forecast_horizon,
+            data_version=data_version
         )
         
-        # Generate insights
-        insights = generate_insights(
-            forecast_df, 
-            current_stock, 
+        # What-if grid over the sidebar's stock and lead-time ranges, built once
+        # per forecast so that slider moves are answered from memory
+        what_if_key = (data_version, selected_part, window_size, forecast_horizon)
+        if st.session_state.get('what_if_key') != what_if_key:
+            st.session_state.what_if_scenarios = evaluate_what_if_scenarios(
+                forecast_df, range(0, 50001, 100), range(1, 31)
+            )
+            st.session_state.what_if_key = what_if_key
+        what_if_scenarios = st.session_state.what_if_scenarios
+        
+        # Generate insights (typed stock levels off the grid are computed directly)
+        insights = lookup_what_if_insights(
+            what_if_scenarios,
+            current_stock,
             reorder_threshold_days
         )
+        if insights is None:
+            insights = generate_insights(
+                forecast_df, 
+                current_stock, 
+                reorder_threshold_days
+            )
         
         # Display key metrics
         col1, col2, col3, col4 = st.columns(4)
@@ -1212,6 +1230,39 @@ def main():
             </div>
             """, unsafe_allow_html=True)
         
+        # What-if heatmap of stock status across stock levels and lead times
+        if not what_if_scenarios.empty:
+            st.subheader("🎛️ What-If Scenarios")
+            status_grid = what_if_scenarios.pivot(
+                index='current_stock', columns='reorder_threshold_days', values='priority'
+            )
+            fig_what_if = go.Figure(go.Heatmap(
+                z=status_grid.values,
+                x=status_grid.columns,
+                y=status_grid.index,
+                zmin=1,
+                zmax=3,
+                colorscale=[[0, '#0abde3'], [0.5, '#feca57'], [1, '#ee5a52']],
+                colorbar=dict(tickvals=[1, 2, 3], ticktext=['Healthy', 'Warning', 'Critical']),
+                hovertemplate='Lead time: %{x} days<br>Stock: %{y:,}<extra></extra>'
+            ))
+            fig_what_if.add_trace(go.Scatter(
+                x=[reorder_threshold_days],
+                y=[current_stock],
+                mode='markers',
+                name='Current Settings',
+                marker=dict(color='white', size=12, line=dict(color='black', width=2))
+            ))
+            fig_what_if.update_layout(
+                title=f"Stock Status by Stock Level and Lead Time for {selected_part}",
+                xaxis_title="Reorder Lead Time (days)",
+                yaxis_title="Stock Level (Units)",
+                showlegend=False,
+                height=450,
+                template="plotly_white"
+            )
+            st.plotly_chart(fig_what_if, use_container_width=True)
+        
         # Visualization
         st.subheader("📈 Demand Forecast Visualization")
         
@@ -1304,10 +1355,10 @@ def main():
     with tab2:
         st.subheader("🏆 EV Parts Performance Leaderboard")
         
-        # Generate leaderboard
-        leaderboard_df = generate_leaderboard(inventory_data)
+        # Leaderboard metrics are computed once per data version
+        leaderboard_metrics = build_leaderboard_metrics(inventory_data, data_version=data_version)
         
-        if not leaderboard_df.empty:
+        if not leaderboard_metrics.empty:
             # Sort options
             sort_options = {
                 'avg_demand': 'Average Demand',
@@ -1323,8 +1374,8 @@ def main():
                 index=0
             )
             
-            # Re-generate leaderboard with new sorting
-            leaderboard_df = generate_leaderboard(inventory_data, sort_by=sort_by)
+            # Re-rank the cached metrics with the chosen sorting
+            leaderboard_df = rank_leaderboard(leaderboard_metrics, sort_by=sort_by)
             
             # Display leaderboard
             st.dataframe(
@@ -1377,8 +1428,10 @@ def main():
             key="analysis_part"
         )
         
-        # Calculate detailed statistics
-        stats = calculate_part_statistics(inventory_data, analysis_part)
+        # Calculate detailed statistics (recomputed only when this part's data changes)
+        stats = calculate_cached_part_statistics(
+            inventory_data, analysis_part, data_version=data_version
+        )
         
         if 'error' not in stats:
             # Basic statistics
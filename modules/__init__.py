@@ -8,8 +8,10 @@ inventory optimization system.
 Modules:
 - data_generator: Synthetic data generation for EV parts
 - forecasting: Time-series forecasting algorithms
+- kernels: Shared vectorized kernels (demand matrices, rolling moments, demand path simulation)
 - insight_engine: AI-powered recommendation system
 - analytics: Statistical analysis and performance metrics
+- policy_optimizer: Reorder policy search ((s, S), EOQ, service-level targets)
 """
 
 __version__ = "1.0.0"
@@ -17,13 +19,14 @@ __author__ = "GenAI Smart Inventory Team"
 
 # Import main functions for easy access
 from .data_generator import generate_inventory_data
-from .forecasting import generate_forecast
+from .forecasting import generate_forecast, generate_batch_forecast
 from .insight_engine import generate_insights
 from .analytics import calculate_part_statistics, generate_leaderboard
 
 __all__ = [
     'generate_inventory_data',
     'generate_forecast', 
+    'generate_batch_forecast',
     'generate_insights',
     'calculate_part_statistics',
     'generate_leaderboard'
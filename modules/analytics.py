@@ -10,12 +10,17 @@ import pandas as pd
 import numpy as np
 from scipy import stats
 from datetime import datetime, timedelta
+from collections import OrderedDict
+import threading
 import warnings
 
+from .forecasting import LRUCache, compute_data_version
+from .kernels import build_calendar_matrix, build_demand_matrix, rolling_cv
+
 warnings.filterwarnings('ignore')
 
 
-def calculate_part_statistics(data, part_name):
+def calculate_part_statistics(data, part_name, accumulator=None, anomalies=None):
     """
     Calculate comprehensive statistics for a specific EV part.
     
@@ -25,6 +30,16 @@ def calculate_part_statistics(data, part_name):
         Historical demand data with columns: part_name, date, demand
     part_name : str
         Name of the EV part to analyze
+    accumulator : DemandStatisticsAccumulator, optional
+        Running statistics for the part. When given, the moment-based basic
+        statistics and the trend analysis are read from its state instead of
+        being recomputed from the history; the median, q25 and q75 are then
+        approximate (estimated by its quantile sketch). The seasonality,
+        volatility and quality sections still scan ``data``; use
+        ``calculate_accumulator_statistics`` for an O(1) query.
+    anomalies : pd.DataFrame, optional
+        Output of ``detect_demand_anomalies``; its anomaly rate feeds the
+        data quality score
         
     Returns:
     --------
@@ -44,38 +59,47 @@ def calculate_part_statistics(data, part_name):
     
     demand = part_data['demand']
     
-    # Basic descriptive statistics
-    basic_stats = {
-        'count': len(demand),
-        'mean': demand.mean(),
-        'median': demand.median(),
-        'std': demand.std(),
-        'min': demand.min(),
-        'max': demand.max(),
-        'range': demand.max() - demand.min(),
-        'q25': demand.quantile(0.25),
-        'q75': demand.quantile(0.75),
-        'iqr': demand.quantile(0.75) - demand.quantile(0.25)
-    }
-    
-    # Coefficient of variation (measure of relative variability)
-    basic_stats['cv'] = basic_stats['std'] / basic_stats['mean'] if basic_stats['mean'] > 0 else 0
-    
-    # Trend analysis using linear regression
-    if len(part_data) > 1:
-        x = np.arange(len(part_data))
-        slope, intercept, r_value, p_value, std_err = stats.linregress(x, demand)
+    if accumulator is not None:
+        # Moments, quantiles and trend come from the running state
+        basic_stats = accumulator.basic_statistics()
+        quantiles = accumulator.sketch.quantiles([0.25, 0.5, 0.75, 0.99])
+        trend_stats = accumulator.trend_analysis()
+    else:
+        # All quantiles from a single sort of the history
+        quantiles = demand.quantile([0.25, 0.5, 0.75, 0.99]).to_dict()
         
-        trend_stats = {
-            'slope': slope,
-            'intercept': intercept,
-            'r_squared': r_value ** 2,
-            'p_value': p_value,
-            'trend_direction': 'increasing' if slope > 0 else 'decreasing' if slope < 0 else 'stable',
-            'annual_growth_rate': slope * 365 / basic_stats['mean'] * 100 if basic_stats['mean'] > 0 else 0
+        # Basic descriptive statistics
+        basic_stats = {
+            'count': len(demand),
+            'mean': demand.mean(),
+            'median': quantiles[0.5],
+            'std': demand.std(),
+            'min': demand.min(),
+            'max': demand.max(),
+            'range': demand.max() - demand.min(),
+            'q25': quantiles[0.25],
+            'q75': quantiles[0.75],
+            'iqr': quantiles[0.75] - quantiles[0.25]
         }
-    else:
-        trend_stats = {'error': 'Insufficient data for trend analysis'}
+        
+        # Coefficient of variation (measure of relative variability)
+        basic_stats['cv'] = basic_stats['std'] / basic_stats['mean'] if basic_stats['mean'] > 0 else 0
+        
+        # Trend analysis using linear regression
+        if len(part_data) > 1:
+            x = np.arange(len(part_data))
+            slope, intercept, r_value, p_value, std_err = stats.linregress(x, demand)
+            
+            trend_stats = {
+                'slope': slope,
+                'intercept': intercept,
+                'r_squared': r_value ** 2,
+                'p_value': p_value,
+                'trend_direction': 'increasing' if slope > 0 else 'decreasing' if slope < 0 else 'stable',
+                'annual_growth_rate': slope * 365 / basic_stats['mean'] * 100 if basic_stats['mean'] > 0 else 0
+            }
+        else:
+            trend_stats = {'error': 'Insufficient data for trend analysis'}
     
     # Seasonality analysis
     seasonality_stats = _analyze_seasonality(part_data)
@@ -84,7 +108,10 @@ def calculate_part_statistics(data, part_name):
     volatility_stats = _analyze_volatility(part_data)
     
     # Quality metrics
-    quality_stats = _analyze_data_quality(part_data)
+    anomaly_rate = None
+    if anomalies is not None:
+        anomaly_rate = _anomaly_rates(anomalies[anomalies['part_name'] == part_name]).get(part_name)
+    quality_stats = _analyze_data_quality(part_data, quantiles, anomaly_rate)
     
     # Recent performance (last 30 days)
     recent_data = part_data.tail(30) if len(part_data) >= 30 else part_data
@@ -111,6 +138,50 @@ def calculate_part_statistics(data, part_name):
     }
 
 
+def calculate_accumulator_statistics(accumulator):
+    """
+    Calculate the statistics of a part answerable from its running state.
+    
+    Unlike ``calculate_part_statistics(..., accumulator=...)`` the demand
+    history is not read at all, so the query costs O(1) however long the
+    history is. Only the sections backed by the accumulator are returned.
+    
+    Parameters:
+    -----------
+    accumulator : DemandStatisticsAccumulator
+        Running statistics for the part
+        
+    Returns:
+    --------
+    dict
+        part_name, analysis_date, data_period, basic_statistics and
+        trend_analysis, with the same keys as ``calculate_part_statistics``.
+        The median, q25 and q75 are approximate: they are estimated by the
+        accumulator's quantile sketch.
+    """
+    
+    if accumulator.count == 0:
+        return {'error': 'No data available for the specified part'}
+    
+    first_date, last_date = accumulator.first_date, accumulator.last_date
+    if first_date is not None and last_date is not None:
+        data_period = {
+            'start_date': first_date.strftime('%Y-%m-%d'),
+            'end_date': last_date.strftime('%Y-%m-%d'),
+            'total_days': (last_date - first_date).days + 1
+        }
+    else:
+        data_period = {'start_date': None, 'end_date': None, 'total_days': accumulator.count}
+    
+    return {
+        'part_name': accumulator.part_name,
+        'analysis_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'data_period': data_period,
+        'basic_statistics': accumulator.basic_statistics(),
+        'trend_analysis': accumulator.trend_analysis()
+    }
+
+
 def _analyze_seasonality(part_data):
     """
     Analyze seasonal patterns in demand data.
@@ -190,22 +261,19 @@ def _analyze_volatility(part_data):
     
     demand = part_data['demand']
     
-    # Rolling volatility analysis
-    windows = [7, 14, 30]
+    # Rolling volatility analysis, all windows from one cumulative pass
+    windows = [window for window in (7, 14, 30) if len(demand) >= window]
+    cv_by_window = rolling_cv(demand.to_numpy(dtype=float)[None, :], windows)
     rolling_volatility = {}
     
     for window in windows:
-        if len(demand) >= window:
-            rolling_std = demand.rolling(window).std()
-            rolling_mean = demand.rolling(window).mean()
-            rolling_cv = rolling_std / rolling_mean
-            
-            rolling_volatility[f'{window}_day'] = {
-                'avg_cv': rolling_cv.mean(),
-                'max_cv': rolling_cv.max(),
-                'min_cv': rolling_cv.min(),
-                'current_cv': rolling_cv.iloc[-1] if not rolling_cv.empty else None
-            }
+        cv = cv_by_window[window][0]
+        rolling_volatility[f'{window}_day'] = {
+            'avg_cv': np.nanmean(cv),
+            'max_cv': np.nanmax(cv),
+            'min_cv': np.nanmin(cv),
+            'current_cv': cv[-1]
+        }
     
     # Daily change analysis
     if len(demand) > 1:
@@ -238,7 +306,251 @@ def _analyze_volatility(part_data):
     }
 
 
-def _analyze_data_quality(part_data):
+def calculate_volatility_report(data, windows=(7, 14, 30), part_names=None):
+    """
+    Rolling volatility summary for every part and window in one pass.
+    
+    All parts are stacked into one demand matrix and the rolling coefficient
+    of variation for every window comes from a single cumulative-sum pass,
+    so reports over many windows cost little more than one.
+    
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        Historical demand data with columns: part_name, date, demand
+    windows : iterable of int
+        Rolling window lengths in days
+    part_names : list-like, optional
+        Parts to include. Defaults to every part in ``data``.
+        
+    Returns:
+    --------
+    pd.DataFrame
+        One row per part and window with columns: part_name, window, avg_cv,
+        max_cv, min_cv, current_cv, recent_cv (mean CV over the last 30
+        days). Windows longer than a part's history are omitted.
+    """
+    
+    parts, values, lengths, _ = build_demand_matrix(data, part_names)
+    windows = list(windows)
+    
+    if len(parts) == 0 or not windows:
+        return pd.DataFrame()
+    
+    cv_by_window = rolling_cv(values, windows)
+    
+    # Rows of parts shorter than a window are all NaN and dropped below
+    frames = []
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        for window in windows:
+            cv = cv_by_window[window]
+            frames.append(pd.DataFrame({
+                'part_name': parts.to_numpy(),
+                'window': window,
+                'avg_cv': np.nanmean(cv, axis=1),
+                'max_cv': np.nanmax(cv, axis=1),
+                'min_cv': np.nanmin(cv, axis=1),
+                'current_cv': cv[:, -1],
+                'recent_cv': np.nanmean(cv[:, -30:], axis=1)
+            })[lengths >= window])
+    
+    report = pd.concat(frames, ignore_index=True)
+    order = np.lexsort((report['window'].to_numpy(), parts.get_indexer(report['part_name'])))
+    return report.iloc[order].reset_index(drop=True)
+
+
+def detect_demand_anomalies(data, window=28, season_length=7, threshold=3.5,
+                            part_names=None, since=None, memory_budget_mb=256):
+    """
+    Flag anomalous demand days per part with rolling robust statistics.
+    
+    Every statistic looks back only over trailing windows, so a day's score
+    never depends on later data:
+    
+    - level: median demand over the previous ``window`` days
+    - deviation: demand minus level
+    - seasonal term: median deviation of the same phase (e.g. weekday)
+      within the previous ``window`` days
+    - scale: 1.4826 x the MAD of the deviations in that window (1.2533 x
+      the mean absolute deviation when the MAD is zero)
+    
+    A day is anomalous when ``|deviation - seasonal| / scale`` exceeds
+    ``threshold`` (a modified z-score; 3.5 is the usual cut-off). All parts
+    are scored together on a right-aligned demand matrix. With ``since``, only
+    days after that date are scored, reading just the ``2 * window`` days
+    before them, so the detector can run as a streaming stage over newly
+    appended data and produces the same scores as the batch run.
+    
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        Historical demand data with columns: part_name, date, demand
+    window : int
+        Trailing window length in days
+    season_length : int or None
+        Seasonal period in days for the seasonal term; None disables it
+    threshold : float
+        Modified z-score above which a day is flagged
+    part_names : list-like, optional
+        Parts to score. Defaults to every part in ``data``.
+    since : datetime-like, optional
+        Only score days strictly after this date
+    memory_budget_mb : float
+        Approximate cap on the memory of the sliding windows; parts are
+        processed in chunks that fit
+        
+    Returns:
+    --------
+    pd.DataFrame
+        One row per scored part and day with columns: part_name, date, demand,
+        expected, score, is_anomaly. Days without ``2 * window`` days of
+        history get a NaN score and are never flagged.
+    """
+    
+    columns = ['part_name', 'date', 'demand', 'expected', 'score', 'is_anomaly']
+    parts, values, lengths, history = build_demand_matrix(data, part_names)
+    
+    if len(parts) == 0:
+        return pd.DataFrame(columns=columns)
+    
+    n_days = values.shape[1]
+    observed = np.arange(n_days) >= (n_days - lengths)[:, None]
+    
+    # Columns to score: everything, or only days after ``since``
+    dates = np.full(values.shape, np.datetime64('NaT'), dtype='datetime64[ns]')
+    dates[observed] = history['date'].to_numpy()
+    if since is not None:
+        scored = observed & (dates > np.datetime64(pd.Timestamp(since)))
+    else:
+        scored = observed
+    
+    first = np.flatnonzero(scored.any(axis=0))
+    if len(first) == 0:
+        return pd.DataFrame(columns=columns)
+    start = first[0]
+    
+    expected = np.full((len(parts), n_days - start), np.nan)
+    score = np.full((len(parts), n_days - start), np.nan)
+    
+    bytes_per_part = 4 * (n_days - start + 2 * window) * window * 8
+    chunk_size = max(1, int(memory_budget_mb * 1024 * 1024 // bytes_per_part))
+    for chunk_start in range(0, len(parts), chunk_size):
+        chunk = slice(chunk_start, chunk_start + chunk_size)
+        expected[chunk], score[chunk] = _robust_scores(
+            values[chunk], start, window, season_length
+        )
+    
+    scored = scored[:, start:]
+    rows = np.flatnonzero(scored.ravel())
+    score_flat = score.ravel()[rows]
+    
+    return pd.DataFrame({
+        'part_name': np.repeat(parts.to_numpy(), scored.sum(axis=1)),
+        'date': dates[:, start:].ravel()[rows],
+        'demand': values[:, start:].ravel()[rows],
+        'expected': expected.ravel()[rows],
+        'score': score_flat,
+        'is_anomaly': np.abs(np.nan_to_num(score_flat)) > threshold
+    })
+
+
+def _robust_scores(values, start, window, season_length):
+    """
+    Expected demand and modified z-scores for columns ``start`` onwards.
+    
+    Reads ``2 * window`` columns of lookback before ``start``: ``window`` for
+    the levels of the deviations inside the scoring windows, ``window`` for
+    those windows themselves.
+    """
+    
+    lookback = max(0, start - 2 * window)
+    padding = 2 * window - (start - lookback)
+    values = np.concatenate(
+        [np.full((len(values), padding), np.nan), values[:, lookback:]], axis=1
+    )
+    
+    # Windows in the padding or before a part's history are all NaN
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        
+        # Level of each day from the previous ``window`` days
+        windows = np.lib.stride_tricks.sliding_window_view(values[:, :-1], window, axis=1)
+        level = np.nanmedian(windows, axis=2)
+        full = (~np.isnan(windows)).sum(axis=2) == window
+        level[~full] = np.nan
+        deviation = values[:, window:] - level
+        
+        # Seasonal term and scale from the deviations of the previous ``window`` days
+        dev_windows = np.lib.stride_tricks.sliding_window_view(
+            deviation[:, :-1], window, axis=1
+        )
+        if season_length and season_length < window:
+            same_phase = np.arange(window - season_length, -1, -season_length)
+            seasonal = np.nanmedian(dev_windows[..., same_phase], axis=2)
+        else:
+            seasonal = np.zeros(dev_windows.shape[:2])
+        
+        centre = np.nanmedian(dev_windows, axis=2)
+        spread = np.abs(dev_windows - centre[..., None])
+        scale = 1.4826 * np.nanmedian(spread, axis=2)
+        scale = np.where(scale > 0, scale, 1.2533 * np.nanmean(spread, axis=2))
+    
+    full = (~np.isnan(dev_windows)).sum(axis=2) == window
+    residual = deviation[:, window:] - seasonal
+    with np.errstate(invalid='ignore', divide='ignore'):
+        score = np.where(full, residual / scale, np.nan)
+    expected = np.where(full, level[:, window:] + seasonal, np.nan)
+    
+    # In a window without spread only an exact match is normal
+    score[full & (scale == 0) & (residual == 0)] = 0.0
+    
+    return expected, score
+
+
+def exclude_anomalous_days(data, anomalies, fill='expected'):
+    """
+    Remove days flagged by ``detect_demand_anomalies`` before forecasting.
+    
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        Historical demand data with columns: part_name, date, demand
+    anomalies : pd.DataFrame
+        Output of ``detect_demand_anomalies`` for ``data``
+    fill : str
+        'expected' replaces flagged demand with the detector's expected
+        value, keeping the daily series contiguous for the moving averages;
+        'drop' removes the flagged rows
+        
+    Returns:
+    --------
+    pd.DataFrame
+        Copy of ``data`` with anomalous days replaced or removed
+    """
+    
+    if fill not in ('expected', 'drop'):
+        raise ValueError(f"Unknown fill method: {fill}")
+    
+    flagged = anomalies.loc[anomalies['is_anomaly'], ['part_name', 'date', 'expected']]
+    keys = pd.MultiIndex.from_arrays([data['part_name'], pd.to_datetime(data['date'])])
+    position = pd.MultiIndex.from_frame(flagged[['part_name', 'date']]).get_indexer(keys)
+    hit = position >= 0
+    
+    if fill == 'drop':
+        return data.loc[~hit].copy()
+    
+    cleaned = data.copy()
+    replacement = flagged['expected'].to_numpy()[position[hit]]
+    demand = cleaned['demand'].to_numpy(dtype=float)
+    demand[hit] = replacement
+    if pd.api.types.is_integer_dtype(cleaned['demand']):
+        demand = np.round(demand)
+    cleaned['demand'] = demand.astype(cleaned['demand'].dtype)
+    return cleaned
+
+
+def _analyze_data_quality(part_data, quantiles=None, anomaly_rate=None):
     """
     Analyze data quality metrics.
     
@@ -246,6 +558,14 @@ def _analyze_data_quality(part_data):
     -----------
     part_data : pd.DataFrame
         Part-specific demand data
+    quantiles : dict, optional
+        Precomputed demand quantiles keyed by 0.25, 0.75 and 0.99, e.g. from
+        a ``QuantileSketch``. Computed from ``part_data`` in one pass when
+        omitted.
+    anomaly_rate : float, optional
+        Share of scored days flagged by ``detect_demand_anomalies``. When
+        given it is reported and replaces the global IQR outlier rate in the
+        quality score.
         
     Returns:
     --------
@@ -260,9 +580,12 @@ def _analyze_data_quality(part_data):
     non_null_records = demand.notna().sum()
     completeness_rate = non_null_records / total_records if total_records > 0 else 0
     
+    if quantiles is None:
+        quantiles = demand.quantile([0.25, 0.75, 0.99]).to_dict()
+    
     # Outlier detection using IQR method
-    q25 = demand.quantile(0.25)
-    q75 = demand.quantile(0.75)
+    q25 = quantiles[0.25]
+    q75 = quantiles[0.75]
     iqr = q75 - q25
     lower_bound = q25 - 1.5 * iqr
     upper_bound = q75 + 1.5 * iqr
@@ -276,17 +599,18 @@ def _analyze_data_quality(part_data):
     
     # Data consistency (check for reasonable values)
     negative_values = (demand < 0).sum()
-    extremely_high_values = (demand > demand.quantile(0.99) * 3).sum()
+    extremely_high_values = (demand > quantiles[0.99] * 3).sum()
     
     # Overall quality score
+    irregular_rate = outlier_rate if anomaly_rate is None else anomaly_rate
     quality_score = (
         completeness_rate * 0.4 +
-        (1 - outlier_rate) * 0.3 +
+        (1 - irregular_rate) * 0.3 +
         (1 - zero_demand_rate) * 0.2 +
         (1 - negative_values / len(demand)) * 0.1 if len(demand) > 0 else 0
     )
     
-    return {
+    quality_stats = {
         'completeness_rate': completeness_rate,
         'outlier_rate': outlier_rate,
         'zero_demand_rate': zero_demand_rate,
@@ -295,172 +619,1664 @@ def _analyze_data_quality(part_data):
         'quality_score': quality_score,
         'quality_grade': 'Excellent' if quality_score >= 0.9 else 'Good' if quality_score >= 0.7 else 'Fair' if quality_score >= 0.5 else 'Poor'
     }
+    if anomaly_rate is not None:
+        quality_stats['anomaly_rate'] = anomaly_rate
+    
+    return quality_stats
 
 
-def generate_leaderboard(data, sort_by='avg_demand'):
+def _anomaly_rates(anomalies):
     """
-    Generate performance leaderboard for all EV parts.
+    Share of scored days flagged per part in ``detect_demand_anomalies`` output.
+    """
+    
+    scored = anomalies[anomalies['score'].notna()]
+    return scored.groupby('part_name', sort=False)['is_anomaly'].mean()
+
+
+def calculate_all_part_statistics(data, part_names=None, anomalies=None):
+    """
+    Calculate comprehensive statistics for every EV part in one pass.
+    
+    The data is sorted by part and date once, and every metric of
+    ``calculate_part_statistics`` is computed for all parts together with
+    grouped aggregations and segment-wise NumPy reductions. Each part's entry
+    matches ``calculate_part_statistics`` for that part (up to floating point
+    rounding and the ``analysis_date`` timestamp).
     
     Parameters:
     -----------
     data : pd.DataFrame
-        Complete demand data for all parts
-    sort_by : str
-        Metric to sort by ('avg_demand', 'growth_rate', 'volatility', 'quality_score')
+        Historical demand data with columns: part_name, date, demand
+    part_names : list-like, optional
+        Parts to analyze. Defaults to every part in ``data``, in order of
+        first appearance. Parts without data get an error entry.
+    anomalies : pd.DataFrame, optional
+        Output of ``detect_demand_anomalies``; its anomaly rates feed the
+        data quality scores
         
     Returns:
     --------
-    pd.DataFrame
-        Leaderboard with rankings and performance metrics
+    dict
+        Part names mapped to their statistics dictionaries
     """
     
-    parts = data['part_name'].unique()
-    leaderboard_data = []
+    parts, values, lengths, history = build_demand_matrix(data, part_names)
     
-    for part in parts:
-        stats = calculate_part_statistics(data, part)
-        
-        if 'error' not in stats:
-            basic_stats = stats['basic_statistics']
-            trend_stats = stats.get('trend_analysis', {})
-            volatility_stats = stats.get('volatility_analysis', {})
-            quality_stats = stats.get('data_quality', {})
-            
-            leaderboard_entry = {
-                'part_name': part,
-                'avg_demand': round(basic_stats['mean'], 1),
-                'growth_rate': round(trend_stats.get('annual_growth_rate', 0), 2),
-                'volatility': round(volatility_stats.get('overall_coefficient_of_variation', 0), 3),
-                'quality_score': round(quality_stats.get('quality_score', 0), 3),
-                'trend_strength': round(trend_stats.get('r_squared', 0), 3),
-                'data_points': basic_stats['count']
-            }
-            
-            leaderboard_data.append(leaderboard_entry)
+    results = {}
+    if len(parts):
+        anomaly_rates = None
+        if anomalies is not None:
+            anomaly_rates = _anomaly_rates(anomalies).reindex(parts).to_numpy()
+        results = _grouped_statistics(parts, values, lengths, history, anomaly_rates)
     
-    # Create DataFrame
-    leaderboard_df = pd.DataFrame(leaderboard_data)
+    if part_names is None:
+        return results
     
-    if leaderboard_df.empty:
-        return leaderboard_df
+    no_data = {'error': 'No data available for the specified part'}
+    return {part: results.get(part, dict(no_data)) for part in pd.unique(np.asarray(part_names, dtype=object))}
+
+
+def _grouped_statistics(parts, values, lengths, history, anomaly_rates=None):
+    """
+    Statistics dictionaries for parts stacked by ``build_demand_matrix``.
     
-    # Sort by specified metric
-    ascending = sort_by in ['volatility']  # Lower volatility is better
-    leaderboard_df = leaderboard_df.sort_values(sort_by, ascending=ascending)
+    ``anomaly_rates`` optionally holds one anomaly rate per part (NaN when
+    unknown) for the quality score, as in ``_analyze_data_quality``.
+    """
     
-    # Add rankings
-    leaderboard_df['rank'] = range(1, len(leaderboard_df) + 1)
+    n_parts = len(parts)
+    codes = np.repeat(np.arange(n_parts), lengths)
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    position = np.arange(len(codes)) - starts[codes]
     
-    # Add medal indicators
-    leaderboard_df['medal'] = ''
-    if len(leaderboard_df) >= 1:
-        leaderboard_df.iloc[0, leaderboard_df.columns.get_loc('medal')] = '🥇'
-    if len(leaderboard_df) >= 2:
-        leaderboard_df.iloc[1, leaderboard_df.columns.get_loc('medal')] = '🥈'
-    if len(leaderboard_df) >= 3:
-        leaderboard_df.iloc[2, leaderboard_df.columns.get_loc('medal')] = '🥉'
+    demand = history['demand']
+    dates = pd.DatetimeIndex(history['date'])
+    grouped = demand.groupby(codes, sort=False)
     
-    # Reorder columns
-    column_order = ['rank', 'medal', 'part_name', 'avg_demand', 'growth_rate', 
-                   'volatility', 'quality_score', 'trend_strength', 'data_points']
-    leaderboard_df = leaderboard_df[column_order]
+    # Basic descriptive statistics
+    summary = grouped.agg(['mean', 'median', 'std', 'min', 'max', 'count'])
+    quantiles = grouped.quantile([0.25, 0.75, 0.99]).unstack()
+    mean = summary['mean'].to_numpy()
+    std = summary['std'].to_numpy()
+    minimum = summary['min'].to_numpy()
+    maximum = summary['max'].to_numpy()
+    q25 = quantiles[0.25].to_numpy()
+    q75 = quantiles[0.75].to_numpy()
+    q99 = quantiles[0.99].to_numpy()
     
-    return leaderboard_df
+    # Trend over the full history and over the most recent 30 days
+    demand_values = demand.to_numpy(dtype=float)
+    slope, intercept, r_value, p_value = _segment_regression(demand_values, codes, n_parts)
+    recent = position >= (lengths - 30)[codes]
+    recent_slope = _segment_regression(demand_values[recent], codes[recent], n_parts)[0]
+    recent_summary = demand[recent].groupby(codes[recent], sort=False).agg(['mean', 'std'])
+    
+    # Calendar profiles for seasonality
+    _, month_cv, peak_month, low_month, month_amplitude = _calendar_profile(
+        demand, codes, dates.month, n_parts
+    )
+    _, weekday_cv, peak_weekday, low_weekday, weekday_amplitude = _calendar_profile(
+        demand, codes, dates.weekday, n_parts
+    )
+    quarterly_means = _calendar_profile(demand, codes, dates.quarter, n_parts)[0]
+    quarterly_means = quarterly_means.reindex(columns=[1, 2, 3, 4]).to_numpy()
+    
+    # Rolling and day-over-day volatility
+    # Parts shorter than a window have an all-NaN CV row
+    rolling = {}
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        for window, cv in rolling_cv(values, (7, 14, 30)).items():
+            rolling[window] = (
+                np.nanmean(cv, axis=1), np.nanmax(cv, axis=1),
+                np.nanmin(cv, axis=1), cv[:, -1]
+            )
+    changes = grouped.diff().groupby(codes, sort=False).agg(['mean', 'std', 'max', 'min'])
+    
+    # Data quality counts
+    bounds_low = (q25 - 1.5 * (q75 - q25))[codes]
+    bounds_high = (q75 + 1.5 * (q75 - q25))[codes]
+    outliers = np.bincount(codes, (demand_values < bounds_low) | (demand_values > bounds_high), n_parts)
+    zero_days = np.bincount(codes, demand_values == 0, n_parts).astype(int)
+    negative = np.bincount(codes, demand_values < 0, n_parts).astype(int)
+    extreme = np.bincount(codes, demand_values > (q99 * 3)[codes], n_parts).astype(int)
+    non_null = summary['count'].to_numpy()
+    
+    ends = starts + lengths - 1
+    start_dates = dates[starts]
+    end_dates = dates[ends]
+    analysis_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    
+    results = {}
+    for i, part_name in enumerate(parts):
+        n = int(lengths[i])
+        
+        basic_stats = {
+            'count': n,
+            'mean': mean[i],
+            'median': summary['median'].iat[i],
+            'std': std[i],
+            'min': minimum[i],
+            'max': maximum[i],
+            'range': maximum[i] - minimum[i],
+            'q25': q25[i],
+            'q75': q75[i],
+            'iqr': q75[i] - q25[i]
+        }
+        basic_stats['cv'] = std[i] / mean[i] if mean[i] > 0 else 0
+        
+        if n > 1:
+            trend_stats = {
+                'slope': slope[i],
+                'intercept': intercept[i],
+                'r_squared': r_value[i] ** 2,
+                'p_value': p_value[i],
+                'trend_direction': 'increasing' if slope[i] > 0 else 'decreasing' if slope[i] < 0 else 'stable',
+                'annual_growth_rate': slope[i] * 365 / mean[i] * 100 if mean[i] > 0 else 0
+            }
+        else:
+            trend_stats = {'error': 'Insufficient data for trend analysis'}
+        
+        if n < 30:
+            seasonality_stats = {'error': 'Insufficient data for seasonality analysis'}
+        else:
+            seasonality_stats = {
+                'monthly_seasonality': {
+                    'coefficient_of_variation': month_cv[i],
+                    'peak_month': peak_month[i],
+                    'low_month': low_month[i],
+                    'seasonal_amplitude': month_amplitude[i]
+                },
+                'weekly_seasonality': {
+                    'coefficient_of_variation': weekday_cv[i],
+                    'peak_weekday': peak_weekday[i],
+                    'low_weekday': low_weekday[i],
+                    'weekly_amplitude': weekday_amplitude[i]
+                },
+                'quarterly_patterns': {
+                    f'q{quarter}_avg': (
+                        quarterly_means[i, quarter - 1]
+                        if not np.isnan(quarterly_means[i, quarter - 1]) else None
+                    )
+                    for quarter in (1, 2, 3, 4)
+                }
+            }
+        
+        rolling_volatility = {}
+        for window, (avg_cv, max_cv, min_cv, current_cv) in rolling.items():
+            if n >= window:
+                rolling_volatility[f'{window}_day'] = {
+                    'avg_cv': avg_cv[i],
+                    'max_cv': max_cv[i],
+                    'min_cv': min_cv[i],
+                    'current_cv': current_cv[i]
+                }
+        
+        if n > 1:
+            daily_change_stats = {
+                'avg_daily_change': changes['mean'].iat[i],
+                'std_daily_change': changes['std'].iat[i],
+                'max_daily_increase': changes['max'].iat[i],
+                'max_daily_decrease': changes['min'].iat[i],
+                'volatility_score': abs(changes['std'].iat[i] / mean[i]) if mean[i] > 0 else 0
+            }
+        else:
+            daily_change_stats = {'error': 'Insufficient data for daily change analysis'}
+        
+        overall_cv = std[i] / mean[i] if mean[i] > 0 else 0
+        volatility_stats = {
+            'overall_coefficient_of_variation': overall_cv,
+            'volatility_level': 'Low' if overall_cv < 0.2 else 'Medium' if overall_cv < 0.5 else 'High',
+            'rolling_volatility': rolling_volatility,
+            'daily_change_analysis': daily_change_stats
+        }
+        
+        completeness_rate = non_null[i] / n
+        outlier_rate = outliers[i] / n
+        zero_demand_rate = zero_days[i] / n
+        anomaly_rate = None
+        if anomaly_rates is not None and not np.isnan(anomaly_rates[i]):
+            anomaly_rate = anomaly_rates[i]
+        irregular_rate = outlier_rate if anomaly_rate is None else anomaly_rate
+        quality_score = (
+            completeness_rate * 0.4 +
+            (1 - irregular_rate) * 0.3 +
+            (1 - zero_demand_rate) * 0.2 +
+            (1 - negative[i] / n) * 0.1
+        )
+        quality_stats = {
+            'completeness_rate': completeness_rate,
+            'outlier_rate': outlier_rate,
+            'zero_demand_rate': zero_demand_rate,
+            'negative_values': negative[i],
+            'extremely_high_values': extreme[i],
+            'quality_score': quality_score,
+            'quality_grade': 'Excellent' if quality_score >= 0.9 else 'Good' if quality_score >= 0.7 else 'Fair' if quality_score >= 0.5 else 'Poor'
+        }
+        if anomaly_rate is not None:
+            quality_stats['anomaly_rate'] = anomaly_rate
+        
+        recent_stats = {
+            'recent_mean': recent_summary['mean'].iat[i],
+            'recent_std': recent_summary['std'].iat[i],
+            'recent_trend': 'improving' if min(n, 30) > 1 and recent_slope[i] > 0 else 'declining'
+        }
+        
+        results[part_name] = {
+            'part_name': part_name,
+            'analysis_date': analysis_date,
+            'data_period': {
+                'start_date': start_dates[i].strftime('%Y-%m-%d'),
+                'end_date': end_dates[i].strftime('%Y-%m-%d'),
+                'total_days': (end_dates[i] - start_dates[i]).days + 1
+            },
+            'basic_statistics': basic_stats,
+            'trend_analysis': trend_stats,
+            'seasonality_analysis': seasonality_stats,
+            'volatility_analysis': volatility_stats,
+            'data_quality': quality_stats,
+            'recent_performance': recent_stats
+        }
+    
+    return results
 
 
-def calculate_inventory_efficiency_metrics(data, part_configs):
+def _segment_regression(values, codes, n_segments):
     """
-    Calculate inventory efficiency metrics for multiple parts.
+    Least-squares fit of each segment against its day index.
+    
+    ``values`` holds consecutive segments labelled by sorted ``codes``; each
+    segment is regressed on ``0, 1, ..., n - 1`` with the conventions of
+    ``stats.linregress``.
     
-    Parameters:
-    -----------
-    data : pd.DataFrame
-        Historical demand data
-    part_configs : dict
-        Dictionary with part configurations including current stock levels
-        
     Returns:
     --------
-    pd.DataFrame
-        DataFrame with efficiency metrics for each part
+    tuple
+        (slope, intercept, r_value, p_value) arrays, one entry per segment
     """
     
-    efficiency_data = []
+    n = np.bincount(codes, minlength=n_segments).astype(float)
+    starts = np.concatenate([[0], np.cumsum(n)[:-1]]).astype(int)
+    x = np.arange(len(codes)) - starts[codes]
     
-    for part_name, config in part_configs.items():
-        part_data = data[data['part_name'] == part_name]
-        
-        if part_data.empty:
-            continue
-            
-        current_stock = config.get('current_stock', 0)
-        avg_demand = part_data['demand'].mean()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x_mean = (n - 1) / 2
+        y_mean = np.bincount(codes, values, n_segments) / n
+        x_centered = x - x_mean[codes]
+        y_centered = values - y_mean[codes]
         
-        # Calculate efficiency metrics
-        inventory_turnover = (avg_demand * 365) / max(current_stock, 1)
-        days_of_inventory = current_stock / max(avg_demand, 1)
+        ssxm = (n ** 2 - 1) / 12
+        ssxym = np.bincount(codes, x_centered * y_centered, n_segments) / n
+        ssym = np.bincount(codes, y_centered ** 2, n_segments) / n
         
-        # Service level estimation (assuming stockouts when demand exceeds daily average)
-        high_demand_days = (part_data['demand'] > avg_demand * 1.5).sum()
-        service_level = 1 - (high_demand_days / len(part_data))
-        
-        efficiency_entry = {
-            'part_name': part_name,
-            'current_stock': current_stock,
-            'avg_daily_demand': round(avg_demand, 1),
-            'inventory_turnover': round(inventory_turnover, 2),
-            'days_of_inventory': round(days_of_inventory, 1),
-            'estimated_service_level': round(service_level, 3),
-            'efficiency_score': round((inventory_turnover * service_level) / max(days_of_inventory, 1), 3)
-        }
+        r_value = np.where(
+            (ssxm == 0) | (ssym == 0),
+            np.where(ssxym == 0, np.nan, 0.0),
+            np.clip(ssxym / np.sqrt(ssxm * ssym), -1.0, 1.0)
+        )
+        slope = ssxym / ssxm
+        intercept = y_mean - slope * x_mean
         
-        efficiency_data.append(efficiency_entry)
+        df = n - 2
+        t_stat = r_value * np.sqrt(df / ((1.0 - r_value + 1e-20) * (1.0 + r_value + 1e-20)))
+        p_value = 2 * stats.t.sf(np.abs(t_stat), df)
+    
+    # Two points always fit exactly
+    two_points = n == 2
+    first = values[starts[two_points]]
+    second = values[np.minimum(starts[two_points] + 1, len(values) - 1)]
+    p_value[two_points] = np.where(first == second, 1.0, 0.0)
     
-    return pd.DataFrame(efficiency_data)
+    return slope, intercept, r_value, p_value
 
 
-def generate_comparative_analysis(data, part_name_1, part_name_2):
+def _calendar_profile(demand, codes, keys, n_parts):
     """
-    Generate comparative analysis between two EV parts.
+    Seasonality summary per part over one calendar key (month, weekday, ...).
+    
+    Demand is averaged per part and key in one grouped aggregation; keys a
+    part never observed are ignored, as in ``_analyze_seasonality``.
     
-    Parameters:
-    -----------
-    data : pd.DataFrame
-        Historical demand data
-    part_name_1, part_name_2 : str
-        Names of the parts to compare
-        
     Returns:
     --------
-    dict
-        Comparative analysis results
+    tuple
+        (means, mean_cv, peak_key, low_key, amplitude) where ``means`` is a
+        (parts x keys) DataFrame and the rest are arrays with one entry per part
     """
     
-    stats_1 = calculate_part_statistics(data, part_name_1)
-    stats_2 = calculate_part_statistics(data, part_name_2)
+    table = demand.groupby([codes, np.asarray(keys)]).agg(['mean', 'std'])
+    means = table['mean'].unstack().reindex(range(n_parts))
+    stds = table['std'].unstack().reindex(range(n_parts))
     
-    if 'error' in stats_1 or 'error' in stats_2:
-        return {'error': 'Unable to generate comparison due to insufficient data'}
+    mean_values = means.to_numpy()
+    labels = means.columns.to_numpy()
+    with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mean_cv = np.nanmean(stds.to_numpy() / mean_values, axis=1)
+        amplitude = (
+            (np.nanmax(mean_values, axis=1) - np.nanmin(mean_values, axis=1))
+            / np.nanmean(mean_values, axis=1)
+        )
+    filled = np.where(np.isnan(mean_values), -np.inf, mean_values)
+    peak_key = labels[np.argmax(filled, axis=1)]
+    filled = np.where(np.isnan(mean_values), np.inf, mean_values)
+    low_key = labels[np.argmin(filled, axis=1)]
     
-    # Compare key metrics
-    comparison = {
-        'parts_compared': [part_name_1, part_name_2],
-        'demand_comparison': {
-            'higher_avg_demand': part_name_1 if stats_1['basic_statistics']['mean'] > stats_2['basic_statistics']['mean'] else part_name_2,
-            'demand_difference': abs(stats_1['basic_statistics']['mean'] - stats_2['basic_statistics']['mean']),
-            'demand_ratio': stats_1['basic_statistics']['mean'] / max(stats_2['basic_statistics']['mean'], 1)
-        },
-        'growth_comparison': {
-            'faster_growing': part_name_1 if stats_1['trend_analysis'].get('annual_growth_rate', 0) > stats_2['trend_analysis'].get('annual_growth_rate', 0) else part_name_2,
-            'growth_difference': abs(stats_1['trend_analysis'].get('annual_growth_rate', 0) - stats_2['trend_analysis'].get('annual_growth_rate', 0))
-        },
-        'volatility_comparison': {
-            'more_stable': part_name_1 if stats_1['volatility_analysis']['overall_coefficient_of_variation'] < stats_2['volatility_analysis']['overall_coefficient_of_variation'] else part_name_2,
-            'volatility_difference': abs(stats_1['volatility_analysis']['overall_coefficient_of_variation'] - stats_2['volatility_analysis']['overall_coefficient_of_variation'])
-        }
-    }
+    return means, mean_cv, peak_key, low_key, amplitude
+
+
+class QuantileSketch:
+    """
+    Mergeable streaming quantile sketch (KLL) with bounded memory.
     
-    return comparison
+    Values are kept in a stack of compactors; level ``h`` holds items that
+    each stand for ``2 ** h`` observations. When a level outgrows its
+    capacity it is sorted and every other item, starting at a random offset,
+    is promoted to the next level. Capacities shrink geometrically (factor
+    2/3) towards the lower levels, so memory stays below about ``3 * k`` values
+    however many observations are added.
+    
+    Quantiles are exact until more than ``k`` values have been added. After
+    that the rank error is about ``1.7 / k`` of the count at 99% confidence
+    (roughly 1% of the observations for the default ``k=200``), and min/max
+    are always exact. Sketches built on separate shards or workers can be
+    combined with ``merge``; the result has the same error guarantee as a
+    sketch fed all the values.
+    
+    Parameters:
+    -----------
+    k : int
+        Accuracy parameter: capacity of the top compactor
+    random_seed : int, optional
+        Seed for the compaction offsets, for reproducible sketches
+    """
+    
+    def __init__(self, k=200, random_seed=None):
+        self.k = k
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._levels = [np.empty(0)]
+        self._pending = []
+        self._rng = np.random.default_rng(random_seed)
+    
+    def update(self, value):
+        """Add one observation; NaN values are ignored."""
+        
+        # Single values are buffered and compacted in blocks
+        self._pending.append(value)
+        if len(self._pending) >= self.k:
+            self._flush()
+    
+    def _flush(self):
+        """Move buffered single observations into the compactors."""
+        
+        if self._pending:
+            pending, self._pending = self._pending, []
+            self.update_many(pending)
+    
+    def update_many(self, values):
+        """
+        Add a block of observations in one vectorized step.
+        
+        Parameters:
+        -----------
+        values : array-like
+            Observations to add; NaN values are ignored
+        """
+        
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        
+        self.count += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self._levels[0] = np.concatenate([self._levels[0], values])
+        self._compress()
+    
+    def merge(self, other):
+        """
+        Combine another sketch into this one.
+        
+        Parameters:
+        -----------
+        other : QuantileSketch
+            Sketch with the same ``k``, e.g. from another shard or worker
+            
+        Returns:
+        --------
+        QuantileSketch
+            This sketch, updated in place
+        """
+        
+        if other.k != self.k:
+            raise ValueError(f"Cannot merge sketches with k={self.k} and k={other.k}")
+        
+        self._flush()
+        other._flush()
+        while len(self._levels) < len(other._levels):
+            self._levels.append(np.empty(0))
+        for level, items in enumerate(other._levels):
+            self._levels[level] = np.concatenate([self._levels[level], items])
+        
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+    
+    def quantiles(self, quantiles):
+        """
+        Estimate several quantiles at once.
+        
+        Parameters:
+        -----------
+        quantiles : sequence of float
+            Quantiles in [0, 1]
+            
+        Returns:
+        --------
+        dict
+            Quantiles mapped to estimated values (NaN for an empty sketch).
+            Exact sketches use linear interpolation, like ``Series.quantile``.
+        """
+        
+        self._flush()
+        quantiles = [float(q) for q in quantiles]
+        if self.count == 0:
+            return {q: np.nan for q in quantiles}
+        
+        if len(self._levels) == 1:
+            values = np.quantile(self._levels[0], quantiles)
+            return dict(zip(quantiles, values))
+        
+        items = np.concatenate(self._levels)
+        weights = np.concatenate([
+            np.full(len(level), 2.0 ** height) for height, level in enumerate(self._levels)
+        ])
+        order = np.argsort(items, kind='stable')
+        items = items[order]
+        cumulative = np.cumsum(weights[order])
+        
+        targets = np.asarray(quantiles) * self.count
+        positions = np.minimum(np.searchsorted(cumulative, targets, side='left'), len(items) - 1)
+        values = np.clip(items[positions], self.min, self.max)
+        
+        # The extremes are tracked exactly
+        values = np.where(np.asarray(quantiles) <= 0, self.min, values)
+        values = np.where(np.asarray(quantiles) >= 1, self.max, values)
+        return dict(zip(quantiles, values))
+    
+    def quantile(self, quantile):
+        """Estimate a single quantile."""
+        
+        return self.quantiles([quantile])[float(quantile)]
+    
+    def size(self):
+        """Number of values currently retained by the sketch."""
+        
+        return sum(len(level) for level in self._levels) + len(self._pending)
+    
+    def _capacity(self, height):
+        """Capacity of the compactor at ``height`` given the current depth."""
+        
+        depth = len(self._levels) - height - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+    
+    def _compress(self):
+        """Compact levels bottom-up until every one fits its capacity."""
+        
+        height = 0
+        while height < len(self._levels):
+            items = self._levels[height]
+            if len(items) <= self._capacity(height):
+                height += 1
+                continue
+            
+            if height + 1 == len(self._levels):
+                self._levels.append(np.empty(0))
+            
+            items = np.sort(items)
+            # An odd item out stays behind so weights are conserved
+            keep = len(items) % 2
+            paired = items[:len(items) - keep]
+            offset = int(self._rng.integers(2))
+            self._levels[height + 1] = np.concatenate(
+                [self._levels[height + 1], paired[offset::2]]
+            )
+            self._levels[height] = items[len(items) - keep:]
+            
+            # A new top level shrinks every lower capacity; start over
+            height = 0
+
+
+class DemandStatisticsAccumulator:
+    """
+    Online demand statistics for a single part, updated as rows arrive.
+    
+    Keeps the count, mean and sum of squared deviations (Welford's method),
+    min/max, zero and negative demand counts, and the co-moment of demand
+    with its day index for the linear trend. The co-moments are the
+    numerically stable form of the running sums of x, y, xy and x^2, so
+    ``basic_statistics`` and ``trend_analysis`` are answered in O(1) without
+    rescanning the history. Accumulators over consecutive stretches of a
+    part's history can be combined with ``merge``.
+    
+    Parameters:
+    -----------
+    part_name : str
+        Name of the EV part being tracked
+    sketch_k : int
+        Accuracy parameter of the ``QuantileSketch`` used for the median,
+        quartiles and 99th percentile
+    """
+    
+    def __init__(self, part_name, sketch_k=200):
+        self.part_name = part_name
+        self.sketch = QuantileSketch(sketch_k)
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.co_moment = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.zero_count = 0
+        self.negative_count = 0
+        self.first_date = None
+        self.last_date = None
+    
+    @classmethod
+    def from_history(cls, data, part_name, sketch_k=200):
+        """
+        Seed an accumulator from a part's demand history.
+        
+        Parameters:
+        -----------
+        data : pd.DataFrame
+            Historical demand data with columns: part_name, date, demand
+        part_name : str
+            Name of the EV part to track
+        sketch_k : int
+            Accuracy parameter of the quantile sketch
+            
+        Returns:
+        --------
+        DemandStatisticsAccumulator
+            Accumulator positioned at the last observed day
+        """
+        
+        part_data = data[data['part_name'] == part_name]
+        accumulator = cls(part_name, sketch_k)
+        
+        if part_data.empty:
+            return accumulator
+        
+        part_data = part_data.sort_values('date')
+        dates = pd.to_datetime(part_data['date'])
+        accumulator.update_many(part_data['demand'].to_numpy(dtype=float))
+        accumulator.first_date = dates.iloc[0]
+        accumulator.last_date = dates.iloc[-1]
+        return accumulator
+    
+    def update(self, demand, date=None):
+        """
+        Add one day of demand to the running statistics.
+        
+        Parameters:
+        -----------
+        demand : float
+            Observed demand for the day
+        date : datetime-like, optional
+            Date of the observation. Defaults to the day after the last one.
+        """
+        
+        x = self.count
+        self.count += 1
+        delta = demand - self.mean
+        self.mean += delta / self.count
+        # Distance of the new day index from the previous mean index
+        self.co_moment += ((x + 1) / 2) * (demand - self.mean)
+        self.m2 += delta * (demand - self.mean)
+        
+        self.sketch.update(demand)
+        self.min = min(self.min, demand)
+        self.max = max(self.max, demand)
+        self.zero_count += int(demand == 0)
+        self.negative_count += int(demand < 0)
+        self._advance_date(date)
+    
+    def update_many(self, demand, last_date=None):
+        """
+        Add a block of consecutive days in one vectorized step.
+        
+        Parameters:
+        -----------
+        demand : array-like
+            Observed demand for consecutive days, oldest first
+        last_date : datetime-like, optional
+            Date of the last observation in the block
+        """
+        
+        demand = np.asarray(demand, dtype=float)
+        if len(demand) == 0:
+            return
+        
+        block = DemandStatisticsAccumulator(self.part_name, self.sketch.k)
+        block.sketch.update_many(demand)
+        n = len(demand)
+        x_centered = np.arange(n) - (n - 1) / 2
+        block.count = n
+        block.mean = demand.mean()
+        centered = demand - block.mean
+        block.m2 = float(np.dot(centered, centered))
+        block.co_moment = float(np.dot(x_centered, centered))
+        block.min = demand.min()
+        block.max = demand.max()
+        block.zero_count = int((demand == 0).sum())
+        block.negative_count = int((demand < 0).sum())
+        
+        self.merge(block)
+        if last_date is not None:
+            self.last_date = pd.to_datetime(last_date)
+            if self.first_date is None:
+                self.first_date = self.last_date - timedelta(days=n - 1)
+        elif self.last_date is not None:
+            self.last_date = self.last_date + timedelta(days=n)
+    
+    def merge(self, other):
+        """
+        Append the statistics of the days that follow this accumulator's.
+        
+        Uses the pairwise update of Chan et al., shifting ``other``'s day
+        index by this accumulator's count.
+        
+        Parameters:
+        -----------
+        other : DemandStatisticsAccumulator
+            Accumulator over the stretch of history right after this one
+            
+        Returns:
+        --------
+        DemandStatisticsAccumulator
+            This accumulator, updated in place
+        """
+        
+        if other.count == 0:
+            return self
+        
+        n_a, n_b = self.count, other.count
+        n = n_a + n_b
+        # Mean day index of ``other`` once shifted, minus this one's
+        delta_x = n_b / 2 + n_a / 2
+        delta_y = other.mean - self.mean
+        
+        self.co_moment += other.co_moment + delta_x * delta_y * n_a * n_b / n
+        self.m2 += other.m2 + delta_y ** 2 * n_a * n_b / n
+        self.mean += delta_y * n_b / n
+        self.count = n
+        
+        self.sketch.merge(other.sketch)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.zero_count += other.zero_count
+        self.negative_count += other.negative_count
+        if self.first_date is None:
+            self.first_date = other.first_date
+        if other.last_date is not None:
+            self.last_date = other.last_date
+        
+        return self
+    
+    def _advance_date(self, date):
+        """Move ``last_date`` to ``date`` or one day forward."""
+        
+        if date is not None:
+            self.last_date = pd.to_datetime(date)
+        elif self.last_date is not None:
+            self.last_date = self.last_date + timedelta(days=1)
+        if self.first_date is None:
+            self.first_date = self.last_date
+    
+    def basic_statistics(self):
+        """
+        Descriptive statistics from the running state.
+        
+        Returns:
+        --------
+        dict
+            Same keys as the ``basic_statistics`` section of
+            ``calculate_part_statistics``; the median and quartiles are
+            approximate, estimated by the quantile sketch
+        """
+        
+        if self.count == 0:
+            return {'error': 'No data available for the specified part'}
+        
+        std = np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.nan
+        quantiles = self.sketch.quantiles([0.25, 0.5, 0.75])
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'median': quantiles[0.5],
+            'std': std,
+            'min': self.min,
+            'max': self.max,
+            'range': self.max - self.min,
+            'q25': quantiles[0.25],
+            'q75': quantiles[0.75],
+            'iqr': quantiles[0.75] - quantiles[0.25],
+            'cv': std / self.mean if self.mean > 0 else 0
+        }
+    
+    def trend_analysis(self):
+        """
+        Linear trend of demand against the day index from the running state.
+        
+        Returns:
+        --------
+        dict
+            Same keys and conventions as the ``trend_analysis`` section of
+            ``calculate_part_statistics``
+        """
+        
+        n = self.count
+        if n < 2:
+            return {'error': 'Insufficient data for trend analysis'}
+        
+        ssx = n * (n ** 2 - 1) / 12
+        slope = self.co_moment / ssx
+        intercept = self.mean - slope * (n - 1) / 2
+        
+        if self.m2 == 0:
+            r_value = np.nan if self.co_moment == 0 else 0.0
+        else:
+            r_value = float(np.clip(self.co_moment / np.sqrt(ssx * self.m2), -1.0, 1.0))
+        
+        if n == 2:
+            p_value = 1.0 if self.m2 == 0 else 0.0
+        else:
+            df = n - 2
+            t_stat = r_value * np.sqrt(df / ((1.0 - r_value + 1e-20) * (1.0 + r_value + 1e-20)))
+            p_value = 2 * stats.t.sf(abs(t_stat), df)
+        
+        return {
+            'slope': slope,
+            'intercept': intercept,
+            'r_squared': r_value ** 2,
+            'p_value': p_value,
+            'trend_direction': 'increasing' if slope > 0 else 'decreasing' if slope < 0 else 'stable',
+            'annual_growth_rate': slope * 365 / self.mean * 100 if self.mean > 0 else 0
+        }
+
+
+def create_statistics_accumulators(data, sketch_k=200):
+    """
+    Seed a ``DemandStatisticsAccumulator`` for every part in the data.
+    
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        Historical demand data with columns: part_name, date, demand
+    sketch_k : int
+        Accuracy parameter of each accumulator's quantile sketch
+        
+    Returns:
+    --------
+    dict
+        Part names mapped to accumulators positioned at their last observed day
+    """
+    
+    parts, _, lengths, history = build_demand_matrix(data)
+    demand = history['demand'].to_numpy(dtype=float)
+    dates = history['date']
+    
+    accumulators = {}
+    end = 0
+    for part_name, length in zip(parts, lengths):
+        start, end = end, end + length
+        accumulator = DemandStatisticsAccumulator(part_name, sketch_k)
+        accumulator.update_many(demand[start:end], last_date=dates.iat[end - 1])
+        accumulator.first_date = dates.iat[start]
+        accumulators[part_name] = accumulator
+    
+    return accumulators
+
+
+class PartStatisticsCache:
+    """
+    Thread-safe cache of per-part statistics with per-part invalidation.
+    
+    Each entry is stored with a watermark of the part's data: its row count
+    and a content hash of its (date, demand) rows. Watermarks are computed in
+    one vectorized hashing pass and one grouped sum over the data, and only
+    parts whose watermark moved (new days, corrected values, swapped days)
+    are recomputed, together, by ``calculate_all_part_statistics``. Callers
+    that already know the ``compute_data_version`` of the data can pass it
+    as a first-level check: the watermarks of the last seen version are
+    reused, so the data is only rehashed when the version changes. The least
+    recently used parts are evicted beyond ``max_parts`` entries.
+    
+    Cache hits are returned as shallow copies restamped with the current
+    ``analysis_date``; the nested sections are shared between callers and
+    should be treated as read-only.
+    
+    Parameters:
+    -----------
+    max_parts : int
+        Maximum number of parts kept in the cache
+    """
+    
+    def __init__(self, max_parts=10000):
+        self.max_parts = max_parts
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._watermarks = (None, None)
+        self._lock = threading.Lock()
+    
+    def get_statistics(self, data, part_names=None, data_version=None):
+        """
+        Statistics for several parts, recomputing only stale entries.
+        
+        Parameters:
+        -----------
+        data : pd.DataFrame
+            Historical demand data with columns: part_name, date, demand
+        part_names : list-like, optional
+            Parts to return. Defaults to every part in ``data``.
+        data_version : str, optional
+            Identifier of the data contents from ``compute_data_version``.
+            When it matches the previous lookup the per-part watermarks are
+            not recomputed. Without it the data is always rehashed.
+            
+        Returns:
+        --------
+        dict
+            Part names mapped to statistics dictionaries, as returned by
+            ``calculate_all_part_statistics``
+        """
+        
+        watermarks = self._current_watermarks(data, data_version)
+        if part_names is None:
+            part_names = watermarks.index
+        part_names = list(pd.unique(np.asarray(part_names, dtype=object)))
+        
+        results = {}
+        stale = []
+        analysis_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self._lock:
+            for part_name in part_names:
+                watermark = watermarks.get(part_name)
+                entry = self._entries.get(part_name)
+                if entry is not None and entry[0] == watermark:
+                    self._entries.move_to_end(part_name)
+                    self.hits += 1
+                    results[part_name] = _restamp(entry[1], analysis_date)
+                else:
+                    self.misses += 1
+                    stale.append(part_name)
+        
+        if stale:
+            fresh = calculate_all_part_statistics(data, stale)
+            with self._lock:
+                for part_name in stale:
+                    self._entries[part_name] = (watermarks.get(part_name), fresh[part_name])
+                    self._entries.move_to_end(part_name)
+                while len(self._entries) > self.max_parts:
+                    self._entries.popitem(last=False)
+            results.update(fresh)
+        
+        return {part_name: results[part_name] for part_name in part_names}
+    
+    def _current_watermarks(self, data, data_version):
+        """Watermarks of ``data``, reused while ``data_version`` is unchanged."""
+        
+        if data_version is not None:
+            with self._lock:
+                version, watermarks = self._watermarks
+            if version == data_version:
+                return watermarks
+        
+        watermarks = _part_watermarks(data)
+        if data_version is not None:
+            with self._lock:
+                self._watermarks = (data_version, watermarks)
+        return watermarks
+    
+    def get(self, data, part_name, data_version=None):
+        """Statistics for one part; see ``get_statistics``."""
+        
+        return self.get_statistics(data, [part_name], data_version)[part_name]
+    
+    def invalidate(self, part_name=None):
+        """Drop one part's entry, or every entry when ``part_name`` is None."""
+        
+        with self._lock:
+            if part_name is None:
+                self._entries.clear()
+                self._watermarks = (None, None)
+            else:
+                self._entries.pop(part_name, None)
+    
+    def clear(self):
+        """Drop all entries and reset the hit/miss counters."""
+        
+        with self._lock:
+            self._entries.clear()
+            self._watermarks = (None, None)
+            self.hits = 0
+            self.misses = 0
+    
+    def stats(self):
+        """
+        Cache statistics.
+        
+        Returns:
+        --------
+        dict
+            entries, hits, misses and hit_rate
+        """
+        
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+
+def _part_watermarks(data):
+    """
+    Per-part data watermark: (row count, content hash).
+    
+    Every (date, demand) row is hashed and the hashes are summed per part
+    (modulo 2**64), so any added, removed or changed row moves the
+    watermark while the order of the rows does not matter.
+    
+    Returns:
+    --------
+    pd.Series
+        Watermark tuples indexed by part name
+    """
+    
+    if data.empty:
+        return pd.Series(dtype=object)
+    
+    row_hashes = pd.util.hash_pandas_object(data[['date', 'demand']], index=False)
+    summary = row_hashes.groupby(data['part_name'].to_numpy(), sort=False).agg(['size', 'sum'])
+    return pd.Series(list(zip(summary['size'], summary['sum'])), index=summary.index)
+
+
+def _restamp(statistics, analysis_date):
+    """Shallow copy of cached statistics with a new analysis_date."""
+    
+    if 'analysis_date' not in statistics:
+        return statistics
+    return {**statistics, 'analysis_date': analysis_date}
+
+
+_part_statistics_cache = PartStatisticsCache()
+
+
+def get_part_statistics_cache():
+    """Return the process-wide part statistics cache."""
+    
+    return _part_statistics_cache
+
+
+class LeaderboardCache(LRUCache):
+    """
+    LRU cache for unranked leaderboard metric tables, keyed by data version
+    (see ``build_leaderboard_metrics``).
+    
+    Parameters:
+    -----------
+    max_bytes : int
+        Upper bound on the memory held by cached tables
+    """
+    
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        super().__init__(max_bytes)
+
+
+_leaderboard_cache = LeaderboardCache()
+
+
+def get_leaderboard_cache():
+    """Return the process-wide leaderboard metrics cache."""
+    
+    return _leaderboard_cache
+
+
+def get_analytics_cache_stats():
+    """
+    Usage statistics of the process-wide analytics caches.
+    
+    Returns:
+    --------
+    dict
+        ``stats()`` of the leaderboard and part statistics caches, under the
+        keys leaderboard and part_statistics
+    """
+    
+    return {
+        'leaderboard': _leaderboard_cache.stats(),
+        'part_statistics': _part_statistics_cache.stats()
+    }
+
+
+def clear_analytics_caches():
+    """Drop every entry of the leaderboard and part statistics caches."""
+    
+    _leaderboard_cache.clear()
+    _part_statistics_cache.clear()
+
+
+def calculate_cached_part_statistics(data, part_name, cache=None, data_version=None):
+    """
+    Calculate a part's statistics through the part statistics cache.
+    
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        Historical demand data with columns: part_name, date, demand
+    part_name : str
+        Name of the EV part to analyze
+    cache : PartStatisticsCache, optional
+        Cache to use. Defaults to the process-wide cache.
+    data_version : str, optional
+        Identifier of the data contents from ``compute_data_version``. Lets
+        the cache skip rehashing the data when it has not changed.
+        
+    Returns:
+    --------
+    dict
+        Same result as ``calculate_part_statistics``; recomputed only when the
+        part's data changed since it was cached
+    """
+    
+    if cache is None:
+        cache = _part_statistics_cache
+    return cache.get(data, part_name, data_version)
+
+
+def generate_leaderboard(data, sort_by='avg_demand', statistics=None):
+    """
+    Generate performance leaderboard for all EV parts.
+    
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        Complete demand data for all parts
+    sort_by : str
+        Metric to sort by ('avg_demand', 'growth_rate', 'volatility', 'quality_score')
+    statistics : dict, optional
+        Precomputed output of ``calculate_all_part_statistics`` for ``data``.
+        Read through the part statistics cache when omitted.
+        
+    Returns:
+    --------
+    pd.DataFrame
+        Leaderboard with rankings and performance metrics
+    """
+    
+    metrics = build_leaderboard_metrics(data, statistics=statistics)
+    return rank_leaderboard(metrics, sort_by)
+
+
+def build_leaderboard_metrics(data, data_version=None, statistics=None):
+    """
+    Build the unranked leaderboard metrics table for all EV parts.
+    
+    The table only depends on the data, so it is cached per data version and
+    re-sorting the leaderboard with ``rank_leaderboard`` does not repeat the
+    statistics pass. Tables built from caller-supplied ``statistics`` are not
+    cached, since those may cover a subset of the parts or adjusted values.
+    
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        Complete demand data for all parts
+    data_version : str, optional
+        Identifier of the data contents from ``compute_data_version``.
+        Computed when omitted.
+    statistics : dict, optional
+        Precomputed output of ``calculate_all_part_statistics``. When given,
+        the table is built from it directly, bypassing the leaderboard cache.
+        Read through the part statistics cache when omitted.
+        
+    Returns:
+    --------
+    pd.DataFrame
+        One row per part with columns: part_name, avg_demand, growth_rate,
+        volatility, quality_score, trend_strength, data_points
+    """
+    
+    if statistics is not None:
+        return _leaderboard_metrics(statistics)
+    
+    if data_version is None:
+        data_version = compute_data_version(data)
+    
+    key = ('leaderboard', data_version)
+    metrics = _leaderboard_cache.get(key)
+    if metrics is not None:
+        return metrics.copy()
+    
+    metrics = _leaderboard_metrics(
+        _part_statistics_cache.get_statistics(data, data_version=data_version)
+    )
+    _leaderboard_cache.put(key, metrics)
+    
+    return metrics.copy()
+
+
+def _leaderboard_metrics(statistics):
+    """
+    Leaderboard metrics table from per-part statistics.
+    
+    Returns:
+    --------
+    pd.DataFrame
+        One row per part without an error, in the order of ``statistics``
+    """
+    
+    leaderboard_data = []
+    
+    for part, stats in statistics.items():
+        
+        if 'error' not in stats:
+            basic_stats = stats['basic_statistics']
+            trend_stats = stats.get('trend_analysis', {})
+            volatility_stats = stats.get('volatility_analysis', {})
+            quality_stats = stats.get('data_quality', {})
+            
+            leaderboard_entry = {
+                'part_name': part,
+                'avg_demand': round(basic_stats['mean'], 1),
+                'growth_rate': round(trend_stats.get('annual_growth_rate', 0), 2),
+                'volatility': round(volatility_stats.get('overall_coefficient_of_variation', 0), 3),
+                'quality_score': round(quality_stats.get('quality_score', 0), 3),
+                'trend_strength': round(trend_stats.get('r_squared', 0), 3),
+                'data_points': basic_stats['count']
+            }
+            
+            leaderboard_data.append(leaderboard_entry)
+    
+    return pd.DataFrame(leaderboard_data)
+
+
+def rank_leaderboard(metrics, sort_by='avg_demand'):
+    """
+    Rank a leaderboard metrics table and add medal indicators.
+    
+    Parameters:
+    -----------
+    metrics : pd.DataFrame
+        Output of ``build_leaderboard_metrics``; it is not modified
+    sort_by : str
+        Metric to sort by ('avg_demand', 'growth_rate', 'volatility', 'quality_score')
+        
+    Returns:
+    --------
+    pd.DataFrame
+        Leaderboard with rankings and performance metrics
+    """
+    
+    if metrics.empty:
+        return metrics.copy()
+    
+    # Sort by specified metric
+    ascending = sort_by in ['volatility']  # Lower volatility is better
+    leaderboard_df = metrics.sort_values(sort_by, ascending=ascending)
+    
+    # Add rankings and medal indicators
+    leaderboard_df['rank'] = range(1, len(leaderboard_df) + 1)
+    medals = np.full(len(leaderboard_df), '', dtype=object)
+    medals[:3] = ['🥇', '🥈', '🥉'][:len(leaderboard_df)]
+    leaderboard_df['medal'] = medals
+    
+    # Reorder columns
+    column_order = ['rank', 'medal', 'part_name', 'avg_demand', 'growth_rate', 
+                   'volatility', 'quality_score', 'trend_strength', 'data_points']
+    leaderboard_df = leaderboard_df[column_order]
+    
+    return leaderboard_df
+
+
+def calculate_inventory_efficiency_metrics(data, part_configs):
+    """
+    Calculate inventory efficiency metrics for multiple parts.
+    
+    Demand is aggregated per part in one grouped pass and joined against the
+    stock configuration, so the cost grows with the number of rows rather
+    than parts x rows.
+    
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        Historical demand data
+    part_configs : dict or pd.DataFrame
+        Dictionary with part configurations including current stock levels,
+        or a DataFrame with a ``current_stock`` column and the part name in a
+        ``part_name`` column or the index
+        
+    Returns:
+    --------
+    pd.DataFrame
+        DataFrame with efficiency metrics for each part
+    """
+    
+    if isinstance(part_configs, pd.DataFrame):
+        configs = part_configs
+        if 'part_name' not in configs.columns:
+            configs = configs.rename_axis('part_name').reset_index()
+        if 'current_stock' not in configs.columns:
+            configs = configs.assign(current_stock=0)
+        configs = configs[['part_name', 'current_stock']]
+    else:
+        configs = pd.DataFrame({
+            'part_name': list(part_configs.keys()),
+            'current_stock': [config.get('current_stock', 0) for config in part_configs.values()]
+        })
+    configs = configs.assign(current_stock=configs['current_stock'].fillna(0))
+    
+    # Per-part aggregates in one grouped pass
+    codes, parts = pd.factorize(data['part_name'])
+    demand = data['demand'].to_numpy(dtype=float)
+    observed = ~np.isnan(demand)
+    rows = np.bincount(codes[codes >= 0], minlength=len(parts))
+    n_observed = np.bincount(codes[observed], minlength=len(parts))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        avg_demand = np.bincount(codes[observed], demand[observed], len(parts)) / n_observed
+    
+    # Service level estimation (assuming stockouts when demand exceeds daily average)
+    high_demand = observed & (demand > avg_demand[codes] * 1.5)
+    high_demand_days = np.bincount(codes[high_demand], minlength=len(parts))
+    
+    aggregates = pd.DataFrame({
+        'part_name': parts,
+        'avg_demand': avg_demand,
+        'service_level': 1 - high_demand_days / rows
+    })
+    
+    # Parts without demand history are skipped
+    efficiency_df = configs.merge(aggregates, on='part_name', how='inner', sort=False)
+    if efficiency_df.empty:
+        return pd.DataFrame()
+    
+    current_stock = efficiency_df['current_stock'].to_numpy()
+    avg_demand = efficiency_df['avg_demand'].to_numpy()
+    service_level = efficiency_df['service_level'].to_numpy()
+    
+    # Calculate efficiency metrics
+    inventory_turnover = (avg_demand * 365) / np.maximum(current_stock, 1)
+    days_of_inventory = current_stock / np.maximum(avg_demand, 1)
+    
+    return pd.DataFrame({
+        'part_name': efficiency_df['part_name'].to_numpy(),
+        'current_stock': current_stock,
+        'avg_daily_demand': np.round(avg_demand, 1),
+        'inventory_turnover': np.round(inventory_turnover, 2),
+        'days_of_inventory': np.round(days_of_inventory, 1),
+        'estimated_service_level': np.round(service_level, 3),
+        'efficiency_score': np.round((inventory_turnover * service_level) / np.maximum(days_of_inventory, 1), 3)
+    })
+
+
+def generate_comparative_analysis(data, part_name_1, part_name_2, statistics=None):
+    """
+    Generate comparative analysis between two EV parts.
+    
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        Historical demand data
+    part_name_1, part_name_2 : str
+        Names of the parts to compare
+    statistics : dict, optional
+        Precomputed output of ``calculate_all_part_statistics`` for ``data``.
+        Read through the part statistics cache when omitted.
+        
+    Returns:
+    --------
+    dict
+        Comparative analysis results
+    """
+    
+    if statistics is None or part_name_1 not in statistics or part_name_2 not in statistics:
+        statistics = _part_statistics_cache.get_statistics(data, [part_name_1, part_name_2])
+    stats_1 = statistics[part_name_1]
+    stats_2 = statistics[part_name_2]
+    
+    if 'error' in stats_1 or 'error' in stats_2:
+        return {'error': 'Unable to generate comparison due to insufficient data'}
+    
+    # Compare key metrics
+    comparison = {
+        'parts_compared': [part_name_1, part_name_2],
+        'demand_comparison': {
+            'higher_avg_demand': part_name_1 if stats_1['basic_statistics']['mean'] > stats_2['basic_statistics']['mean'] else part_name_2,
+            'demand_difference': abs(stats_1['basic_statistics']['mean'] - stats_2['basic_statistics']['mean']),
+            'demand_ratio': stats_1['basic_statistics']['mean'] / max(stats_2['basic_statistics']['mean'], 1)
+        },
+        'growth_comparison': {
+            'faster_growing': part_name_1 if stats_1['trend_analysis'].get('annual_growth_rate', 0) > stats_2['trend_analysis'].get('annual_growth_rate', 0) else part_name_2,
+            'growth_difference': abs(stats_1['trend_analysis'].get('annual_growth_rate', 0) - stats_2['trend_analysis'].get('annual_growth_rate', 0))
+        },
+        'volatility_comparison': {
+            'more_stable': part_name_1 if stats_1['volatility_analysis']['overall_coefficient_of_variation'] < stats_2['volatility_analysis']['overall_coefficient_of_variation'] else part_name_2,
+            'volatility_difference': abs(stats_1['volatility_analysis']['overall_coefficient_of_variation'] - stats_2['volatility_analysis']['overall_coefficient_of_variation'])
+        }
+    }
+    
+    return comparison
+
+
+def calculate_correlation_matrix(data, method='pearson', part_names=None):
+    """
+    Demand correlation between every pair of EV parts.
+    
+    The demand frame is pivoted once to a (days x parts) matrix on a shared
+    calendar and all pairwise correlations come from a few matrix products.
+    Days a part has no record are skipped pairwise, as in ``DataFrame.corr``;
+    Spearman ranks are taken within the days each pair shares.
+    
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        Historical demand data with columns: part_name, date, demand
+    method : str
+        'pearson' or 'spearman' (Pearson correlation of each part's demand
+        ranks)
+    part_names : list-like, optional
+        Parts to include. Defaults to every part in ``data``.
+        
+    Returns:
+    --------
+    pd.DataFrame
+        Symmetric (parts x parts) correlation matrix
+    """
+    
+    parts, matrix = _correlation_inputs(data, method, part_names)
+    correlation = _correlate(matrix, matrix, method)
+    
+    return pd.DataFrame(correlation, index=parts, columns=parts)
+
+
+def calculate_lagged_correlations(data, lags=range(1, 8), method='pearson', part_names=None):
+    """
+    Lagged cross-correlation of demand for all ordered pairs of parts.
+    
+    For a lag ``L`` the correlation is between ``part_name`` demand on day
+    ``t`` and ``lagged_part`` demand on day ``t + L``, so a strong value means
+    the second part follows the first by ``L`` days.
+    
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        Historical demand data with columns: part_name, date, demand
+    lags : iterable of int
+        Non-negative lags in days
+    method : str
+        'pearson' or 'spearman'
+    part_names : list-like, optional
+        Parts to include. Defaults to every part in ``data``.
+        
+    Returns:
+    --------
+    pd.DataFrame
+        One row per part pair and lag with columns: part_name, lagged_part,
+        lag, correlation
+    """
+    
+    parts, matrix = _correlation_inputs(data, method, part_names)
+    n_parts = len(parts)
+    
+    frames = []
+    for lag in lags:
+        if lag < 0:
+            raise ValueError("Lags must be non-negative")
+        if lag >= len(matrix):
+            continue
+        correlation = _correlate(matrix[:len(matrix) - lag], matrix[lag:], method)
+        frames.append(pd.DataFrame({
+            'part_name': np.repeat(parts.to_numpy(), n_parts),
+            'lagged_part': np.tile(parts.to_numpy(), n_parts),
+            'lag': lag,
+            'correlation': correlation.ravel()
+        }))
+    
+    if not frames:
+        return pd.DataFrame(columns=['part_name', 'lagged_part', 'lag', 'correlation'])
+    return pd.concat(frames, ignore_index=True)
+
+
+def find_correlated_parts(data, k=5, method='pearson', part_names=None, query_parts=None,
+                          block_size=256):
+    """
+    Top-k most correlated parts for each part, without the dense matrix.
+    
+    Correlations are computed for a block of query parts against the whole
+    catalog at a time and only the ``k`` best neighbours of each are kept, so
+    memory is ``block_size x parts`` instead of ``parts x parts``.
+    
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        Historical demand data with columns: part_name, date, demand
+    k : int
+        Number of neighbours per part
+    method : str
+        'pearson' or 'spearman'
+    part_names : list-like, optional
+        Catalog to search. Defaults to every part in ``data``.
+    query_parts : list-like, optional
+        Parts to find neighbours for. Defaults to the whole catalog.
+    block_size : int
+        Number of query parts processed per matrix product
+        
+    Returns:
+    --------
+    pd.DataFrame
+        Columns: part_name, neighbor, correlation, rank (1 = most correlated)
+    """
+    
+    parts, matrix = _correlation_inputs(data, method, part_names)
+    
+    if query_parts is None:
+        queries = np.arange(len(parts))
+    else:
+        queries = parts.get_indexer(pd.unique(np.asarray(query_parts, dtype=object)))
+        queries = queries[queries >= 0]
+    
+    k = min(k, len(parts) - 1)
+    if k <= 0 or len(queries) == 0:
+        return pd.DataFrame(columns=['part_name', 'neighbor', 'correlation', 'rank'])
+    
+    part_codes, neighbor_codes, correlations = [], [], []
+    for start in range(0, len(queries), block_size):
+        block = queries[start:start + block_size]
+        correlation = _correlate(matrix[:, block], matrix, method)
+        correlation[np.arange(len(block)), block] = np.nan
+        
+        scores = np.where(np.isnan(correlation), -np.inf, correlation)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        top = np.take_along_axis(top, np.argsort(-top_scores, axis=1, kind='stable'), axis=1)
+        
+        part_codes.append(np.repeat(block, k))
+        neighbor_codes.append(top.ravel())
+        correlations.append(np.take_along_axis(correlation, top, axis=1).ravel())
+    
+    neighbors = pd.DataFrame({
+        'part_name': parts.to_numpy()[np.concatenate(part_codes)],
+        'neighbor': parts.to_numpy()[np.concatenate(neighbor_codes)],
+        'correlation': np.concatenate(correlations),
+        'rank': np.tile(np.arange(1, k + 1), sum(len(codes) // k for codes in part_codes))
+    })
+    return neighbors.dropna(subset=['correlation']).reset_index(drop=True)
+
+
+def _correlation_inputs(data, method, part_names):
+    """
+    (days x parts) demand matrix for correlation, NaN where a part has no record.
+    """
+    
+    if method not in ('pearson', 'spearman'):
+        raise ValueError(f"Unknown correlation method: {method}")
+    
+    parts, _, values = build_calendar_matrix(data, part_names)
+    return parts, values.T
+
+
+def _correlate(left, right, method):
+    """Correlation of every column of ``left`` with every column of ``right``."""
+    
+    if method == 'spearman':
+        return _spearman_cross_correlation(left, right)
+    return _cross_correlation(left, right)
+
+
+def _spearman_cross_correlation(left, right):
+    """
+    Spearman correlation of every column of ``left`` with every column of ``right``.
+    
+    Ranks are taken within the rows each pair observes, as in
+    ``DataFrame.corr(method='spearman')``. Without missing values every
+    column is ranked once. Otherwise every column is sorted once and its
+    average ranks within any subset of rows come from a cumulative count of
+    the kept rows along the sort order, so each ``left`` column is ranked
+    against all ``right`` columns in a few array passes.
+    """
+    
+    left_valid = ~np.isnan(left)
+    right_valid = ~np.isnan(right)
+    
+    if left_valid.all() and right_valid.all():
+        return _cross_correlation(stats.rankdata(left, axis=0), stats.rankdata(right, axis=0))
+    
+    right_order = np.argsort(right, axis=0, kind='stable')
+    right_sorted = np.take_along_axis(right, right_order, axis=0)
+    right_valid_sorted = np.take_along_axis(right_valid, right_order, axis=0)
+    
+    correlation = np.full((left.shape[1], right.shape[1]), np.nan)
+    patterns, groups = np.unique(left_valid.T, axis=0, return_inverse=True)
+    groups = groups.ravel()
+    
+    for group, pattern in enumerate(patterns):
+        rows = np.flatnonzero(pattern)
+        if len(rows) < 2:
+            continue
+        
+        # Ranks of every right column within the rows it shares with the pattern
+        ranks_sorted = _subset_ranks(right_sorted, right_valid_sorted & pattern[right_order])
+        right_ranks = np.empty_like(ranks_sorted)
+        np.put_along_axis(right_ranks, right_order, ranks_sorted, axis=0)
+        right_ranks = right_ranks[rows]
+        shared = right_valid[rows]
+        
+        for column in np.flatnonzero(groups == group):
+            order = np.argsort(left[rows, column], kind='stable')
+            keep = shared[order]
+            left_ranks = _subset_ranks(left[rows[order], column][:, None], keep)
+            correlation[column] = _rank_correlation(left_ranks, right_ranks[order], keep)
+    
+    return correlation
+
+
+def _subset_ranks(sorted_values, keep):
+    """
+    Average ranks of the kept entries of column-wise sorted values.
+    
+    ``sorted_values`` (rows x columns, or rows x 1 shared by every column)
+    is sorted along the rows. Ranks count only the entries where ``keep`` is
+    True; ties share the mean of their ranks. Entries that are not kept get
+    meaningless values.
+    """
+    
+    n_rows = len(keep)
+    index = np.arange(n_rows)[:, None]
+    boundary = np.ones((n_rows + 1,) + sorted_values.shape[1:], dtype=bool)
+    boundary[1:-1] = sorted_values[1:] != sorted_values[:-1]
+    
+    # First and last row of each run of tied values
+    start = np.maximum.accumulate(np.where(boundary[:-1], index, 0), axis=0)
+    end = np.minimum.accumulate(np.where(boundary[1:], index, n_rows)[::-1], axis=0)[::-1]
+    start = np.broadcast_to(start, keep.shape)
+    end = np.broadcast_to(end, keep.shape)
+    
+    counts = np.zeros((n_rows + 1, keep.shape[1]))
+    np.cumsum(keep, axis=0, out=counts[1:])
+    before = np.take_along_axis(counts, start, axis=0)
+    tied = np.take_along_axis(counts, end + 1, axis=0) - before
+    
+    return before + (tied + 1) / 2
+
+
+def _rank_correlation(left_ranks, right_ranks, keep):
+    """
+    Column-wise Pearson correlation of ranks over the kept rows.
+    
+    Both rank matrices rank the kept rows of each column from 1 to ``n``, so
+    both means are ``(n + 1) / 2``.
+    """
+    
+    n = keep.sum(axis=0)
+    mean = (n + 1) / 2
+    left_centred = np.where(keep, left_ranks - mean, 0)
+    right_centred = np.where(keep, right_ranks - mean, 0)
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        correlation = (left_centred * right_centred).sum(axis=0) / np.sqrt(
+            (left_centred ** 2).sum(axis=0) * (right_centred ** 2).sum(axis=0)
+        )
+    correlation[(n < 2) | ~np.isfinite(correlation)] = np.nan
+    return np.clip(correlation, -1.0, 1.0)
+
+
+def _cross_correlation(left, right):
+    """
+    Pearson correlation of every column of ``left`` with every column of ``right``.
+    
+    Both matrices share their rows (days). Without missing values the columns
+    are standardized and correlated with a single matrix product. With
+    missing values each pair uses only the rows both columns observe, from
+    five products of the masked data. Pairs with fewer than two shared rows
+    or no variance get NaN.
+    """
+    
+    left_valid = ~np.isnan(left)
+    right_valid = ~np.isnan(right)
+    
+    # Centring first keeps the sums below well conditioned
+    left = np.where(left_valid, left - np.nanmean(left, axis=0), 0)
+    right = np.where(right_valid, right - np.nanmean(right, axis=0), 0)
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if left_valid.all() and right_valid.all():
+            left_std = left / np.sqrt((left ** 2).sum(axis=0))
+            right_std = right / np.sqrt((right ** 2).sum(axis=0))
+            correlation = left_std.T @ right_std
+        else:
+            left_mask = left_valid.astype(float)
+            right_mask = right_valid.astype(float)
+            n = left_mask.T @ right_mask
+            sum_left = left.T @ right_mask
+            sum_right = left_mask.T @ right
+            var_left = (left ** 2).T @ right_mask - sum_left ** 2 / n
+            var_right = left_mask.T @ (right ** 2) - sum_right ** 2 / n
+            covariance = left.T @ right - sum_left * sum_right / n
+            correlation = covariance / np.sqrt(var_left * var_right)
+            correlation[n < 2] = np.nan
+    
+    correlation[~np.isfinite(correlation)] = np.nan
+    return np.clip(correlation, -1.0, 1.0)
 
 
 if __name__ == "__main__":
@@ -110,6 +110,51 @@ def generate_inventory_data(part_name, start_date='2021-01-01', years=3,
     return df
 
 
+# EV parts with their demand characteristics and part family
+EV_PARTS_CONFIG = [
+    {
+        "name": "Battery Pack",
+        "family": "Energy Storage",
+        "base_demand": 500,
+        "trend_slope": 25,
+        "seasonality_strength": 150,
+        "noise_level": 50
+    },
+    {
+        "name": "Electric Motor", 
+        "family": "Powertrain",
+        "base_demand": 800,
+        "trend_slope": 40,
+        "seasonality_strength": 200,
+        "noise_level": 80
+    },
+    {
+        "name": "Charging Port",
+        "family": "Charging",
+        "base_demand": 1200,
+        "trend_slope": 60,
+        "seasonality_strength": 300,
+        "noise_level": 120
+    },
+    {
+        "name": "Control Unit",
+        "family": "Powertrain",
+        "base_demand": 600,
+        "trend_slope": 30,
+        "seasonality_strength": 180,
+        "noise_level": 60
+    },
+    {
+        "name": "Cooling System",
+        "family": "Energy Storage",
+        "base_demand": 400,
+        "trend_slope": 20,
+        "seasonality_strength": 120,
+        "noise_level": 40
+    }
+]
+
+
 def generate_all_parts_data():
     """
     Generate synthetic data for all EV parts with realistic parameters.
@@ -120,48 +165,9 @@ def generate_all_parts_data():
         Combined DataFrame with data for all EV parts
     """
     
-    # Define EV parts with their characteristics
-    parts_config = [
-        {
-            "name": "Battery Pack",
-            "base_demand": 500,
-            "trend_slope": 25,
-            "seasonality_strength": 150,
-            "noise_level": 50
-        },
-        {
-            "name": "Electric Motor", 
-            "base_demand": 800,
-            "trend_slope": 40,
-            "seasonality_strength": 200,
-            "noise_level": 80
-        },
-        {
-            "name": "Charging Port",
-            "base_demand": 1200,
-            "trend_slope": 60,
-            "seasonality_strength": 300,
-            "noise_level": 120
-        },
-        {
-            "name": "Control Unit",
-            "base_demand": 600,
-            "trend_slope": 30,
-            "seasonality_strength": 180,
-            "noise_level": 60
-        },
-        {
-            "name": "Cooling System",
-            "base_demand": 400,
-            "trend_slope": 20,
-            "seasonality_strength": 120,
-            "noise_level": 40
-        }
-    ]
-    
     all_data = []
     
-    for part in parts_config:
+    for part in EV_PARTS_CONFIG:
         part_data = generate_inventory_data(
             part_name=part["name"],
             base_demand=part["base_demand"],
@@ -177,6 +183,19 @@ def generate_all_parts_data():
     return combined_data
 
 
+def get_part_families():
+    """
+    Get the family each EV part belongs to.
+    
+    Returns:
+    --------
+    dict
+        Part names mapped to family names (e.g. "Powertrain")
+    """
+    
+    return {part["name"]: part["family"] for part in EV_PARTS_CONFIG}
+
+
 def save_data_to_csv(data, filename="synthetic_parts_demand.csv"):
     """
     Save generated data to CSV file.
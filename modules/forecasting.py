@@ -8,14 +8,26 @@ and other statistical methods for predicting future demand of EV components.
 
 import pandas as pd
 import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from scipy import stats
+from functools import partial
+from scipy import sparse, stats
+import hashlib
+import threading
 import warnings
 
+from .data_generator import get_part_families
+from .kernels import (
+    PartContext, bootstrap_paths, build_calendar_matrix, build_demand_matrix, project_forecast,
+    right_align, rolling_mean_std, sma_forecast_with_residuals, trend_fit
+)
+
 warnings.filterwarnings('ignore')
 
 
-def generate_forecast(data, part_name, window_size=30, forecast_horizon=30):
+def generate_forecast(data, part_name, window_size=30, forecast_horizon=30,
+                      seasonal_factors=None, compact=False):
     """
     Generate demand forecast using Simple Moving Average (SMA) method.
     
@@ -29,13 +41,25 @@ def generate_forecast(data, part_name, window_size=30, forecast_horizon=30):
         Number of days to use for moving average calculation (7-90)
     forecast_horizon : int
         Number of days to forecast into the future (7-90)
+    seasonal_factors : array-like, optional
+        Relative seasonal adjustment for each forecast day, e.g. from
+        ``estimate_seasonal_factors``. Defaults to a simplified annual cycle.
+    compact : bool
+        Return a ``ForecastResult`` (forecast arrays, scalar metrics and views
+        onto the history) instead of the combined DataFrame
         
     Returns:
     --------
-    pd.DataFrame
+    pd.DataFrame or ForecastResult
         DataFrame with historical data, moving averages, and forecasts
     """
     
+    if compact:
+        return forecast_from_context(
+            PartContext.from_data(data, part_name), window_size, forecast_horizon,
+            seasonal_factors
+        )
+    
     # Filter data for the selected part
     part_data = data[data['part_name'] == part_name].copy()
     
@@ -94,21 +118,10 @@ def generate_forecast(data, part_name, window_size=30, forecast_horizon=30):
         trend_slope = 0
         r_value = 0
     
-    # Generate forecast values
-    forecast_values = []
-    for i in range(forecast_horizon):
-        # Base forecast using last SMA with trend adjustment
-        base_forecast = last_sma + (trend_slope * i)
-        
-        # Add some seasonal adjustment (simplified)
-        seasonal_factor = 0.1 * np.sin(2 * np.pi * i / 365.25)
-        
-        forecast_value = base_forecast * (1 + seasonal_factor)
-        
-        # Ensure forecast is not negative
-        forecast_value = max(forecast_value, 0)
-        
-        forecast_values.append(forecast_value)
+    # Generate forecast values for the whole horizon at once
+    forecast_values = project_forecast(
+        last_sma, trend_slope, forecast_horizon, seasonal_factors
+    )
     
     # Create forecast DataFrame
     forecast_df = pd.DataFrame({
@@ -141,141 +154,2046 @@ def generate_forecast(data, part_name, window_size=30, forecast_horizon=30):
     return combined_df
 
 
-def calculate_forecast_accuracy(actual, predicted):
+class ForecastResult:
+    """
+    Compact SMA forecast: forecast arrays plus scalar quality metrics.
+    
+    Returned by ``generate_forecast(..., compact=True)``. The history is kept
+    as ``history_dates`` and ``history_demand`` arrays that are views onto the
+    input data whenever the part's rows are contiguous and already in date
+    order, so no per-row copy of the history is made. Use ``to_frame`` when
+    the combined DataFrame of ``generate_forecast`` is needed.
+    
+    Attributes:
+    -----------
+    part_name : str
+        Name of the EV part
+    window_size : int
+        Moving average window used for the forecast
+    dates : pd.DatetimeIndex
+        Forecast dates
+    forecast, forecast_upper, forecast_lower : np.ndarray
+        Point forecast and confidence interval per forecast day
+    rolling_std : float
+        Rolling standard deviation at the last observed day
+    trend_strength, forecast_confidence : float
+        Forecast quality metrics, as in ``generate_forecast``
+    history_dates, history_demand : np.ndarray
+        Date-sorted history of the part
+    """
+    
+    def __init__(self, part_name, window_size, dates, forecast, forecast_upper,
+                 forecast_lower, rolling_std, trend_strength, forecast_confidence,
+                 history_dates, history_demand):
+        self.part_name = part_name
+        self.window_size = window_size
+        self.dates = dates
+        self.forecast = forecast
+        self.forecast_upper = forecast_upper
+        self.forecast_lower = forecast_lower
+        self.rolling_std = rolling_std
+        self.trend_strength = trend_strength
+        self.forecast_confidence = forecast_confidence
+        self.history_dates = history_dates
+        self.history_demand = history_demand
+    
+    @property
+    def empty(self):
+        """True when the part had no history to forecast from."""
+        return len(self.history_demand) == 0
+    
+    def __repr__(self):
+        return (f"ForecastResult(part_name={self.part_name!r}, "
+                f"history={len(self.history_demand)}, horizon={len(self.forecast)})")
+    
+    def to_frame(self, include_history=True):
+        """
+        Expand into the combined DataFrame layout of ``generate_forecast``.
+        
+        Parameters:
+        -----------
+        include_history : bool
+            Whether to include the historical rows and their moving averages
+            
+        Returns:
+        --------
+        pd.DataFrame
+            Historical and/or forecast rows with the same columns as
+            ``generate_forecast`` (other input columns such as lead_time are
+            not carried over)
+        """
+        
+        if self.empty:
+            return pd.DataFrame()
+        
+        forecast_df = pd.DataFrame({
+            'part_name': self.part_name,
+            'date': self.dates,
+            'demand': np.nan,
+            'sma': np.nan,
+            'sma_short': np.nan,
+            'sma_long': np.nan,
+            'rolling_std': self.rolling_std,
+            'forecast': self.forecast,
+            'forecast_upper': self.forecast_upper,
+            'forecast_lower': self.forecast_lower
+        })
+        
+        if include_history:
+            demand = self.history_demand.astype(float)[None, :]
+            history_df = pd.DataFrame({
+                'part_name': self.part_name,
+                'date': self.history_dates,
+                'demand': self.history_demand,
+                'sma': rolling_mean_std(demand, self.window_size)[0][0],
+                'sma_short': rolling_mean_std(demand, max(7, self.window_size // 2))[0][0],
+                'sma_long': rolling_mean_std(demand, min(90, self.window_size * 2))[0][0],
+                'rolling_std': rolling_mean_std(demand, self.window_size)[1][0],
+                'forecast': np.nan,
+                'forecast_upper': np.nan,
+                'forecast_lower': np.nan
+            })
+            forecast_df = pd.concat([history_df, forecast_df], ignore_index=True)
+        
+        forecast_df['trend_strength'] = self.trend_strength
+        forecast_df['forecast_confidence'] = self.forecast_confidence
+        
+        return forecast_df
+
+
+def forecast_from_context(context, window_size, forecast_horizon, seasonal_factors=None):
+    """
+    Build a ``ForecastResult`` from a part context.
+    
+    The last SMA, rolling std and the trend over the last ``window_size`` SMA
+    values only depend on the final ``2 * window_size - 1`` days, so only
+    those are read from the context's prefix moments and the history itself
+    is not copied.
     """
-    Calculate various forecast accuracy metrics.
+    
+    count = len(context)
+    
+    if count == 0:
+        empty = np.array([])
+        return ForecastResult(
+            context.part_name, window_size, pd.DatetimeIndex([]), empty, empty, empty,
+            np.nan, 0, 0.1, empty, empty
+        )
+    
+    sma, rolling_std = context.rolling_moments(
+        [window_size], min_periods=1, last=2 * window_size - 1
+    )[window_size]
+    last_sma = sma[-1]
+    last_std = rolling_std[-1]
+    
+    trend_slope, r_value = trend_fit(sma[None, :], np.array([count]), window_size)
+    trend_slope, r_value = trend_slope[0], r_value[0]
+    
+    forecast_values = project_forecast(
+        last_sma, trend_slope, forecast_horizon, seasonal_factors
+    )
+    
+    return ForecastResult(
+        part_name=context.part_name,
+        window_size=window_size,
+        dates=pd.date_range(
+            start=pd.Timestamp(context.dates[-1]) + timedelta(days=1),
+            periods=forecast_horizon,
+            freq='D'
+        ),
+        forecast=forecast_values,
+        forecast_upper=forecast_values + (1.96 * last_std),
+        forecast_lower=np.maximum(forecast_values - (1.96 * last_std), 0),
+        rolling_std=last_std,
+        trend_strength=abs(r_value) if r_value else 0,
+        forecast_confidence=min(1.0, max(0.1, abs(r_value))),
+        history_dates=context.dates,
+        history_demand=context.demand
+    )
+
+
+def generate_batch_forecast(data, window_size=30, forecast_horizon=30, part_names=None,
+                            seasonal_factors=None):
+    """
+    Generate SMA demand forecasts for many parts in one vectorized pass.
+    
+    Every part's history is stacked into a right-aligned (parts x days) matrix,
+    so the rolling indicators, trend fit and forecast horizon are computed once
+    for the whole catalog instead of once per part. Each part's block of rows is
+    identical (up to floating point rounding) to ``generate_forecast`` for that
+    part, with the blocks concatenated in part order.
     
     Parameters:
     -----------
-    actual : array-like
-        Actual observed values
-    predicted : array-like
-        Predicted/forecasted values
+    data : pd.DataFrame
+        Historical demand data with columns: part_name, date, demand
+    window_size : int
+        Number of days to use for moving average calculation (7-90)
+    forecast_horizon : int
+        Number of days to forecast into the future (7-90)
+    part_names : list-like, optional
+        Parts to forecast. Defaults to every part in ``data``, in order of
+        first appearance.
+    seasonal_factors : array-like or pd.DataFrame, optional
+        Relative seasonal adjustment per forecast day, shared by all parts, or
+        a DataFrame indexed by part name as returned by
+        ``estimate_seasonal_factors``. Defaults to a simplified annual cycle.
         
     Returns:
     --------
-    dict
-        Dictionary containing accuracy metrics
+    pd.DataFrame
+        Historical data, moving averages and forecasts for all parts
     """
     
-    actual = np.array(actual)
-    predicted = np.array(predicted)
+    parts, values, lengths, history = build_demand_matrix(data, part_names)
     
-    # Remove any NaN values
-    mask = ~(np.isnan(actual) | np.isnan(predicted))
-    actual = actual[mask]
-    predicted = predicted[mask]
+    if len(parts) == 0:
+        return pd.DataFrame()
     
-    if len(actual) == 0:
-        return {}
+    # Rolling indicators for every part at once
+    sma, rolling_std = rolling_mean_std(values, window_size)
+    sma_short, _ = rolling_mean_std(values, max(7, window_size // 2))
+    sma_long, _ = rolling_mean_std(values, min(90, window_size * 2))
     
-    # Calculate metrics
-    mae = np.mean(np.abs(actual - predicted))  # Mean Absolute Error
-    mse = np.mean((actual - predicted) ** 2)   # Mean Squared Error
-    rmse = np.sqrt(mse)                        # Root Mean Squared Error
+    last_sma = sma[:, -1]
+    last_std = rolling_std[:, -1]
+    trend_slope, r_value = trend_fit(sma, lengths, window_size)
     
-    # Mean Absolute Percentage Error
-    mape = np.mean(np.abs((actual - predicted) / np.maximum(actual, 1))) * 100
+    # Forecast horizon as a (parts x horizon) grid
+    if isinstance(seasonal_factors, pd.DataFrame):
+        seasonal_factors = seasonal_factors.reindex(parts).fillna(0).to_numpy()
+    forecast_values = project_forecast(
+        last_sma, trend_slope, forecast_horizon, seasonal_factors
+    )
     
-    # R-squared
-    ss_res = np.sum((actual - predicted) ** 2)
-    ss_tot = np.sum((actual - np.mean(actual)) ** 2)
-    r_squared = 1 - (ss_res / max(ss_tot, 1))
+    # Attach the rolling indicators to the (part, date) sorted history
+    observed = np.arange(values.shape[1]) >= (values.shape[1] - lengths)[:, None]
+    history['sma'] = sma[observed]
+    history['sma_short'] = sma_short[observed]
+    history['sma_long'] = sma_long[observed]
+    history['rolling_std'] = rolling_std[observed]
+    history['forecast'] = np.nan
+    history['forecast_upper'] = np.nan
+    history['forecast_lower'] = np.nan
     
-    return {
-        'MAE': mae,
-        'MSE': mse,
-        'RMSE': rmse,
-        'MAPE': mape,
-        'R_squared': r_squared
-    }
+    last_dates = history.groupby('part_name', sort=False)['date'].max()
+    last_dates = last_dates.reindex(parts).to_numpy()
+    future_dates = (
+        last_dates[:, None] + np.arange(1, forecast_horizon + 1) * np.timedelta64(1, 'D')
+    )
+    
+    forecast_flat = forecast_values.ravel()
+    std_flat = np.repeat(last_std, forecast_horizon)
+    forecast_df = pd.DataFrame({
+        'part_name': np.repeat(parts.to_numpy(), forecast_horizon),
+        'date': future_dates.ravel(),
+        'demand': np.nan,
+        'sma': np.nan,
+        'sma_short': np.nan,
+        'sma_long': np.nan,
+        'rolling_std': std_flat,
+        'forecast': forecast_flat,
+        'forecast_upper': forecast_flat + (1.96 * std_flat),
+        'forecast_lower': np.maximum(forecast_flat - (1.96 * std_flat), 0)
+    })
+    
+    # Interleave so each part's forecast rows follow its own history
+    part_codes = np.concatenate([
+        np.repeat(np.arange(len(parts)), lengths),
+        np.repeat(np.arange(len(parts)), forecast_horizon)
+    ])
+    order = np.argsort(part_codes, kind='stable')
+    combined_df = pd.concat([history, forecast_df], ignore_index=True)
+    combined_df = combined_df.iloc[order].reset_index(drop=True)
+    
+    # Add forecast quality metrics, repeated over each part's rows
+    trend_strength = np.where(r_value != 0, np.abs(r_value), 0)
+    forecast_confidence = np.where(
+        np.isnan(r_value), 0.1, np.clip(np.abs(r_value), 0.1, 1.0)
+    )
+    rows_per_part = lengths + forecast_horizon
+    combined_df['trend_strength'] = np.repeat(trend_strength, rows_per_part)
+    combined_df['forecast_confidence'] = np.repeat(forecast_confidence, rows_per_part)
+    
+    return combined_df
 
 
-def detect_seasonality(data, part_name):
+class IncrementalForecaster:
     """
-    Detect seasonal patterns in demand data.
+    Stateful SMA forecaster for a single part that updates in O(1) per day.
+    
+    Keeps a ring buffer with running sums and sums of squares for each rolling
+    window used by ``generate_forecast`` (``sma``, ``sma_short``, ``sma_long``
+    and ``rolling_std``), plus running regression sums over the last
+    ``window_size`` SMA values for the trend. Appending one observation
+    updates every indicator without rescanning the part's history, and
+    ``forecast`` reproduces the forecast rows of ``generate_forecast``.
     
     Parameters:
     -----------
-    data : pd.DataFrame
-        Historical demand data
     part_name : str
-        Name of the EV part to analyze
+        Name of the EV part being forecast
+    window_size : int
+        Number of days to use for moving average calculation (7-90)
+    """
+    
+    def __init__(self, part_name, window_size=30):
+        self.part_name = part_name
+        self.window_size = window_size
+        self.count = 0
+        self.last_date = None
+        
+        self._sma = _RollingWindow(window_size)
+        self._sma_short = _RollingWindow(max(7, window_size // 2))
+        self._sma_long = _RollingWindow(min(90, window_size * 2))
+        self._trend = _RollingTrend(window_size)
+    
+    @classmethod
+    def from_history(cls, data, part_name, window_size=30):
+        """
+        Seed a forecaster from a part's demand history.
+        
+        Only the trailing observations that still influence the rolling
+        windows and the trend are replayed, so seeding costs O(window_size)
+        regardless of how long the history is.
+        
+        Parameters:
+        -----------
+        data : pd.DataFrame
+            Historical demand data with columns: part_name, date, demand
+        part_name : str
+            Name of the EV part to forecast
+        window_size : int
+            Number of days to use for moving average calculation (7-90)
+            
+        Returns:
+        --------
+        IncrementalForecaster
+            Forecaster positioned at the last observed day
+        """
+        
+        part_data = data[data['part_name'] == part_name]
+        forecaster = cls(part_name, window_size)
+        
+        if part_data.empty:
+            return forecaster
+        
+        part_data = part_data.sort_values('date')
+        forecaster._replay(
+            part_data['demand'].to_numpy(dtype=float),
+            pd.to_datetime(part_data['date'].iloc[-1])
+        )
+        return forecaster
+    
+    def _replay(self, demand, last_date):
+        """Replay the tail of a sorted demand history into the rolling state."""
+        
+        lookback = max(2 * self.window_size - 1, self._sma_long.size)
+        start = max(0, len(demand) - lookback)
+        
+        # Observations before the replayed tail only count towards the total
+        self.count = start
+        for value in demand[start:]:
+            self.update(value)
+        self.last_date = last_date
+    
+    def update(self, demand, date=None):
+        """
+        Append one day of demand and update all rolling indicators.
+        
+        Parameters:
+        -----------
+        demand : float
+            Observed demand for the day
+        date : datetime-like, optional
+            Date of the observation. Defaults to the day after the last one.
+            
+        Returns:
+        --------
+        dict
+            Indicators for the new day: sma, sma_short, sma_long, rolling_std
+        """
+        
+        self._sma.push(demand)
+        self._sma_short.push(demand)
+        self._sma_long.push(demand)
+        self._trend.push(self._sma.mean())
+        self.count += 1
+        
+        if date is not None:
+            self.last_date = pd.to_datetime(date)
+        elif self.last_date is not None:
+            self.last_date = self.last_date + timedelta(days=1)
+        
+        return self.indicators()
+    
+    def indicators(self):
+        """
+        Current values of the rolling indicators.
+        
+        Returns:
+        --------
+        dict
+            sma, sma_short, sma_long and rolling_std for the last day
+        """
+        
+        return {
+            'sma': self._sma.mean(),
+            'sma_short': self._sma_short.mean(),
+            'sma_long': self._sma_long.mean(),
+            'rolling_std': self._sma.std()
+        }
+    
+    def forecast(self, forecast_horizon=30, seasonal_factors=None):
+        """
+        Forecast from the current rolling state.
+        
+        Parameters:
+        -----------
+        forecast_horizon : int
+            Number of days to forecast into the future (7-90)
+        seasonal_factors : array-like, optional
+            Relative seasonal adjustment for each forecast day, e.g. from
+            ``estimate_seasonal_factors``. Defaults to a simplified annual cycle.
+            
+        Returns:
+        --------
+        pd.DataFrame
+            Forecast rows with the same columns and values as the forecast
+            part of ``generate_forecast``
+        """
+        
+        if self.count == 0:
+            return pd.DataFrame()
+        
+        last_sma = self._sma.mean()
+        last_std = self._sma.std()
+        
+        if self.count >= self.window_size:
+            trend_slope, r_value = self._trend.fit()
+        else:
+            trend_slope = 0
+            r_value = 0
+        
+        forecast_values = project_forecast(
+            last_sma, trend_slope, forecast_horizon, seasonal_factors
+        )
+        
+        forecast_df = pd.DataFrame({
+            'part_name': self.part_name,
+            'date': pd.date_range(
+                start=self.last_date + timedelta(days=1),
+                periods=forecast_horizon,
+                freq='D'
+            ),
+            'demand': np.nan,
+            'sma': np.nan,
+            'sma_short': np.nan,
+            'sma_long': np.nan,
+            'rolling_std': last_std,
+            'forecast': forecast_values
+        })
+        
+        forecast_df['forecast_upper'] = forecast_df['forecast'] + (1.96 * last_std)
+        forecast_df['forecast_lower'] = forecast_df['forecast'] - (1.96 * last_std)
+        forecast_df['forecast_lower'] = forecast_df['forecast_lower'].clip(lower=0)
+        
+        forecast_df['trend_strength'] = abs(r_value) if r_value else 0
+        forecast_df['forecast_confidence'] = min(1.0, max(0.1, abs(r_value)))
+        
+        return forecast_df
+
+
+def create_incremental_forecasters(data, window_size=30):
+    """
+    Seed an ``IncrementalForecaster`` for every part in the data.
+    
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        Historical demand data with columns: part_name, date, demand
+    window_size : int
+        Number of days to use for moving average calculation (7-90)
         
     Returns:
     --------
     dict
-        Dictionary containing seasonality information
+        Part names mapped to forecasters positioned at their last observed day
     """
     
-    part_data = data[data['part_name'] == part_name].copy()
+    forecasters = {}
     
-    if len(part_data) < 30:
-        return {'seasonal': False, 'pattern': 'insufficient_data'}
+    for part_name, part_data in data.sort_values('date').groupby('part_name', sort=False):
+        forecaster = IncrementalForecaster(part_name, window_size)
+        forecaster._replay(
+            part_data['demand'].to_numpy(dtype=float),
+            pd.to_datetime(part_data['date'].iloc[-1])
+        )
+        forecasters[part_name] = forecaster
     
-    part_data['date'] = pd.to_datetime(part_data['date'])
-    part_data = part_data.sort_values('date')
+    return forecasters
+
+
+class _RollingWindow:
+    """
+    Fixed-size ring buffer with running sum and sum of squares.
     
-    # Extract time components
-    part_data['month'] = part_data['date'].dt.month
-    part_data['weekday'] = part_data['date'].dt.weekday
-    part_data['day_of_year'] = part_data['date'].dt.dayofyear
+    Values are stored relative to the first observation to limit cancellation
+    in the variance, and the sums are rebuilt from the buffer once per full
+    rotation so floating point drift cannot accumulate (amortised O(1)).
+    """
     
-    # Test for monthly seasonality
-    monthly_means = part_data.groupby('month')['demand'].mean()
-    monthly_cv = monthly_means.std() / monthly_means.mean()
+    def __init__(self, size):
+        self.size = size
+        self._buffer = np.zeros(size)
+        self._position = 0
+        self._count = 0
+        self._evictions = 0
+        self._shift = None
+        self._sum = 0.0
+        self._sum_sq = 0.0
     
-    # Test for weekly seasonality
-    weekly_means = part_data.groupby('weekday')['demand'].mean()
-    weekly_cv = weekly_means.std() / weekly_means.mean()
+    def push(self, value):
+        if self._shift is None:
+            self._shift = float(value)
+        value = float(value) - self._shift
+        
+        if self._count == self.size:
+            old = self._buffer[self._position]
+            self._sum -= old
+            self._sum_sq -= old * old
+            self._evictions += 1
+        else:
+            self._count += 1
+        
+        self._buffer[self._position] = value
+        self._position = (self._position + 1) % self.size
+        self._sum += value
+        self._sum_sq += value * value
+        
+        if self._evictions >= self.size:
+            self._sum = self._buffer.sum()
+            self._sum_sq = np.dot(self._buffer, self._buffer)
+            self._evictions = 0
     
-    # Determine seasonality
-    is_seasonal = monthly_cv > 0.1 or weekly_cv > 0.05
+    def mean(self):
+        if self._count == 0:
+            return np.nan
+        return self._sum / self._count + self._shift
     
-    if monthly_cv > weekly_cv:
-        pattern = 'monthly'
-        strength = monthly_cv
-    else:
-        pattern = 'weekly'
-        strength = weekly_cv
+    def std(self):
+        if self._count < 2:
+            return np.nan
+        n = self._count
+        variance = max(self._sum_sq - self._sum * self._sum / n, 0) / (n - 1)
+        return np.sqrt(variance)
+
+
+class _RollingTrend:
+    """
+    Running least-squares fit of the last ``size`` values against 0..size-1.
     
-    return {
-        'seasonal': is_seasonal,
-        'pattern': pattern,
-        'strength': strength,
-        'monthly_cv': monthly_cv,
-        'weekly_cv': weekly_cv
-    }
+    Sliding the window re-indexes x in O(1): dropping ``y_0`` and appending
+    ``y_new`` turns ``sum(x * y)`` into ``sum(x * y) - (sum(y) - y_0) +
+    (size - 1) * y_new``.
+    """
+    
+    def __init__(self, size):
+        self.size = size
+        self._values = _RollingWindow(size)
+        self._sum_xy = 0.0
+    
+    def push(self, value):
+        window = self._values
+        if window._shift is None:
+            window._shift = float(value)
+        shifted = float(value) - window._shift
+        
+        if window._count == self.size:
+            oldest = window._buffer[window._position]
+            self._sum_xy += -(window._sum - oldest) + (self.size - 1) * shifted
+        else:
+            self._sum_xy += window._count * shifted
+        
+        window.push(value)
+        
+        if window._evictions == 0 and window._count == self.size:
+            # Rebuild alongside the window sums to keep drift bounded
+            ordered = np.roll(window._buffer, -window._position)
+            self._sum_xy = np.dot(np.arange(self.size), ordered)
+    
+    def fit(self):
+        """Return (slope, r_value) in the same convention as stats.linregress."""
+        
+        window = self._values
+        n = window._count
+        x_mean = (n - 1) / 2
+        y_mean = window._sum / n
+        
+        ssxm = (n * n - 1) / 12
+        ssxym = self._sum_xy / n - x_mean * y_mean
+        ssym = max(window._sum_sq / n - y_mean * y_mean, 0)
+        
+        if ssym == 0:
+            r_value = np.nan if ssxym == 0 else 0.0
+        else:
+            r_value = min(1.0, max(-1.0, ssxym / np.sqrt(ssxm * ssym)))
+        
+        return ssxym / ssxm, r_value
 
 
-def generate_advanced_forecast(data, part_name, method='sma', **kwargs):
+def generate_probabilistic_forecast(data, window_size=30, forecast_horizon=30,
+                                    quantiles=(0.1, 0.5, 0.9, 0.99), n_simulations=2000,
+                                    part_names=None, memory_budget_mb=256, random_seed=None):
     """
-    Generate advanced forecasts using multiple methods.
+    Generate quantile forecasts from residual-bootstrap sample paths.
+    
+    Thousands of demand paths per part are simulated as one array operation
+    around the SMA point forecast. Each day's shock is resampled from the
+    part's historical one-step SMA errors, and earlier simulated deviations
+    feed back through the moving average, so the bands widen with the
+    horizon instead of staying at a constant ``1.96 * std``.
     
     Parameters:
     -----------
     data : pd.DataFrame
-        Historical demand data
-    part_name : str
-        Name of the EV part to forecast
+        Historical demand data with columns: part_name, date, demand
+    window_size : int
+        Number of days to use for moving average calculation (7-90)
+    forecast_horizon : int
+        Number of days to forecast into the future (7-90)
+    quantiles : sequence of float
+        Quantiles to report for every horizon day
+    n_simulations : int
+        Number of sample paths per part
+    part_names : list-like, optional
+        Parts to forecast. Defaults to every part in ``data``.
+    memory_budget_mb : float
+        Approximate cap on the memory held by simulated paths. Parts are
+        simulated in chunks that fit the budget (at least one part at a time).
+    random_seed : int, optional
+        Seed for reproducible simulations
+        
+    Returns:
+    --------
+    pd.DataFrame
+        One row per part and forecast day with the point forecast and one
+        column per quantile, named like ``p10``, ``p50``, ``p99``
+    """
+    
+    parts, values, lengths, history = build_demand_matrix(data, part_names)
+    
+    if len(parts) == 0:
+        return pd.DataFrame()
+    
+    point, residuals = sma_forecast_with_residuals(
+        values, lengths, window_size, forecast_horizon
+    )
+    
+    rng = np.random.default_rng(random_seed)
+    quantiles = np.asarray(quantiles, dtype=float)
+    bands = np.empty((len(quantiles), len(parts), forecast_horizon))
+    
+    # Paths plus sorting workspace for quantiles, per part
+    bytes_per_part = 2 * n_simulations * forecast_horizon * 8
+    chunk_size = max(1, int(memory_budget_mb * 1024 * 1024 // bytes_per_part))
+    
+    for start in range(0, len(parts), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        paths = bootstrap_paths(
+            point[chunk], residuals[chunk], window_size, n_simulations, rng
+        )
+        bands[:, chunk] = np.quantile(paths, quantiles, axis=1)
+        del paths
+    
+    last_dates = history.groupby('part_name', sort=False)['date'].max()
+    last_dates = last_dates.reindex(parts).to_numpy()
+    future_dates = (
+        last_dates[:, None] + np.arange(1, forecast_horizon + 1) * np.timedelta64(1, 'D')
+    )
+    
+    result = pd.DataFrame({
+        'part_name': np.repeat(parts.to_numpy(), forecast_horizon),
+        'date': future_dates.ravel(),
+        'forecast': point.ravel()
+    })
+    for quantile, band in zip(quantiles, bands):
+        result[f'p{quantile * 100:g}'] = band.ravel()
+    
+    return result
+
+
+def generate_hierarchical_forecast(data, window_size=30, forecast_horizon=30,
+                                   part_families=None, method='mint'):
+    """
+    Generate coherent forecasts for parts, part families and the whole catalog.
+    
+    Daily demand is aggregated up the part -> family -> total hierarchy with a
+    sparse summing matrix, every series is forecast by the batch SMA kernel,
+    and the base forecasts are reconciled so each family forecast equals the
+    sum of its parts and the total equals the sum of its families.
+    
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        Historical demand data with columns: part_name, date, demand
+    window_size : int
+        Number of days to use for moving average calculation (7-90)
+    forecast_horizon : int
+        Number of days to forecast into the future (7-90)
+    part_families : dict, optional
+        Part names mapped to family names. Defaults to the families of the
+        standard EV parts; parts without a family are grouped as "Other".
     method : str
-        Forecasting method ('sma', 'exponential', 'trend')
-    **kwargs : dict
-        Additional parameters for forecasting methods
+        Reconciliation method: 'bottom_up' (sum the part forecasts), 'ols'
+        (equal weights) or 'mint' (weights from each series' one-step
+        forecast error variance)
         
     Returns:
     --------
     pd.DataFrame
-        DataFrame with forecast results
+        One row per series and forecast day with columns: level, node, date,
+        base_forecast, reconciled_forecast
     """
     
-    if method == 'sma':
-        return generate_forecast(data, part_name, **kwargs)
+    if method not in ('bottom_up', 'ols', 'mint'):
+        raise ValueError(f"Unknown reconciliation method: {method}")
     
-    # Placeholder for additional forecasting methods
-    # Can be extended with exponential smoothing, ARIMA, etc.
+    parts, dates, values = build_calendar_matrix(data)
     
-    return generate_forecast(data, part_name, **kwargs)
+    if len(parts) == 0:
+        return pd.DataFrame()
+    
+    if part_families is None:
+        part_families = get_part_families()
+    families = pd.Series(parts, index=parts).map(part_families).fillna('Other')
+    summing, nodes, levels = _summing_matrix(families)
+    
+    # Aggregate every level in one sparse product; a day is missing only
+    # when none of the node's parts has an observation
+    observed = ~np.isnan(values)
+    totals = summing @ np.where(observed, values, 0)
+    counts = summing @ observed.astype(float)
+    node_values = np.where(counts > 0, totals, np.nan)
+    
+    # The SMA kernel reads each series from the right, so a part whose
+    # history ends before the last calendar date is shifted to the end
+    node_values, lengths = right_align(node_values)
+    base, residuals = sma_forecast_with_residuals(
+        node_values, lengths, window_size, forecast_horizon
+    )
+    
+    # A series without a finite base forecast gets practically no weight,
+    # so it cannot spread NaN to every other node
+    usable = np.isfinite(base).all(axis=1)
+    
+    n_parts = len(parts)
+    if method == 'bottom_up':
+        bottom = base[-n_parts:]
+        reconciled = summing @ np.where(usable[-n_parts:, None], bottom, 0)
+        reconciled[-n_parts:] = bottom
+    else:
+        if method == 'ols':
+            variance = np.ones(len(nodes))
+        else:
+            variance = _residual_variance(residuals)
+        variance = np.where(usable, variance, variance[usable].max(initial=1.0) * 1e6)
+        bottom = _reconcile_bottom(
+            summing, np.where(usable[:, None], base, 0), variance, n_parts
+        )
+        reconciled = summing @ bottom
+    
+    future_dates = dates[-1] + np.arange(1, forecast_horizon + 1) * np.timedelta64(1, 'D')
+    
+    return pd.DataFrame({
+        'level': np.repeat(levels, forecast_horizon),
+        'node': np.repeat(nodes, forecast_horizon),
+        'date': np.tile(future_dates, len(nodes)),
+        'base_forecast': base.ravel(),
+        'reconciled_forecast': reconciled.ravel()
+    })
+
+
+def _summing_matrix(families):
+    """
+    Sparse summing matrix for a total -> family -> part hierarchy.
+    
+    Rows are ordered total, families (in order of first appearance), then one
+    identity row per part, so ``S @ part_values`` stacks every level.
+    """
+    
+    family_codes, family_names = pd.factorize(families.to_numpy())
+    n_parts = len(families)
+    
+    summing = sparse.vstack([
+        sparse.csr_matrix(np.ones((1, n_parts))),
+        sparse.csr_matrix(
+            (np.ones(n_parts), (family_codes, np.arange(n_parts))),
+            shape=(len(family_names), n_parts)
+        ),
+        sparse.identity(n_parts, format='csr')
+    ]).tocsr()
+    
+    nodes = np.concatenate([['Total'], family_names, families.index.to_numpy()])
+    levels = np.array(
+        ['total'] + ['family'] * len(family_names) + ['part'] * n_parts, dtype=object
+    )
+    return summing, nodes.astype(object), levels
+
+
+def _residual_variance(residuals):
+    """
+    One-step forecast error variance per series, for MinT weights.
+    
+    Series without usable residuals, or with zero variance, fall back to the
+    mean of the other variances so the weight matrix stays invertible.
+    """
+    
+    counts = (~np.isnan(residuals)).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        variance = np.nansum(residuals ** 2, axis=1) / counts
+    usable = np.isfinite(variance) & (variance > 0)
+    fallback = variance[usable].mean() if usable.any() else 1.0
+    return np.where(usable, variance, fallback)
+
+
+def _reconcile_bottom(summing, base, variance, n_parts):
+    """
+    Reconciled bottom-level forecasts ``(S' W^-1 S)^-1 S' W^-1 y`` for diagonal W.
+    
+    With ``S = [A; I]`` the normal matrix is ``D + A' C A`` where ``C`` and
+    ``D`` are the inverse variances of the aggregate and part series. The
+    Woodbury identity turns its inverse into a solve against the small
+    (aggregates x aggregates) matrix ``C^-1 + A D^-1 A'``, so the cost stays
+    linear in the number of parts.
+    """
+    
+    aggregate = summing[:-n_parts]
+    aggregate_var = variance[:-n_parts]
+    part_var = variance[-n_parts:]
+    
+    rhs = aggregate.T @ (base[:-n_parts] / aggregate_var[:, None])
+    rhs += base[-n_parts:] / part_var[:, None]
+    
+    # x = D^-1 r - D^-1 A' (C^-1 + A D^-1 A')^-1 A D^-1 r
+    scaled = part_var[:, None] * rhs
+    inner = (aggregate @ sparse.diags(part_var) @ aggregate.T).toarray()
+    inner[np.diag_indices_from(inner)] += aggregate_var
+    correction = np.linalg.solve(inner, aggregate @ scaled)
+    
+    return scaled - part_var[:, None] * (aggregate.T @ correction)
+
+
+def compute_data_version(data):
+    """
+    Compute a content hash identifying a version of the demand data.
+    
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        Historical demand data
+        
+    Returns:
+    --------
+    str
+        Hex digest that changes whenever any value in the data changes
+    """
+    
+    row_hashes = pd.util.hash_pandas_object(data, index=False).to_numpy()
+    return hashlib.blake2b(row_hashes.tobytes(), digest_size=16).hexdigest()
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache for DataFrame results with a bounded byte budget.
+    
+    Entries are evicted least-recently-used first once the total memory of the
+    cached DataFrames exceeds ``max_bytes``. Results larger than the whole
+    budget are returned but never stored.
+    
+    Parameters:
+    -----------
+    max_bytes : int
+        Upper bound on the memory held by cached results
+    """
+    
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """Return the cached value for ``key`` or None, updating counters."""
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def put(self, key, value):
+        """Store ``value`` under ``key``, evicting old entries as needed."""
+        
+        size = int(value.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            return
+        
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+    
+    def clear(self):
+        """Drop all entries and reset the hit/miss counters."""
+        
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = 0
+            self.misses = 0
+    
+    def stats(self):
+        """
+        Cache usage statistics.
+        
+        Returns:
+        --------
+        dict
+            entries, current_bytes, max_bytes, hits, misses and hit_rate
+        """
+        
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'current_bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups > 0 else 0
+            }
+
+
+class ForecastCache(LRUCache):
+    """
+    LRU cache for forecast results, keyed by part, window, horizon and data
+    version (see ``generate_cached_forecast``).
+    
+    Parameters:
+    -----------
+    max_bytes : int
+        Upper bound on the memory held by cached forecasts
+    """
+
+
+# Process-wide cache shared by the Streamlit app and the API server
+_forecast_cache = ForecastCache()
+
+
+def get_forecast_cache():
+    """Return the process-wide forecast cache."""
+    
+    return _forecast_cache
+
+
+def generate_cached_forecast(data, part_name, window_size=30, forecast_horizon=30,
+                             data_version=None, cache=None):
+    """
+    Generate a forecast through the forecast cache.
+    
+    Results are keyed by part, window, horizon and data version, so repeated
+    calls with unchanged inputs skip the computation entirely.
+    
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        Historical demand data with columns: part_name, date, demand
+    part_name : str
+        Name of the EV part to forecast
+    window_size : int
+        Number of days to use for moving average calculation (7-90)
+    forecast_horizon : int
+        Number of days to forecast into the future (7-90)
+    data_version : str, optional
+        Identifier of the data contents. Computed with ``compute_data_version``
+        when omitted; pass it in to avoid rehashing the data on every call.
+    cache : ForecastCache, optional
+        Cache to use. Defaults to the process-wide cache.
+        
+    Returns:
+    --------
+    pd.DataFrame
+        Same result as ``generate_forecast``; callers receive their own copy
+    """
+    
+    if cache is None:
+        cache = _forecast_cache
+    if data_version is None:
+        data_version = compute_data_version(data)
+    
+    key = (part_name, window_size, forecast_horizon, data_version)
+    forecast_df = cache.get(key)
+    
+    if forecast_df is None:
+        forecast_df = generate_forecast(data, part_name, window_size, forecast_horizon)
+        cache.put(key, forecast_df)
+    
+    return forecast_df.copy()
+
+
+def calculate_forecast_accuracy(actual, predicted):
+    """
+    Calculate various forecast accuracy metrics.
+    
+    Parameters:
+    -----------
+    actual : array-like
+        Actual observed values
+    predicted : array-like
+        Predicted/forecasted values
+        
+    Returns:
+    --------
+    dict
+        Dictionary containing accuracy metrics
+    """
+    
+    actual = np.array(actual)
+    predicted = np.array(predicted)
+    
+    # Remove any NaN values
+    mask = ~(np.isnan(actual) | np.isnan(predicted))
+    actual = actual[mask]
+    predicted = predicted[mask]
+    
+    if len(actual) == 0:
+        return {}
+    
+    return {name: value[()] for name, value in _accuracy_metrics(actual, predicted).items()}
+
+
+def _accuracy_metrics(actual, predicted):
+    """
+    Forecast accuracy metrics along the last axis, ignoring NaN pairs.
+    
+    Shares its definitions with ``calculate_forecast_accuracy`` so backtests
+    score many (part, origin) windows in one array operation.
+    """
+    
+    mask = ~(np.isnan(actual) | np.isnan(predicted))
+    counts = mask.sum(axis=-1)
+    error = np.where(mask, actual - predicted, 0)
+    safe_actual = np.where(mask, actual, 0)
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mae = np.abs(error).sum(axis=-1) / counts               # Mean Absolute Error
+        mse = (error ** 2).sum(axis=-1) / counts                # Mean Squared Error
+        rmse = np.sqrt(mse)                                     # Root Mean Squared Error
+        
+        # Mean Absolute Percentage Error
+        mape = (np.abs(error) / np.maximum(safe_actual, 1)).sum(axis=-1) / counts * 100
+        
+        # R-squared
+        actual_mean = safe_actual.sum(axis=-1, keepdims=True) / counts[..., None]
+        ss_res = (error ** 2).sum(axis=-1)
+        ss_tot = (np.where(mask, actual - actual_mean, 0) ** 2).sum(axis=-1)
+        r_squared = 1 - (ss_res / np.maximum(ss_tot, 1))
+    
+    return {
+        'MAE': mae,
+        'MSE': mse,
+        'RMSE': rmse,
+        'MAPE': mape,
+        'R_squared': r_squared
+    }
+
+
+def backtest_forecast(data, window_sizes=(30,), forecast_horizon=30, n_origins=12,
+                      origin_step=None, methods=('sma',), part_names=None, n_jobs=1,
+                      chunk_size=500, season_length=7):
+    """
+    Rolling-origin backtest of forecasting methods across many parts.
+    
+    Origins are placed every ``origin_step`` days going back from the end of
+    each part's history, and every method forecasts ``forecast_horizon`` days
+    from each origin using only the data before it. Nothing is refitted per
+    origin: SMA forecasts come from prefix sums over one rolling pass, and
+    exponential smoothing parameters are chosen once on the data before the
+    earliest origin and then run through the series in a single pass that
+    records the state at each origin.
+    
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        Historical demand data with columns: part_name, date, demand
+    window_sizes : sequence of int
+        SMA window sizes to evaluate
+    forecast_horizon : int
+        Number of days forecast from each origin
+    n_origins : int
+        Number of forecast origins per part
+    origin_step : int, optional
+        Days between consecutive origins. Defaults to ``forecast_horizon``.
+    methods : sequence of str
+        Methods to evaluate: 'sma', 'exponential' and/or 'trend'
+    part_names : list-like, optional
+        Parts to evaluate. Defaults to every part in ``data``.
+    n_jobs : int
+        Number of worker processes. 1 runs in the current process.
+    chunk_size : int
+        Number of parts per task submitted to the process pool
+    season_length : int
+        Seasonal cycle used by the exponential smoothing methods
+        
+    Returns:
+    --------
+    pd.DataFrame
+        One row per part, method, window size and origin with columns:
+        part_name, method, window_size, cutoff, MAE, RMSE, MAPE
+    """
+    
+    parts, values, lengths, history = build_demand_matrix(data, part_names)
+    
+    if len(parts) == 0:
+        return pd.DataFrame()
+    
+    n_days = values.shape[1]
+    step = origin_step or forecast_horizon
+    origins = n_days - forecast_horizon - step * np.arange(n_origins)[::-1]
+    origins = origins[origins >= 1]
+    
+    chunks = [
+        values[start:start + chunk_size] for start in range(0, len(parts), chunk_size)
+    ]
+    task = partial(
+        _backtest_chunk,
+        window_sizes=tuple(window_sizes),
+        forecast_horizon=forecast_horizon,
+        origins=origins,
+        methods=tuple(methods),
+        season_length=season_length
+    )
+    
+    if n_jobs == 1 or len(chunks) == 1:
+        results = [task(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            results = list(executor.map(task, chunks))
+    
+    # Cutoff date of each (part, origin): the last day used for fitting
+    first = n_days - lengths
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    offsets = origins[None, :] - 1 - first[:, None]
+    dates = history['date'].to_numpy()
+    cutoffs = dates[starts[:, None] + np.clip(offsets, 0, lengths[:, None] - 1)]
+    
+    frames = []
+    for key in results[0]:
+        metrics = np.concatenate([result[key] for result in results], axis=0)
+        valid = (offsets >= 0) & ~np.isnan(metrics[..., 0])
+        part_index, origin_index = np.nonzero(valid)
+        method, window_size = key
+        frames.append(pd.DataFrame({
+            'part_name': parts.to_numpy()[part_index],
+            'method': method,
+            'window_size': window_size,
+            'cutoff': cutoffs[part_index, origin_index],
+            'MAE': metrics[part_index, origin_index, 0],
+            'RMSE': metrics[part_index, origin_index, 1],
+            'MAPE': metrics[part_index, origin_index, 2]
+        }))
+    
+    return pd.concat(frames, ignore_index=True)
+
+
+def select_best_window_sizes(backtest_results, metric='MAPE'):
+    """
+    Pick the SMA window size with the lowest average backtest error per part.
+    
+    Parameters:
+    -----------
+    backtest_results : pd.DataFrame
+        Output of ``backtest_forecast``
+    metric : str
+        Error metric to minimise ('MAE', 'RMSE' or 'MAPE')
+        
+    Returns:
+    --------
+    pd.DataFrame
+        One row per part with the best window_size and its mean error
+    """
+    
+    sma_results = backtest_results[backtest_results['method'] == 'sma']
+    mean_error = (
+        sma_results.groupby(['part_name', 'window_size'], sort=False)[metric]
+        .mean()
+        .reset_index()
+    )
+    best = mean_error.loc[mean_error.groupby('part_name', sort=False)[metric].idxmin()]
+    return best.reset_index(drop=True)
+
+
+def _backtest_chunk(values, window_sizes, forecast_horizon, origins, methods, season_length):
+    """
+    Backtest every method on one chunk of the demand matrix.
+    
+    Returns a dict mapping (method, window_size) to a (parts x origins x 3)
+    array of MAE, RMSE and MAPE.
+    """
+    
+    n_parts, n_days = values.shape
+    horizon_index = origins[:, None] + np.arange(forecast_horizon)
+    actual = values[:, horizon_index]
+    
+    results = {}
+    
+    for method in methods:
+        if method == 'sma':
+            for window_size in window_sizes:
+                predicted = _sma_origin_forecasts(values, window_size, origins, forecast_horizon)
+                results[(method, window_size)] = _stack_metrics(actual, predicted)
+        
+        elif method in ('exponential', 'trend'):
+            seasonal = method == 'exponential'
+            
+            # Choose parameters once, on the data before the earliest origin
+            params = fit_exponential_smoothing(
+                values[:, :origins.min()],
+                forecast_horizon=1,
+                season_length=season_length,
+                seasonal=seasonal
+            )
+            init = _holt_winters_init(values, season_length, seasonal)
+            fitted_params = [
+                np.nan_to_num(params[name])[:, None] for name in ('alpha', 'beta', 'gamma')
+            ]
+            state = _holt_winters_pass(
+                values, init, *fitted_params, season_length, snapshots=origins
+            )['snapshots']
+            
+            predicted = _holt_winters_project(
+                state['level'][..., 0],
+                state['trend'][..., 0],
+                state['season'][:, :, 0],
+                origins[None, :] - 1 - init['first'][:, None],
+                forecast_horizon
+            )
+            # Origins inside the two initialisation seasons have no fitted state
+            warmup = (origins[None, :] - init['first'][:, None]) < 2 * season_length
+            predicted[np.isnan(params['alpha'])] = np.nan
+            predicted[warmup] = np.nan
+            results[(method, None)] = _stack_metrics(actual, predicted)
+        
+        else:
+            raise ValueError(f"Unknown forecasting method: {method}")
+    
+    return results
+
+
+def _sma_origin_forecasts(values, window_size, origins, forecast_horizon):
+    """
+    SMA forecasts from many origins using prefix sums.
+    
+    The rolling mean at any day only looks backwards, so one rolling pass
+    serves every origin. The trend regression over the last ``window_size``
+    SMA values at each origin is read from prefix sums of ``sma`` and
+    ``k * sma``, giving the same result as ``generate_forecast`` on the data
+    truncated at that origin.
+    """
+    
+    n_parts, n_days = values.shape
+    first = n_days - (~np.isnan(values)).sum(axis=1)
+    sma, _ = rolling_mean_std(values, window_size)
+    
+    # Centre on the row mean so the prefix sums keep their precision
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        row_mean = np.nan_to_num(np.nanmean(sma, axis=1, keepdims=True))
+    y = np.where(np.isnan(sma), 0, sma - row_mean)
+    k = np.arange(n_days)
+    
+    def prefix(array):
+        return np.concatenate([np.zeros((n_parts, 1)), np.cumsum(array, axis=1)], axis=1)
+    
+    sum_y, sum_ky = prefix(y), prefix(k * y)
+    
+    upper = origins[None, :]
+    lower = np.maximum(upper - window_size, 0)
+    rows = np.arange(n_parts)[:, None]
+    s_y = sum_y[rows, upper] - sum_y[rows, lower]
+    s_xy = (sum_ky[rows, upper] - sum_ky[rows, lower]) - lower * s_y
+    
+    # Slope of linregress(range(w), sma[origin - w:origin])
+    w = window_size
+    eligible = (upper - first[:, None]) >= w
+    if w > 1:
+        ssxym = s_xy / w - (w - 1) / 2 * (s_y / w)
+        slope = np.where(eligible, ssxym / ((w * w - 1) / 12), 0)
+    else:
+        slope = np.zeros(eligible.shape)
+    level = sma[rows, upper - 1]
+    
+    return project_forecast(level, slope, forecast_horizon)
+
+
+def _stack_metrics(actual, predicted):
+    """Stack MAE, RMSE and MAPE along a trailing axis."""
+    
+    metrics = _accuracy_metrics(actual, predicted)
+    return np.stack([metrics['MAE'], metrics['RMSE'], metrics['MAPE']], axis=-1)
+
+
+def detect_seasonality(data, part_name):
+    """
+    Detect seasonal patterns in demand data.
+    
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        Historical demand data
+    part_name : str
+        Name of the EV part to analyze
+        
+    Returns:
+    --------
+    dict
+        Dictionary containing seasonality information
+    """
+    
+    return detect_seasonality_from_context(PartContext.from_data(data, part_name))
+
+
+def detect_seasonality_from_context(context):
+    """Monthly and weekly seasonality of a part context; see ``detect_seasonality``."""
+    
+    if len(context) < 30:
+        return {'seasonal': False, 'pattern': 'insufficient_data'}
+    
+    # Test for monthly and weekly seasonality from calendar-group means
+    monthly_cv = _group_mean_cv(context.date_index.month, context.demand, 13)
+    weekly_cv = _group_mean_cv(context.date_index.weekday, context.demand, 7)
+    
+    # Determine seasonality
+    is_seasonal = monthly_cv > 0.1 or weekly_cv > 0.05
+    
+    if monthly_cv > weekly_cv:
+        pattern = 'monthly'
+        strength = monthly_cv
+    else:
+        pattern = 'weekly'
+        strength = weekly_cv
+    
+    return {
+        'seasonal': is_seasonal,
+        'pattern': pattern,
+        'strength': strength,
+        'monthly_cv': monthly_cv,
+        'weekly_cv': weekly_cv
+    }
+
+
+def _group_mean_cv(keys, values, n_keys):
+    """Coefficient of variation of the per-key means of ``values``."""
+    
+    counts = np.bincount(keys, minlength=n_keys)
+    sums = np.bincount(keys, weights=values, minlength=n_keys)
+    means = sums[counts > 0] / counts[counts > 0]
+    return means.std(ddof=1) / means.mean()
+
+
+def detect_seasonality_batch(data, part_names=None, min_period=2, max_period=None,
+                             significance=0.01):
+    """
+    Detect dominant seasonal periods for all parts from their periodograms.
+    
+    Each part's linearly detrended demand is transformed with one real FFT
+    over the (parts x days) matrix. The strongest frequency in the allowed
+    period band is the dominant period, and its strength is its share of
+    the band's spectral power. Fisher's g-test on that share decides whether
+    the peak stands out from noise.
+    
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        Historical demand data with columns: part_name, date, demand
+    part_names : list-like, optional
+        Parts to analyze. Defaults to every part in ``data``.
+    min_period, max_period : float
+        Range of periods (in days) considered. ``max_period`` defaults to half
+        the longest history.
+    significance : float
+        p-value below which a part is reported as seasonal
+        
+    Returns:
+    --------
+    pd.DataFrame
+        One row per part with dominant_period, dominant_strength,
+        secondary_period, secondary_strength, p_value and seasonal. Parts with
+        fewer than 30 observations get NaN and seasonal=False.
+    """
+    
+    parts, values, lengths, _ = build_demand_matrix(data, part_names)
+    
+    if len(parts) == 0:
+        return pd.DataFrame()
+    
+    n_days = values.shape[1]
+    residual, _ = _detrend_rows(values)
+    power = np.abs(np.fft.rfft(residual, axis=1)) ** 2
+    
+    band, periods = _period_band(n_days, min_period, max_period)
+    power = power[:, band]
+    total = power.sum(axis=1)
+    
+    ranked = np.argsort(power, axis=1)[:, ::-1][:, :2]
+    rows = np.arange(len(parts))[:, None]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        strength = power[rows, ranked] / total[:, None]
+    
+    # Fisher's g-test for the largest periodogram ordinate
+    n_freq = band.sum()
+    p_value = np.minimum(n_freq * (1 - strength[:, 0]) ** (n_freq - 1), 1.0)
+    
+    sufficient = (lengths >= 30) & (total > 0)
+    
+    result = pd.DataFrame({
+        'part_name': parts.to_numpy(),
+        'dominant_period': periods[ranked[:, 0]],
+        'dominant_strength': strength[:, 0],
+        'secondary_period': periods[ranked[:, 1]],
+        'secondary_strength': strength[:, 1],
+        'p_value': p_value
+    })
+    result.loc[~sufficient, result.columns[1:]] = np.nan
+    result['seasonal'] = sufficient & (p_value < significance)
+    
+    return result
+
+
+def estimate_seasonal_factors(data, forecast_horizon=30, window_size=30, n_harmonics=3,
+                              part_names=None, min_period=2, max_period=None):
+    """
+    Estimate per-part seasonal factors for the forecast horizon via FFT.
+    
+    The seasonal component of each part is rebuilt from its ``n_harmonics``
+    strongest periodogram frequencies and extended over the horizon. Factors
+    are expressed relative to the part's mean demand and to the seasonal
+    level already contained in the last ``window_size`` day moving average,
+    so they can replace the default annual cycle in ``generate_forecast``
+    and ``generate_batch_forecast``.
+    
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        Historical demand data with columns: part_name, date, demand
+    forecast_horizon : int
+        Number of days to produce factors for
+    window_size : int
+        Moving average window the factors will be combined with
+    n_harmonics : int
+        Number of dominant frequencies kept per part
+    part_names : list-like, optional
+        Parts to analyze. Defaults to every part in ``data``.
+    min_period, max_period : float
+        Range of periods (in days) considered
+        
+    Returns:
+    --------
+    pd.DataFrame
+        Seasonal factors indexed by part name, one column per forecast day
+    """
+    
+    parts, values, lengths, _ = build_demand_matrix(data, part_names)
+    
+    if len(parts) == 0:
+        return pd.DataFrame()
+    
+    n_days = values.shape[1]
+    residual, row_mean = _detrend_rows(values)
+    spectrum = np.fft.rfft(residual, axis=1)
+    
+    band, _ = _period_band(n_days, min_period, max_period)
+    band_bins = np.flatnonzero(band)
+    top = np.argsort(np.abs(spectrum[:, band]), axis=1)[:, ::-1][:, :n_harmonics]
+    bins = band_bins[top]
+    coefficients = np.take_along_axis(spectrum, bins, axis=1)
+    
+    # Real reconstruction: the one-sided spectrum counts each bin twice
+    # except the Nyquist bin of an even-length series
+    weight = np.where(2 * bins == n_days, 1.0, 2.0) / n_days
+    
+    def component(times):
+        phase = np.exp(2j * np.pi * bins[:, :, None] * times[None, None, :] / n_days)
+        return np.real((weight * coefficients)[:, :, None] * phase).sum(axis=1)
+    
+    future = component(n_days + np.arange(forecast_horizon))
+    recent = component(n_days - np.arange(1, min(window_size, n_days) + 1))
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        factors = (future - recent.mean(axis=1, keepdims=True)) / row_mean[:, None]
+    factors[(lengths < 30) | ~np.isfinite(row_mean) | (row_mean <= 0)] = 0
+    
+    return pd.DataFrame(factors, index=pd.Index(parts, name='part_name'))
+
+
+def _detrend_rows(values):
+    """
+    Remove each row's least-squares line over its observed days.
+    
+    Returns the residuals with NaN padding replaced by zero, and each row's
+    mean demand.
+    """
+    
+    observed = ~np.isnan(values)
+    n = observed.sum(axis=1, keepdims=True)
+    x = np.broadcast_to(np.arange(values.shape[1], dtype=float), values.shape)
+    y = np.where(observed, values, 0)
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x_mean = np.where(observed, x, 0).sum(axis=1, keepdims=True) / n
+        y_mean = y.sum(axis=1, keepdims=True) / n
+        dx = np.where(observed, x - x_mean, 0)
+        slope = (dx * (y - y_mean)).sum(axis=1, keepdims=True) / (dx ** 2).sum(axis=1, keepdims=True)
+        slope = np.nan_to_num(slope)
+        residual = np.where(observed, y - y_mean - slope * (x - x_mean), 0)
+    
+    return residual, y_mean[:, 0]
+
+
+def _period_band(n_days, min_period, max_period):
+    """Boolean mask of rfft bins whose period lies in [min_period, max_period]."""
+    
+    frequencies = np.fft.rfftfreq(n_days)
+    with np.errstate(divide='ignore'):
+        periods = 1 / frequencies
+    
+    if max_period is None:
+        max_period = n_days / 2
+    band = (frequencies > 0) & (periods >= min_period) & (periods <= max_period)
+    
+    return band, periods[band]
+
+
+def generate_advanced_forecast(data, part_name, method='sma', **kwargs):
+    """
+    Generate advanced forecasts using multiple methods.
+    
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        Historical demand data
+    part_name : str
+        Name of the EV part to forecast
+    method : str
+        Forecasting method: 'sma', 'exponential' (Holt-Winters), 'trend'
+        (Holt's linear trend) or 'auto' (whichever of those scores the lowest
+        MAPE on a ``holdout_days`` holdout window, see
+        ``select_forecast_models``; the result is recorded in
+        ``attrs['model_selection']``)
+    **kwargs : dict
+        Additional parameters for forecasting methods. The SMA-only
+        ``window_size`` and ``seasonal_factors`` are ignored by the
+        'exponential' and 'trend' methods, which fit their own seasonality.
+        ``compact=True`` is only supported by the 'sma' method.
+        
+    Returns:
+    --------
+    pd.DataFrame or ForecastResult
+        DataFrame with forecast results
+    """
+    
+    if kwargs.get('compact') and method != 'sma':
+        raise ValueError(f"Compact output is only available for method 'sma', not {method!r}")
+    
+    if method == 'sma':
+        return generate_forecast(data, part_name, **kwargs)
+    
+    if method == 'auto':
+        holdout_days = kwargs.pop('holdout_days', 30)
+        selection = select_forecast_models(
+            data,
+            holdout_days=holdout_days,
+            window_size=kwargs.get('window_size', 30),
+            part_names=[part_name]
+        )
+        if selection.empty:
+            return generate_forecast(data, part_name, **kwargs)
+        
+        best = selection.iloc[0]
+        forecast_df = generate_advanced_forecast(
+            data, part_name, method=best['best_method'], **kwargs
+        )
+        forecast_df.attrs['model_selection'] = best.to_dict()
+        return forecast_df
+    
+    if method in ('exponential', 'trend'):
+        # Smoothing models have no moving average window and fit their own
+        # seasonal component, so the SMA-only options do not apply
+        kwargs.pop('window_size', None)
+        kwargs.pop('seasonal_factors', None)
+        return generate_exponential_forecast(
+            data, part_name, seasonal=(method == 'exponential'), **kwargs
+        )
+    
+    return generate_forecast(data, part_name, **kwargs)
+
+
+def select_forecast_models(data, holdout_days=30, window_size=30,
+                           candidates=('sma', 'exponential', 'trend'), part_names=None,
+                           n_jobs=1, chunk_size=500):
+    """
+    Pick the best forecasting method per part on a holdout window.
+    
+    Each candidate forecasts the last ``holdout_days`` of every part from the
+    data before them and the method with the lowest MAPE wins. Parts are
+    scored in chunks of ``chunk_size`` submitted to a process pool when
+    ``n_jobs`` > 1, using the same vectorized engine as
+    ``backtest_forecast``.
+    
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        Historical demand data with columns: part_name, date, demand
+    holdout_days : int
+        Number of most recent days held out for scoring
+    window_size : int
+        Window size for the SMA candidate
+    candidates : sequence of str
+        Methods competing in the tournament
+    part_names : list-like, optional
+        Parts to evaluate. Defaults to every part in ``data``.
+    n_jobs : int
+        Number of worker processes. 1 runs in the current process.
+    chunk_size : int
+        Number of parts per task submitted to the process pool
+        
+    Returns:
+    --------
+    pd.DataFrame
+        One row per part with best_method, best_mape and the holdout MAPE of
+        each candidate (``<method>_mape``)
+    """
+    
+    results = backtest_forecast(
+        data,
+        window_sizes=(window_size,),
+        forecast_horizon=holdout_days,
+        n_origins=1,
+        methods=candidates,
+        part_names=part_names,
+        n_jobs=n_jobs,
+        chunk_size=chunk_size
+    )
+    
+    if results.empty:
+        return pd.DataFrame()
+    
+    scores = results.pivot_table(index='part_name', columns='method', values='MAPE', sort=False)
+    scores = scores.reindex(columns=[method for method in candidates if method in scores.columns])
+    
+    selection = pd.DataFrame({
+        'part_name': scores.index,
+        'best_method': scores.idxmin(axis=1).to_numpy(),
+        'best_mape': scores.min(axis=1).to_numpy()
+    })
+    for method in scores.columns:
+        selection[f'{method}_mape'] = scores[method].to_numpy()
+    
+    return selection
+
+
+def generate_exponential_forecast(data, part_name, forecast_horizon=30, seasonal=True,
+                                  season_length=7, **grid):
+    """
+    Generate demand forecast using Holt-Winters exponential smoothing.
+    
+    Additive triple exponential smoothing (level, trend and a weekly season)
+    with smoothing parameters chosen per part by grid search. With
+    ``seasonal=False`` the seasonal component is dropped, giving Holt's
+    linear trend method. Parts with fewer than two seasons of history fall
+    back to ``generate_forecast``.
+    
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        Historical demand data with columns: part_name, date, demand
+    part_name : str
+        Name of the EV part to forecast
+    forecast_horizon : int
+        Number of days to forecast into the future (7-90)
+    seasonal : bool
+        Whether to model the seasonal component
+    season_length : int
+        Length of the seasonal cycle in days
+    **grid : dict
+        Optional ``alphas``, ``betas`` and ``gammas`` candidate grids
+        
+    Returns:
+    --------
+    pd.DataFrame
+        Historical data with one-step fitted values, followed by forecasts.
+        The selected parameters are stored in ``attrs['smoothing_params']``.
+    """
+    
+    parts, values, lengths, part_data = build_demand_matrix(data, [part_name])
+    
+    if len(parts) == 0:
+        return pd.DataFrame()
+    
+    if lengths[0] < 2 * season_length:
+        return generate_forecast(data, part_name, forecast_horizon=forecast_horizon)
+    
+    fit = fit_exponential_smoothing(
+        values,
+        forecast_horizon=forecast_horizon,
+        season_length=season_length,
+        seasonal=seasonal,
+        **grid
+    )
+    
+    forecast_values = fit['forecast'][0]
+    residual_std = fit['residual_std'][0]
+    
+    forecast_df = pd.DataFrame({
+        'part_name': part_name,
+        'date': pd.date_range(
+            start=part_data['date'].max() + timedelta(days=1),
+            periods=forecast_horizon,
+            freq='D'
+        ),
+        'demand': np.nan,
+        'fitted': np.nan,
+        'forecast': forecast_values
+    })
+    
+    forecast_df['forecast_upper'] = forecast_df['forecast'] + (1.96 * residual_std)
+    forecast_df['forecast_lower'] = forecast_df['forecast'] - (1.96 * residual_std)
+    forecast_df['forecast_lower'] = forecast_df['forecast_lower'].clip(lower=0)
+    
+    part_data['fitted'] = fit['fitted'][0]
+    part_data['forecast'] = np.nan
+    part_data['forecast_upper'] = np.nan
+    part_data['forecast_lower'] = np.nan
+    
+    combined_df = pd.concat([part_data, forecast_df], ignore_index=True)
+    combined_df.attrs['smoothing_params'] = {
+        'method': 'holt_winters' if seasonal else 'holt',
+        'alpha': float(fit['alpha'][0]),
+        'beta': float(fit['beta'][0]),
+        'gamma': float(fit['gamma'][0]),
+        'residual_std': float(residual_std)
+    }
+    
+    return combined_df
+
+
+def generate_batch_exponential_forecast(data, forecast_horizon=30, seasonal=True,
+                                        season_length=7, part_names=None, **grid):
+    """
+    Generate Holt-Winters forecasts for many parts in one vectorized fit.
+    
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        Historical demand data with columns: part_name, date, demand
+    forecast_horizon : int
+        Number of days to forecast into the future (7-90)
+    seasonal : bool
+        Whether to model the seasonal component
+    season_length : int
+        Length of the seasonal cycle in days
+    part_names : list-like, optional
+        Parts to forecast. Defaults to every part in ``data``.
+    **grid : dict
+        Optional ``alphas``, ``betas`` and ``gammas`` candidate grids
+        
+    Returns:
+    --------
+    pd.DataFrame
+        One row per part and forecast day with the forecast, its interval and
+        the smoothing parameters selected for the part. Parts with fewer than
+        two seasons of history are omitted.
+    """
+    
+    parts, values, lengths, history = build_demand_matrix(data, part_names)
+    
+    if len(parts) == 0:
+        return pd.DataFrame()
+    
+    fit = fit_exponential_smoothing(
+        values,
+        forecast_horizon=forecast_horizon,
+        season_length=season_length,
+        seasonal=seasonal,
+        **grid
+    )
+    
+    fitted = ~np.isnan(fit['residual_std'])
+    last_dates = history.groupby('part_name', sort=False)['date'].max()
+    last_dates = last_dates.reindex(parts).to_numpy()[fitted]
+    future_dates = (
+        last_dates[:, None] + np.arange(1, forecast_horizon + 1) * np.timedelta64(1, 'D')
+    )
+    
+    forecast_flat = fit['forecast'][fitted].ravel()
+    std_flat = np.repeat(fit['residual_std'][fitted], forecast_horizon)
+    
+    return pd.DataFrame({
+        'part_name': np.repeat(parts.to_numpy()[fitted], forecast_horizon),
+        'date': future_dates.ravel(),
+        'forecast': forecast_flat,
+        'forecast_upper': forecast_flat + (1.96 * std_flat),
+        'forecast_lower': np.maximum(forecast_flat - (1.96 * std_flat), 0),
+        'alpha': np.repeat(fit['alpha'][fitted], forecast_horizon),
+        'beta': np.repeat(fit['beta'][fitted], forecast_horizon),
+        'gamma': np.repeat(fit['gamma'][fitted], forecast_horizon)
+    })
+
+
+def fit_exponential_smoothing(values, forecast_horizon=30, season_length=7, seasonal=True,
+                              alphas=(0.05, 0.1, 0.2, 0.3, 0.5, 0.7),
+                              betas=(0.0, 0.01, 0.05, 0.1),
+                              gammas=(0.0, 0.05, 0.1, 0.3),
+                              max_rows=250000):
+    """
+    Fit additive Holt-Winters models to many series at once.
+    
+    Every (alpha, beta, gamma) candidate is run side by side for every part:
+    the smoothing recursion steps through time once while the state arrays
+    hold a (parts x candidates) grid. The candidate with the lowest one-step
+    squared error is kept per part, and its final state produces the forecast
+    without refitting.
+    
+    Parameters:
+    -----------
+    values : np.ndarray
+        (parts x days) demand matrix, right-aligned with NaN padding before
+        each part's first observation
+    forecast_horizon : int
+        Number of days to forecast
+    season_length : int
+        Length of the seasonal cycle in days; also the block size used to
+        initialise level and trend
+    seasonal : bool
+        Whether to model the seasonal component (False gives Holt's method)
+    alphas, betas, gammas : sequence of float
+        Candidate level, trend and seasonal smoothing parameters
+    max_rows : int
+        Upper bound on parts x candidates evaluated at once; larger inputs are
+        processed in chunks of parts to bound memory
+        
+    Returns:
+    --------
+    dict
+        ``forecast`` (parts x horizon), ``fitted`` one-step predictions
+        (parts x days), and per-part ``alpha``, ``beta``, ``gamma``, ``sse``
+        and ``residual_std``. Parts with fewer than two seasons of
+        observations get NaN throughout.
+    """
+    
+    values = np.atleast_2d(np.asarray(values, dtype=float))
+    if not seasonal:
+        gammas = (0.0,)
+    
+    grid = np.array(np.meshgrid(alphas, betas, gammas, indexing='ij')).reshape(3, -1)
+    n_parts, n_days = values.shape
+    chunk_size = max(1, max_rows // grid.shape[1])
+    
+    result = {
+        'forecast': np.full((n_parts, forecast_horizon), np.nan),
+        'fitted': np.full((n_parts, n_days), np.nan),
+        'alpha': np.full(n_parts, np.nan),
+        'beta': np.full(n_parts, np.nan),
+        'gamma': np.full(n_parts, np.nan),
+        'sse': np.full(n_parts, np.nan),
+        'residual_std': np.full(n_parts, np.nan)
+    }
+    
+    for start in range(0, n_parts, chunk_size):
+        chunk = slice(start, start + chunk_size)
+        _fit_holt_winters_chunk(
+            values[chunk], grid, season_length, seasonal, forecast_horizon,
+            {key: array[chunk] for key, array in result.items()}
+        )
+    
+    return result
+
+
+def _fit_holt_winters_chunk(values, grid, season_length, seasonal, forecast_horizon, out):
+    """Grid-search Holt-Winters over one chunk of parts, writing into ``out``."""
+    
+    init = _holt_winters_init(values, season_length, seasonal)
+    if not init['eligible'].any():
+        return
+    
+    alpha, beta, gamma = (np.repeat(param[None, :], len(values), axis=0) for param in grid)
+    state = _holt_winters_pass(values, init, alpha, beta, gamma, season_length)
+    
+    rows = np.arange(len(values))
+    best = np.argmin(state['sse'], axis=1)
+    best_alpha, best_beta, best_gamma = (param[rows, best] for param in (alpha, beta, gamma))
+    
+    # Replay the winning parameters once to record the fitted values
+    fitted = _holt_winters_pass(
+        values, init, best_alpha[:, None], best_beta[:, None], best_gamma[:, None],
+        season_length, record=True
+    )['fitted']
+    
+    forecast_values = _holt_winters_project(
+        state['level'][rows, best],
+        state['trend'][rows, best],
+        state['season'][rows, best],
+        values.shape[1] - 1 - init['first'],
+        forecast_horizon
+    )
+    
+    best_sse = state['sse'][rows, best]
+    residual_std = np.sqrt(best_sse / np.maximum(state['counts'] - 1, 1))
+    
+    eligible = init['eligible']
+    out['forecast'][eligible] = forecast_values[eligible]
+    out['alpha'][eligible] = best_alpha[eligible]
+    out['beta'][eligible] = best_beta[eligible]
+    out['gamma'][eligible] = best_gamma[eligible]
+    out['sse'][eligible] = best_sse[eligible]
+    out['residual_std'][eligible] = residual_std[eligible]
+    out['fitted'][eligible] = fitted[eligible]
+
+
+def _holt_winters_init(values, season_length, seasonal):
+    """Initial level, trend and season from the first two seasons of each row."""
+    
+    n_parts, n_days = values.shape
+    m = season_length
+    rows = np.arange(n_parts)
+    
+    observed = ~np.isnan(values)
+    first = np.where(observed.any(axis=1), observed.argmax(axis=1), n_days)
+    eligible = (n_days - first) >= 2 * m
+    
+    index = np.minimum(first[:, None] + np.arange(2 * m), n_days - 1)
+    init = values[rows[:, None], index]
+    
+    with np.errstate(invalid='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        level = np.nanmean(init[:, :m], axis=1)
+        trend = (np.nanmean(init[:, m:], axis=1) - level) / m
+    
+    if seasonal:
+        season = np.nan_to_num(init[:, :m] - level[:, None])
+    else:
+        season = np.zeros((n_parts, m))
+    
+    return {
+        'first': first,
+        'eligible': eligible,
+        'level': level,
+        'trend': trend,
+        'season': season
+    }
+
+
+def _holt_winters_pass(values, init, alpha, beta, gamma, season_length, record=False,
+                       snapshots=None):
+    """
+    Run the additive Holt-Winters recursion once through time.
+    
+    ``alpha``, ``beta`` and ``gamma`` are (parts x candidates) arrays, so every
+    candidate of every part is updated together at each time step. When
+    ``snapshots`` is given, the state just before each listed column is
+    processed (i.e. fitted on all earlier columns) is stored.
+    """
+    
+    n_parts, n_days = values.shape
+    n_candidates = alpha.shape[1]
+    m = season_length
+    rows = np.arange(n_parts)
+    first, eligible = init['first'], init['eligible']
+    
+    level = np.repeat(init['level'][:, None], n_candidates, axis=1)
+    trend = np.repeat(init['trend'][:, None], n_candidates, axis=1)
+    season = np.repeat(init['season'][:, None, :], n_candidates, axis=1)
+    sse = np.zeros((n_parts, n_candidates))
+    counts = np.zeros(n_parts)
+    fitted = np.full((n_parts, n_days), np.nan) if record else None
+    
+    snapshot_at = {} if snapshots is None else {
+        int(column): position for position, column in enumerate(snapshots)
+    }
+    saved = {
+        'level': np.full((n_parts, len(snapshot_at), n_candidates), np.nan),
+        'trend': np.full((n_parts, len(snapshot_at), n_candidates), np.nan),
+        'season': np.full((n_parts, len(snapshot_at), n_candidates, m), np.nan)
+    }
+    
+    start = min(first[eligible]) + m if eligible.any() else n_days
+    for t in range(start, n_days + 1):
+        if t in snapshot_at:
+            position = snapshot_at[t]
+            saved['level'][:, position] = level
+            saved['trend'][:, position] = trend
+            saved['season'][:, position] = season
+        if t == n_days:
+            break
+        
+        y = values[:, t]
+        active = eligible & (t >= first + m) & ~np.isnan(y)
+        if not active.any():
+            continue
+        
+        position = (t - first) % m
+        s_t = season[rows, :, position]
+        prediction = level + trend + s_t
+        error = y[:, None] - prediction
+        
+        new_level = alpha * (y[:, None] - s_t) + (1 - alpha) * (level + trend)
+        new_trend = beta * (new_level - level) + (1 - beta) * trend
+        new_season = gamma * (y[:, None] - new_level) + (1 - gamma) * s_t
+        
+        mask = active[:, None]
+        level = np.where(mask, new_level, level)
+        trend = np.where(mask, new_trend, trend)
+        season[rows, :, position] = np.where(mask, new_season, s_t)
+        sse += np.where(mask, error ** 2, 0)
+        counts += active
+        
+        if record:
+            fitted[active, t] = prediction[active, 0]
+    
+    return {
+        'level': level,
+        'trend': trend,
+        'season': season,
+        'sse': sse,
+        'counts': counts,
+        'fitted': fitted,
+        'snapshots': saved
+    }
+
+
+def _holt_winters_project(level, trend, season, last_offset, forecast_horizon):
+    """
+    Forecast from Holt-Winters states.
+    
+    ``last_offset`` is the number of days between each part's first
+    observation and its last fitted day, which fixes the seasonal phase.
+    """
+    
+    steps = np.arange(1, forecast_horizon + 1)
+    positions = (np.asarray(last_offset)[..., None] + steps) % season.shape[-1]
+    seasonal = np.take_along_axis(season, positions, axis=-1)
+    return np.maximum(level[..., None] + trend[..., None] * steps + seasonal, 0)
 
 
 if __name__ == "__main__":
@@ -9,8 +9,14 @@ based on forecasted demand, current stock levels, and business rules.
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from functools import partial
 import warnings
 
+from .kernels import (
+    PartContext, batch_point_forecast, build_part_contexts, demand_over, map_demand_paths,
+    simulate_demand_chunk
+)
+
 warnings.filterwarnings('ignore')
 
 
@@ -20,8 +26,9 @@ def generate_insights(forecast_df, current_stock, reorder_threshold_days=14):
     
     Parameters:
     -----------
-    forecast_df : pd.DataFrame
-        DataFrame containing historical and forecasted demand data
+    forecast_df : pd.DataFrame or ForecastResult
+        DataFrame containing historical and forecasted demand data, or a
+        compact result from ``generate_forecast(..., compact=True)``
     current_stock : int
         Current inventory level for the part
     reorder_threshold_days : int
@@ -33,7 +40,9 @@ def generate_insights(forecast_df, current_stock, reorder_threshold_days=14):
         Dictionary containing status, recommendations, and detailed metrics
     """
     
-    if forecast_df.empty:
+    no_data, forecast_values, history_demand = _forecast_demand_inputs(forecast_df)
+    
+    if no_data:
         return {
             'status': 'Unknown',
             'recommendation': 'No data available for analysis',
@@ -41,27 +50,73 @@ def generate_insights(forecast_df, current_stock, reorder_threshold_days=14):
             'metrics': {}
         }
     
-    # Calculate key metrics from forecast data
-    forecast_data = forecast_df.dropna(subset=['forecast'])
-    
-    if forecast_data.empty:
-        # Use historical data if no forecast available
-        historical_data = forecast_df.dropna(subset=['demand'])
-        if historical_data.empty:
-            return {
-                'status': 'Unknown',
-                'recommendation': 'Insufficient data for analysis',
-                'details': 'No historical or forecast data available.',
-                'metrics': {}
-            }
-        
-        avg_daily_demand = historical_data['demand'].tail(30).mean()
-        total_forecasted_demand = avg_daily_demand * reorder_threshold_days
-    else:
-        # Use forecast data for recommendations
-        forecast_period = min(len(forecast_data), reorder_threshold_days)
-        avg_daily_demand = forecast_data['forecast'].head(forecast_period).mean()
-        total_forecasted_demand = forecast_data['forecast'].head(forecast_period).sum()
+    if len(forecast_values) == 0 and len(history_demand) == 0:
+        return {
+            'status': 'Unknown',
+            'recommendation': 'Insufficient data for analysis',
+            'details': 'No historical or forecast data available.',
+            'metrics': {}
+        }
+    
+    # Calculate key metrics from forecast data, or history without a forecast
+    avg_daily_demand, total_forecasted_demand = _planned_demand(
+        forecast_values, history_demand, reorder_threshold_days
+    )
+    
+    return _insights_from_demand(
+        current_stock, avg_daily_demand, total_forecasted_demand, reorder_threshold_days
+    )
+
+
+def _forecast_demand_inputs(forecast_df):
+    """
+    Forecast and history arrays of a forecast DataFrame or ForecastResult.
+    
+    Returns:
+    --------
+    tuple
+        (no_data, forecast_values, history_demand) with NaN entries dropped
+    """
+    
+    from .forecasting import ForecastResult
+    
+    if isinstance(forecast_df, ForecastResult):
+        # Read the compact forecast's arrays directly, without a DataFrame
+        forecast_values = forecast_df.forecast[~np.isnan(forecast_df.forecast)]
+        return forecast_df.empty, forecast_values, forecast_df.history_demand
+    
+    if forecast_df.empty:
+        return True, np.array([]), np.array([])
+    
+    return (
+        False,
+        forecast_df['forecast'].dropna().to_numpy(),
+        forecast_df['demand'].dropna().to_numpy()
+    )
+
+
+def _planned_demand(forecast_values, history_demand, reorder_threshold_days):
+    """
+    Average daily and total demand over the reorder window.
+    
+    Uses the first ``reorder_threshold_days`` forecast days, or the mean of
+    the last 30 observed days when there is no forecast.
+    """
+    
+    if len(forecast_values) == 0:
+        avg_daily_demand = history_demand[-30:].mean()
+        return avg_daily_demand, avg_daily_demand * reorder_threshold_days
+    
+    forecast_period = min(len(forecast_values), reorder_threshold_days)
+    return (
+        forecast_values[:forecast_period].mean(),
+        forecast_values[:forecast_period].sum()
+    )
+
+
+def _insights_from_demand(current_stock, avg_daily_demand, total_forecasted_demand,
+                          reorder_threshold_days):
+    """Apply the stock status rules of ``generate_insights`` to planned demand."""
     
     # Calculate days of stock remaining
     days_of_stock = current_stock / max(avg_daily_demand, 1)
@@ -98,6 +153,107 @@ def generate_insights(forecast_df, current_stock, reorder_threshold_days=14):
     }
 
 
+def evaluate_what_if_scenarios(forecast_df, stock_levels, reorder_threshold_days):
+    """
+    Evaluate a grid of stock levels x reorder windows against one forecast.
+    
+    Planned demand is computed once per reorder window and the stock status
+    rules of ``generate_insights`` are then applied to every stock level as
+    array expressions, so a whole sidebar range can be precomputed and
+    slider moves answered with ``lookup_what_if_insights``.
+    
+    Parameters:
+    -----------
+    forecast_df : pd.DataFrame or ForecastResult
+        Forecast as accepted by ``generate_insights``
+    stock_levels : array-like
+        Stock levels to evaluate
+    reorder_threshold_days : array-like
+        Reorder windows (lead times) in days to evaluate
+        
+    Returns:
+    --------
+    pd.DataFrame
+        One row per (stock level, reorder window) with columns:
+        current_stock, reorder_threshold_days, avg_daily_demand,
+        total_forecasted_demand, safety_stock, days_of_stock,
+        recommended_order, status, priority. Values are unrounded. Empty when
+        the forecast has no data to plan from.
+    """
+    
+    no_data, forecast_values, history_demand = _forecast_demand_inputs(forecast_df)
+    
+    if no_data or (len(forecast_values) == 0 and len(history_demand) == 0):
+        return pd.DataFrame()
+    
+    stock_levels = np.asarray(stock_levels)
+    thresholds = np.asarray(reorder_threshold_days)
+    
+    planned = np.array([
+        _planned_demand(forecast_values, history_demand, threshold) for threshold in thresholds
+    ], dtype=float).reshape(-1, 2)
+    
+    stock, threshold_index = np.meshgrid(
+        stock_levels, np.arange(len(thresholds)), indexing='ij'
+    )
+    stock, threshold_index = stock.ravel(), threshold_index.ravel()
+    avg_daily_demand, total_forecasted_demand = planned[threshold_index].T
+    safety_stock = avg_daily_demand * thresholds[threshold_index] * 1.5
+    
+    critical = stock < total_forecasted_demand
+    warning = ~critical & (stock < safety_stock)
+    
+    return pd.DataFrame({
+        'current_stock': stock,
+        'reorder_threshold_days': thresholds[threshold_index],
+        'avg_daily_demand': avg_daily_demand,
+        'total_forecasted_demand': total_forecasted_demand,
+        'safety_stock': safety_stock,
+        'days_of_stock': stock / np.maximum(avg_daily_demand, 1),
+        'recommended_order': np.maximum(0, np.round(safety_stock - stock, 0)),
+        'status': np.select([critical, warning], ['Critical', 'Warning'], 'Healthy'),
+        'priority': np.select([critical, warning], [3, 2], 1)
+    })
+
+
+def lookup_what_if_insights(scenarios, current_stock, reorder_threshold_days):
+    """
+    Insights for one stock level and reorder window from a precomputed grid.
+    
+    Parameters:
+    -----------
+    scenarios : pd.DataFrame
+        Output of ``evaluate_what_if_scenarios``
+    current_stock : int
+        Current inventory level for the part
+    reorder_threshold_days : int
+        Number of days of stock to maintain before triggering reorder alert
+        
+    Returns:
+    --------
+    dict or None
+        Same as ``generate_insights`` for the forecast the grid was built
+        from, or None when the combination is not on the grid
+    """
+    
+    if scenarios.empty:
+        return None
+    
+    match = np.flatnonzero(
+        (scenarios['current_stock'].to_numpy() == current_stock)
+        & (scenarios['reorder_threshold_days'].to_numpy() == reorder_threshold_days)
+    )
+    if len(match) == 0:
+        return None
+    
+    return _insights_from_demand(
+        current_stock,
+        scenarios['avg_daily_demand'].to_numpy()[match[0]],
+        scenarios['total_forecasted_demand'].to_numpy()[match[0]],
+        reorder_threshold_days
+    )
+
+
 def _determine_stock_status(current_stock, total_forecasted_demand, avg_daily_demand, 
                           days_of_stock, reorder_threshold_days, safety_stock):
     """
@@ -158,44 +314,241 @@ def generate_reorder_recommendations(data, part_configs):
         DataFrame with recommendations for all parts
     """
     
-    from .forecasting import generate_forecast
+    configs = list(part_configs.values())
+    plan = calculate_reorder_plan(
+        data,
+        part_names=list(part_configs.keys()),
+        current_stock=[config['current_stock'] for config in configs],
+        reorder_threshold_days=[config.get('reorder_threshold_days', 14) for config in configs],
+        window_size=[config.get('window_size', 30) for config in configs],
+        forecast_horizon=[config.get('forecast_horizon', 30) for config in configs]
+    )
+    
+    # Convert to DataFrame and sort by priority
+    recommendations_df = plan[['part_name', 'current_stock', 'status', 'recommendation',
+                               'days_of_stock', 'recommended_order', 'priority']]
+    recommendations_df = recommendations_df.sort_values('priority', ascending=False)
+    
+    return recommendations_df
+
+
+def calculate_reorder_plan(data, part_names, current_stock, reorder_threshold_days=14,
+                           window_size=30, forecast_horizon=30):
+    """
+    Columnar reorder recommendations for a whole catalog.
     
-    recommendations = []
+    Stock levels and thresholds are arrays aligned with ``part_names``. Parts
+    sharing a forecast configuration are forecast together, and the
+    business rules of ``generate_insights`` (days of stock, safety stock,
+    Critical/Warning/Healthy status and order quantities) are evaluated with
+    array masks for every part at once. Each part's values match
+    ``generate_insights`` on its forecast.
     
-    for part_name, config in part_configs.items():
-        # Generate forecast for the part
-        forecast_df = generate_forecast(
-            data, 
-            part_name, 
-            window_size=config.get('window_size', 30),
-            forecast_horizon=config.get('forecast_horizon', 30)
-        )
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        Historical demand data for all parts
+    part_names : array-like
+        Parts to plan for
+    current_stock : array-like or scalar
+        Current inventory level per part
+    reorder_threshold_days : array-like or scalar
+        Days of stock to maintain per part
+    window_size : array-like or scalar
+        Moving average window per part (7-90)
+    forecast_horizon : array-like or scalar
+        Forecast horizon per part (7-90)
         
-        # Generate insights
-        insights = generate_insights(
-            forecast_df,
-            config['current_stock'],
-            config.get('reorder_threshold_days', 14)
+    Returns:
+    --------
+    pd.DataFrame
+        One row per part, in input order, with columns: part_name,
+        current_stock, status, recommendation, days_of_stock,
+        recommended_order, priority, avg_daily_demand,
+        total_forecasted_demand, safety_stock
+    """
+    
+    part_names = np.asarray(part_names, dtype=object)
+    n_parts = len(part_names)
+    current_stock = np.broadcast_to(np.asarray(current_stock), n_parts)
+    thresholds = np.broadcast_to(np.asarray(reorder_threshold_days), n_parts)
+    window_size = np.broadcast_to(np.asarray(window_size), n_parts)
+    forecast_horizon = np.broadcast_to(np.asarray(forecast_horizon), n_parts)
+    
+    avg_daily_demand = np.full(n_parts, np.nan)
+    total_forecasted_demand = np.full(n_parts, np.nan)
+    has_data = np.zeros(n_parts, dtype=bool)
+    
+    # Forecast all parts sharing the same parameters in one batch
+    groups = pd.DataFrame({'window': window_size, 'horizon': forecast_horizon}).groupby(
+        ['window', 'horizon'], sort=False
+    ).indices
+    for (window, horizon), rows in groups.items():
+        parts, forecast, recent_mean = batch_point_forecast(
+            data, int(window), int(horizon), part_names[rows]
         )
+        positions = parts.get_indexer(part_names[rows])
+        found = positions >= 0
+        rows, positions = rows[found], positions[found]
+        has_data[rows] = True
         
-        # Compile recommendation
-        recommendation = {
-            'part_name': part_name,
-            'current_stock': config['current_stock'],
-            'status': insights['status'],
-            'recommendation': insights['recommendation'],
-            'days_of_stock': insights['metrics'].get('days_of_stock', 0),
-            'recommended_order': insights['metrics'].get('recommended_order_quantity', 0),
-            'priority': _get_priority_score(insights['status'])
-        }
+        # Average over the first min(horizon, threshold) forecast days
+        period = np.clip(np.minimum(horizon, thresholds[rows]), 1, None)
+        totals = np.cumsum(forecast, axis=1)[positions, period - 1]
+        averages = totals / period
+        
+        # Fall back to recent history when there is no forecast
+        missing = np.isnan(totals)
+        averages[missing] = recent_mean[positions[missing]]
+        totals[missing] = averages[missing] * thresholds[rows[missing]]
         
-        recommendations.append(recommendation)
+        avg_daily_demand[rows] = averages
+        total_forecasted_demand[rows] = totals
+    
+    stock = current_stock.astype(float)
+    days_of_stock = stock / np.maximum(avg_daily_demand, 1)
+    safety_stock = avg_daily_demand * thresholds * 1.5
+    
+    known = has_data & ~np.isnan(avg_daily_demand)
+    critical = known & (stock < total_forecasted_demand)
+    warning = known & ~critical & (stock < safety_stock)
+    conditions = [~has_data, ~known, critical, warning]
+    
+    status = np.select(conditions, ['Unknown', 'Unknown', 'Critical', 'Warning'], 'Healthy')
+    priority = np.select(conditions, [0, 0, 3, 2], 1)
+    
+    recommendation = np.select(
+        conditions,
+        ['No data available for analysis', 'Insufficient data for analysis', '', ''],
+        'No immediate action required'
+    ).astype(object)
+    urgent = np.trunc(total_forecasted_demand[critical] - stock[critical] + safety_stock[critical])
+    recommendation[critical] = (
+        'URGENT: Order ' + pd.Series(urgent.astype(np.int64)).astype(str) + ' units immediately'
+    ).to_numpy()
+    reorder = np.trunc(safety_stock[warning] - stock[warning])
+    recommendation[warning] = (
+        'Reorder recommended: ' + pd.Series(reorder.astype(np.int64)).astype(str) + ' units'
+    ).to_numpy()
+    
+    return pd.DataFrame({
+        'part_name': part_names,
+        'current_stock': current_stock,
+        'status': status,
+        'recommendation': recommendation,
+        'days_of_stock': np.where(known, np.round(days_of_stock, 1), 0.0),
+        'recommended_order': np.where(known, np.maximum(0, np.round(safety_stock - stock, 0)), 0.0),
+        'priority': priority,
+        'avg_daily_demand': np.round(avg_daily_demand, 2),
+        'total_forecasted_demand': np.round(total_forecasted_demand, 2),
+        'safety_stock': np.round(safety_stock, 2)
+    })
+
+
+def simulate_stockout_risk(data, part_names, current_stock, reorder_threshold_days=14,
+                           window_size=30, n_simulations=2000, memory_budget_mb=256,
+                           n_jobs=1, random_seed=None):
+    """
+    Monte Carlo stockout probability and expected shortfall per part.
+    
+    Where ``generate_insights`` compares point estimates, this draws
+    ``n_simulations`` demand and lead-time paths per part. Demand paths are
+    residual-bootstrap paths around the SMA forecast (see
+    ``generate_probabilistic_forecast``). Each path also draws a lead time
+    from the part's ``lead_time`` history. Current stock has to cover demand
+    over the reorder window, and further until a replenishment arrives when
+    the drawn lead time is longer. Paths are simulated as (parts x
+    simulations x days) arrays in chunks that fit ``memory_budget_mb``, and
+    the chunks can be spread over a process pool.
     
-    # Convert to DataFrame and sort by priority
-    recommendations_df = pd.DataFrame(recommendations)
-    recommendations_df = recommendations_df.sort_values('priority', ascending=False)
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        Historical demand data with columns: part_name, date, demand and
+        optionally lead_time. Without lead times the exposure is the reorder
+        window alone.
+    part_names : array-like
+        Parts to simulate
+    current_stock : array-like or scalar
+        Current inventory level per part
+    reorder_threshold_days : array-like or scalar
+        Reorder window in days per part
+    window_size : int
+        Moving average window of the underlying forecast
+    n_simulations : int
+        Number of paths per part
+    memory_budget_mb : float
+        Approximate cap on the memory held by the paths of one chunk
+    n_jobs : int
+        Number of worker processes. 1 runs in the current process.
+    random_seed : int, optional
+        Seed for reproducible simulations. Each part's paths depend only on
+        the seed and the part name, not on ``n_jobs``, ``memory_budget_mb``
+        or the other parts requested.
+        
+    Returns:
+    --------
+    pd.DataFrame
+        One row per part, in input order, with columns: part_name,
+        current_stock, reorder_threshold_days, expected_demand, demand_p95,
+        mean_lead_time, stockout_probability, expected_shortfall. Parts
+        without history get NaN metrics.
+    """
     
-    return recommendations_df
+    part_names = np.asarray(part_names, dtype=object)
+    n_parts = len(part_names)
+    current_stock = np.broadcast_to(np.asarray(current_stock), n_parts)
+    thresholds = np.broadcast_to(np.asarray(reorder_threshold_days), n_parts)
+    window = np.maximum(thresholds, 1)
+    
+    metrics = map_demand_paths(
+        data, part_names, partial(_stockout_chunk, window_size=window_size,
+                                  n_simulations=n_simulations),
+        part_arrays=[current_stock, window], n_outputs=5, min_horizon=window,
+        window_size=window_size, memory_budget_mb=memory_budget_mb,
+        n_simulations=n_simulations, n_jobs=n_jobs, random_seed=random_seed
+    )
+    
+    return pd.DataFrame({
+        'part_name': part_names,
+        'current_stock': current_stock,
+        'reorder_threshold_days': thresholds,
+        'expected_demand': np.round(metrics[:, 0], 2),
+        'demand_p95': np.round(metrics[:, 1], 2),
+        'mean_lead_time': np.round(metrics[:, 2], 2),
+        'stockout_probability': metrics[:, 3],
+        'expected_shortfall': np.round(metrics[:, 4], 2)
+    })
+
+
+def _stockout_chunk(chunk, window_size, n_simulations):
+    """
+    Simulate one chunk of parts for ``simulate_stockout_risk``.
+    
+    Returns:
+    --------
+    np.ndarray
+        (parts x 5) array of expected demand, 95th percentile demand, mean
+        lead time, stockout probability and expected shortfall over each
+        path's exposure period
+    """
+    
+    paths, lead_time, (stock, window) = simulate_demand_chunk(
+        chunk, window_size, n_simulations
+    )
+    
+    # Stock has to last through the reorder window or until replenishment
+    exposure = np.maximum(window[:, None], lead_time)
+    demand = demand_over(paths, exposure)
+    shortfall = np.maximum(demand - stock[:, None], 0)
+    
+    return np.column_stack([
+        demand.mean(axis=1),
+        np.quantile(demand, 0.95, axis=1),
+        lead_time.mean(axis=1),
+        (shortfall > 0).mean(axis=1),
+        shortfall.mean(axis=1)
+    ])
 
 
 def _get_priority_score(status):
@@ -242,23 +595,24 @@ def analyze_demand_volatility(data, part_name, window_size=30):
         Dictionary containing volatility metrics
     """
     
-    part_data = data[data['part_name'] == part_name].copy()
+    return _volatility_from_context(PartContext.from_data(data, part_name), window_size)
+
+
+def _volatility_from_context(context, window_size=30):
+    """Volatility metrics of a part context; see ``analyze_demand_volatility``."""
     
-    if len(part_data) < window_size:
+    if len(context) < window_size:
         return {'volatility': 'insufficient_data'}
     
-    part_data = part_data.sort_values('date')
-    
-    # Calculate rolling volatility
-    part_data['rolling_mean'] = part_data['demand'].rolling(window_size).mean()
-    part_data['rolling_std'] = part_data['demand'].rolling(window_size).std()
-    part_data['coefficient_of_variation'] = (
-        part_data['rolling_std'] / part_data['rolling_mean']
-    )
+    # Calculate rolling volatility from the context's prefix moments
+    mean, std = context.rolling_moments([window_size], last=30)[window_size]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        coefficient_of_variation = std / mean
     
     # Calculate overall volatility metrics
-    recent_cv = part_data['coefficient_of_variation'].tail(30).mean()
-    overall_cv = part_data['demand'].std() / part_data['demand'].mean()
+    recent_cv = np.nanmean(coefficient_of_variation)
+    overall_mean, overall_std = context.mean_std()
+    overall_cv = overall_std / overall_mean
     
     # Classify volatility
     if recent_cv < 0.2:
@@ -301,22 +655,61 @@ def generate_supply_chain_insights(data, part_name, current_stock, lead_time_day
         Comprehensive supply chain analysis
     """
     
-    from .forecasting import generate_forecast, detect_seasonality
+    context = PartContext.from_data(data, part_name)
+    return _supply_chain_insights_from_context(context, current_stock, lead_time_days)
+
+
+def generate_batch_supply_chain_insights(data, part_configs):
+    """
+    Generate supply chain insights for many parts in one call.
+    
+    The input is sorted once and every part's forecast, volatility and
+    seasonality analysis read from the same per-part context, instead of
+    each analysis filtering and sorting ``data`` again.
+    
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        Historical demand data for all parts
+    part_configs : dict
+        Dictionary with part names as keys and config dictionaries as values
+        Each config should contain: current_stock and optionally lead_time_days
+        
+    Returns:
+    --------
+    dict
+        Part names mapped to the output of ``generate_supply_chain_insights``
+    """
+    
+    contexts = build_part_contexts(data, list(part_configs.keys()))
+    
+    return {
+        part_name: _supply_chain_insights_from_context(
+            contexts[part_name], config['current_stock'], config.get('lead_time_days', 14)
+        )
+        for part_name, config in part_configs.items()
+    }
+
+
+def _supply_chain_insights_from_context(context, current_stock, lead_time_days=14):
+    """Supply chain insights of a part context; see ``generate_supply_chain_insights``."""
+    
+    from .forecasting import forecast_from_context, detect_seasonality_from_context
     
     # Generate forecast
-    forecast_df = generate_forecast(data, part_name, forecast_horizon=lead_time_days * 2)
+    forecast = forecast_from_context(context, 30, lead_time_days * 2)
     
     # Basic insights
-    basic_insights = generate_insights(forecast_df, current_stock, lead_time_days)
+    basic_insights = generate_insights(forecast, current_stock, lead_time_days)
     
     # Volatility analysis
-    volatility = analyze_demand_volatility(data, part_name)
+    volatility = _volatility_from_context(context)
     
     # Seasonality analysis
-    seasonality = detect_seasonality(data, part_name)
+    seasonality = detect_seasonality_from_context(context)
     
     # Lead time risk assessment
-    lead_time_demand = forecast_df.dropna(subset=['forecast']).head(lead_time_days)['forecast'].sum()
+    lead_time_demand = forecast.forecast[:lead_time_days].sum()
     lead_time_risk = "High" if current_stock < lead_time_demand else "Low"
     
     return {
@@ -0,0 +1,676 @@
+"""
+Kernels Module for EV Manufacturing Inventory
+=============================================
+
+This module holds the vectorized numerical kernels shared by the
+forecasting, analytics, insight and policy modules: demand matrices stacked
+from the long demand table, rolling moments, SMA trend projection, per-part
+history contexts and residual-bootstrap demand path simulation.
+"""
+
+import pandas as pd
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import warnings
+
+warnings.filterwarnings('ignore')
+
+
+def build_demand_matrix(data, part_names=None, max_days=None):
+    """
+    Stack each part's date-sorted demand into a right-aligned matrix.
+    
+    Row ``i`` holds the history of ``parts[i]``, left-padded with NaN so that
+    the most recent observation of every part sits in the last column. With
+    ``max_days`` only the most recent ``max_days`` columns are kept, which
+    bounds the matrix for large catalogs when only recent demand matters.
+    
+    Returns:
+    --------
+    tuple
+        (parts, values, lengths, history) where ``parts`` is a pd.Index,
+        ``values`` the (parts x days) demand matrix, ``lengths`` the number of
+        observations per part and ``history`` the input rows sorted by part
+        then date
+    """
+    
+    if part_names is None:
+        codes, parts = pd.factorize(data['part_name'])
+    else:
+        parts = pd.Index(pd.unique(np.asarray(part_names, dtype=object)))
+        codes = parts.get_indexer(data['part_name'])
+    
+    dates = pd.to_datetime(data['date']).to_numpy()
+    selected = np.flatnonzero(codes >= 0)
+    order = selected[np.lexsort((dates[selected], codes[selected]))]
+    
+    history = data.iloc[order].reset_index(drop=True)
+    history['date'] = dates[order]
+    codes = codes[order]
+    
+    lengths = np.bincount(codes, minlength=len(parts))
+    present = lengths > 0
+    if not present.all():
+        # Parts without history are dropped, as generate_forecast would
+        remap = np.cumsum(present) - 1
+        codes = remap[codes]
+        parts = parts[present]
+        lengths = lengths[present]
+    
+    n_days = lengths.max() if len(lengths) else 0
+    if max_days is not None:
+        n_days = min(n_days, max_days)
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    columns = n_days - lengths[codes] + (np.arange(len(codes)) - starts[codes])
+    kept = columns >= 0
+    
+    values = np.full((len(parts), n_days), np.nan)
+    values[codes[kept], columns[kept]] = history['demand'].to_numpy(dtype=float)[kept]
+    
+    return parts, values, lengths, history
+
+
+def build_calendar_matrix(data, part_names=None):
+    """
+    Pivot demand into a (parts x dates) matrix over a shared calendar.
+    
+    Columns are every date present in ``data`` for the selected parts; days a
+    part has no record are NaN. Duplicate (part, date) records are summed.
+    Requested parts without data are dropped.
+    
+    Returns:
+    --------
+    tuple
+        (parts, dates, values) where ``parts`` is a pd.Index, ``dates`` the
+        sorted datetime64 calendar and ``values`` the demand matrix
+    """
+    
+    if part_names is not None:
+        parts = pd.Index(pd.unique(np.asarray(part_names, dtype=object)))
+        data = data[data['part_name'].isin(parts)]
+        parts = parts[parts.isin(data['part_name'])]
+        part_codes = parts.get_indexer(data['part_name'])
+    else:
+        part_codes, parts = pd.factorize(data['part_name'])
+    date_codes, dates = pd.factorize(pd.to_datetime(data['date']), sort=True)
+    
+    keep = (part_codes >= 0) & (date_codes >= 0)
+    values = np.zeros((len(parts), len(dates)))
+    seen = np.zeros((len(parts), len(dates)), dtype=bool)
+    np.add.at(
+        values, (part_codes[keep], date_codes[keep]),
+        data['demand'].to_numpy(dtype=float)[keep]
+    )
+    seen[part_codes[keep], date_codes[keep]] = True
+    values[~seen] = np.nan
+    
+    return parts, np.asarray(dates, dtype='datetime64[ns]'), values
+
+
+def right_align(values):
+    """
+    Move each row's observations to the end of the row, keeping their order.
+    
+    Turns a calendar matrix, where a series may stop before the last date,
+    into the right-aligned layout of ``build_demand_matrix`` expected by the
+    SMA kernels. Missing days become leading NaN padding.
+    
+    Returns:
+    --------
+    tuple
+        (aligned, lengths) where ``lengths`` is the number of observations
+        per row
+    """
+    
+    observed = ~np.isnan(values)
+    order = np.argsort(observed, axis=1, kind='stable')
+    return np.take_along_axis(values, order, axis=1), observed.sum(axis=1)
+
+
+def prefix_moments(values):
+    """
+    Row means and prefix counts, sums and sums of squares of centred values.
+    
+    Returns:
+    --------
+    tuple
+        (row_mean, prefix) where ``prefix`` stacks the three cumulative sums
+        along a new first axis, each starting with a zero column
+    """
+    
+    valid = ~np.isnan(values)
+    counts = valid.sum(axis=-1, keepdims=True)
+    row_mean = np.where(valid, values, 0).sum(axis=-1, keepdims=True) / np.maximum(counts, 1)
+    centered = np.where(valid, values - row_mean, 0)
+    
+    cumulative = np.cumsum(np.stack([valid.astype(float), centered, centered ** 2]), axis=-1)
+    prefix = np.concatenate(
+        [np.zeros(cumulative.shape[:-1] + (1,)), cumulative], axis=-1
+    )
+    
+    return row_mean, prefix
+
+
+def moments_from_prefix(prefixes, windows, min_periods=None, last=None):
+    """
+    Window means and standard deviations from ``prefix_moments`` output.
+    
+    With ``last`` only the final ``last`` positions are computed.
+    """
+    
+    row_mean, prefix = prefixes
+    n_days = prefix.shape[-1] - 1
+    first = 0 if last is None else max(n_days - last, 0)
+    ends = np.arange(first + 1, n_days + 1)
+    cumulative = prefix[..., first + 1:]
+    
+    moments = {}
+    for window in windows:
+        required = max(window if min_periods is None else min_periods, 1)
+        n, total, total_sq = cumulative - prefix[..., np.maximum(ends - window, 0)]
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(n >= required, total / n + row_mean, np.nan)
+            variance = np.maximum(total_sq - total ** 2 / n, 0) / (n - 1)
+            std = np.where((n > 1) & (n >= required), np.sqrt(variance), np.nan)
+        
+        moments[window] = (mean, std)
+    
+    return moments
+
+
+def rolling_moments(values, windows, min_periods=None):
+    """
+    Rolling mean and sample standard deviation for several windows at once.
+    
+    Counts, sums and sums of squares are accumulated in a single cumulative
+    pass along the last axis; every window's moments are then differences of
+    that pass, so adding windows costs one subtraction each instead of a new
+    rolling computation. Sums are taken over values centred on the row mean
+    so the variance does not lose precision. NaN entries (such as the padding
+    of a right-aligned demand matrix) are ignored.
+    
+    Parameters:
+    -----------
+    values : np.ndarray
+        Series along the last axis, e.g. a (parts x days) demand matrix
+    windows : iterable of int
+        Window lengths
+    min_periods : int, optional
+        Minimum number of observations in a window, as in ``Series.rolling``.
+        Defaults to the full window length.
+        
+    Returns:
+    --------
+    dict
+        Window lengths mapped to (mean, std) arrays shaped like ``values``
+    """
+    
+    return moments_from_prefix(prefix_moments(values), windows, min_periods)
+
+
+def rolling_mean_std(values, window):
+    """
+    Rolling mean and sample standard deviation along the last axis.
+    
+    Matches ``Series.rolling(window, min_periods=1)`` on each row, ignoring the
+    NaN padding of a right-aligned demand matrix.
+    """
+    
+    return rolling_moments(values, [window], min_periods=1)[window]
+
+
+def rolling_cv(values, windows):
+    """
+    Rolling coefficient of variation (std / mean) for several windows.
+    
+    Uses full windows only, like ``Series.rolling(window)``; see
+    ``rolling_moments``.
+    
+    Returns:
+    --------
+    dict
+        Window lengths mapped to CV arrays shaped like ``values``
+    """
+    
+    cv = {}
+    for window, (mean, std) in rolling_moments(values, windows).items():
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cv[window] = std / mean
+    return cv
+
+
+def trend_fit(sma, lengths, window_size):
+    """
+    Least-squares slope and correlation of the last ``window_size`` SMA values.
+    
+    Vectorized equivalent of ``stats.linregress`` over each row; parts with
+    fewer than ``window_size`` observations get a zero slope and correlation.
+    """
+    
+    slope = np.zeros(len(sma))
+    r_value = np.zeros(len(sma))
+    eligible = lengths >= window_size
+    
+    if window_size > 1 and eligible.any():
+        recent = sma[eligible, -window_size:]
+        x = np.arange(window_size) - (window_size - 1) / 2
+        y = recent - recent.mean(axis=1, keepdims=True)
+        
+        ssxm = np.mean(x ** 2)
+        ssxym = np.mean(x * y, axis=1)
+        ssym = np.mean(y ** 2, axis=1)
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            r = np.where(
+                ssym == 0,
+                np.where(ssxym == 0, np.nan, 0.0),
+                np.clip(ssxym / np.sqrt(ssxm * ssym), -1.0, 1.0)
+            )
+        
+        slope[eligible] = ssxym / ssxm
+        r_value[eligible] = r
+    
+    return slope, r_value
+
+
+def project_forecast(level, trend_slope, forecast_horizon, seasonal_factors=None):
+    """
+    Project SMA levels over the forecast horizon as one array expression.
+    
+    Each day ``i`` of the horizon is ``(level + trend_slope * i)`` scaled by
+    ``1 + seasonal_factors[i]`` and floored at zero. Without seasonal factors
+    the simplified annual cycle ``0.1 * sin(2 * pi * i / 365.25)`` is used.
+    Scalar inputs give a 1-D horizon; 1-D inputs (one entry per part) give a
+    (parts x horizon) grid.
+    
+    Parameters:
+    -----------
+    level : float or array-like
+        Last moving average value per part
+    trend_slope : float or array-like
+        Daily trend of the moving average per part
+    forecast_horizon : int
+        Number of days to forecast
+    seasonal_factors : array-like, optional
+        Relative seasonal adjustment per forecast day, either shared
+        (horizon,) or per part (parts x horizon)
+        
+    Returns:
+    --------
+    np.ndarray
+        Non-negative forecast values
+    """
+    
+    steps = np.arange(forecast_horizon)
+    if seasonal_factors is None:
+        seasonal = 1 + 0.1 * np.sin(2 * np.pi * steps / 365.25)
+    else:
+        seasonal = 1 + np.asarray(seasonal_factors, dtype=float)
+    
+    level = np.asarray(level, dtype=float)[..., None]
+    trend_slope = np.asarray(trend_slope, dtype=float)[..., None]
+    
+    return np.maximum((level + trend_slope * steps) * seasonal, 0)
+
+
+def batch_point_forecast(data, window_size=30, forecast_horizon=30, part_names=None,
+                         recent_days=30):
+    """
+    SMA point forecasts for many parts without the history rows.
+    
+    Only the trailing ``2 * window_size - 1`` days feed the last moving
+    average and its trend, so just that tail is stacked, keeping memory
+    proportional to parts x window for large catalogs. The forecast values
+    equal the forecast rows of ``generate_batch_forecast``.
+    
+    Returns:
+    --------
+    tuple
+        (parts, forecast, recent_mean) where ``forecast`` is (parts x horizon)
+        and ``recent_mean`` the mean demand of each part's last
+        ``recent_days`` observations
+    """
+    
+    tail = max(2 * window_size - 1, recent_days)
+    parts, values, lengths, _ = build_demand_matrix(data, part_names, max_days=tail)
+    
+    if len(parts) == 0:
+        return parts, np.empty((0, forecast_horizon)), np.empty(0)
+    
+    sma, _ = rolling_mean_std(values[:, -(2 * window_size - 1):], window_size)
+    trend_slope, _ = trend_fit(sma, lengths, window_size)
+    forecast = project_forecast(sma[:, -1], trend_slope, forecast_horizon)
+    
+    with np.errstate(invalid='ignore'):
+        recent_mean = np.nanmean(values[:, -recent_days:], axis=1)
+    
+    return parts, forecast, recent_mean
+
+
+class PartContext:
+    """
+    Date-sorted history of one part, shared by the per-part analyses.
+    
+    Built once per part so that forecasting, volatility and seasonality
+    analysis do not each filter, copy and sort the input data. ``dates`` and
+    ``demand`` are views onto the input whenever the part's rows are
+    contiguous and already in date order. The date index and the prefix
+    moments (cumulative counts, sums and sums of squares) are built on first
+    use, after which any window's mean and standard deviation is a
+    difference of two prefix entries.
+    """
+    
+    def __init__(self, part_name, dates, demand):
+        self.part_name = part_name
+        self.dates = dates
+        self.demand = demand
+        self._date_index = None
+        self._prefix = None
+    
+    def __len__(self):
+        return len(self.demand)
+    
+    def __repr__(self):
+        return f"PartContext(part_name={self.part_name!r}, history={len(self)})"
+    
+    @classmethod
+    def from_data(cls, data, part_name):
+        """Select and date-sort one part's rows of ``data``."""
+        
+        mask = (data['part_name'] == part_name).to_numpy()
+        count = int(mask.sum())
+        
+        if count == 0:
+            return cls(part_name, np.array([], dtype='datetime64[ns]'), np.array([]))
+        
+        dates = data['date']
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates)
+        dates = dates.to_numpy()
+        demand = data['demand'].to_numpy()
+        
+        first = int(mask.argmax())
+        if mask[first:first + count].all():
+            dates = dates[first:first + count]
+            demand = demand[first:first + count]
+        else:
+            dates = dates[mask]
+            demand = demand[mask]
+        
+        if (dates[1:] < dates[:-1]).any():
+            order = np.argsort(dates, kind='stable')
+            dates = dates[order]
+            demand = demand[order]
+        
+        return cls(part_name, dates, demand)
+    
+    @property
+    def date_index(self):
+        """History dates as a pd.DatetimeIndex."""
+        if self._date_index is None:
+            self._date_index = pd.DatetimeIndex(self.dates)
+        return self._date_index
+    
+    def rolling_moments(self, windows, min_periods=None, last=None):
+        """
+        Rolling mean and standard deviation from the shared prefix moments.
+        
+        See ``rolling_moments``; ``last`` restricts the output to the final
+        ``last`` days.
+        """
+        
+        if self._prefix is None:
+            self._prefix = prefix_moments(self.demand.astype(float))
+        return moments_from_prefix(self._prefix, windows, min_periods, last)
+    
+    def mean_std(self):
+        """Mean and sample standard deviation of the whole history."""
+        mean, std = self.rolling_moments([len(self)], last=1)[len(self)]
+        return mean[0], std[0]
+
+
+def build_part_contexts(data, part_names=None):
+    """
+    Build a ``PartContext`` for many parts with a single sort.
+    
+    Returns:
+    --------
+    dict
+        Part names mapped to contexts. Requested parts without history get an
+        empty context.
+    """
+    
+    if part_names is None:
+        codes, parts = pd.factorize(data['part_name'])
+    else:
+        parts = pd.Index(pd.unique(np.asarray(part_names, dtype=object)))
+        codes = parts.get_indexer(data['part_name'])
+    
+    dates = pd.to_datetime(data['date']).to_numpy()
+    selected = np.flatnonzero(codes >= 0)
+    order = selected[np.lexsort((dates[selected], codes[selected]))]
+    
+    dates = dates[order]
+    demand = data['demand'].to_numpy()[order]
+    bounds = np.cumsum(np.bincount(codes[order], minlength=len(parts)))
+    starts = np.concatenate([[0], bounds[:-1]])
+    
+    return {
+        part: PartContext(part, dates[start:end], demand[start:end])
+        for part, start, end in zip(parts, starts, bounds)
+    }
+
+
+def sma_forecast_with_residuals(values, lengths, window_size, forecast_horizon):
+    """
+    SMA point forecasts and one-step residuals for a demand matrix.
+    
+    Residuals are ``demand[t] - sma[t - 1]`` wherever the previous day had a
+    full window, which leaves each row's valid residuals as a contiguous,
+    right-aligned block.
+    """
+    
+    sma, _ = rolling_mean_std(values, window_size)
+    trend_slope, _ = trend_fit(sma, lengths, window_size)
+    point = project_forecast(sma[:, -1], trend_slope, forecast_horizon)
+    
+    n_days = values.shape[1]
+    residuals = np.full(values.shape, np.nan)
+    residuals[:, 1:] = values[:, 1:] - sma[:, :-1]
+    full_window = np.arange(n_days) >= (n_days - lengths + window_size)[:, None]
+    residuals[~full_window] = np.nan
+    
+    return point, residuals
+
+
+def bootstrap_paths(point, residuals, window_size, n_simulations, rng):
+    """
+    Simulate (parts x simulations x horizon) demand paths around ``point``.
+    
+    Each day draws a residual from the part's pool. Its deviation from the
+    point forecast is that draw plus the mean deviation of the previous
+    ``window_size`` simulated days, the way a shock enters a moving average.
+    Parts with no residuals get the point forecast on every path.
+    
+    ``rng`` is either one generator for all parts or a sequence with one
+    generator per part. Per-part generators draw their uniforms day by day
+    in one block, so a part's paths depend only on its own generator and
+    not on the other parts or the horizon.
+    """
+    
+    n_parts, horizon = point.shape
+    n_days = residuals.shape[1]
+    rows = np.arange(n_parts)[:, None]
+    counts = (~np.isnan(residuals)).sum(axis=1)
+    offsets = (n_days - counts)[:, None]
+    pool = np.nan_to_num(residuals)
+    
+    # Days are simulated into contiguous slabs and exposed as a transposed view
+    steps = np.empty((horizon, n_parts, n_simulations))
+    running = np.zeros((n_parts, n_simulations))
+    
+    shared_rng = isinstance(rng, np.random.Generator)
+    if not shared_rng:
+        # Per-part uniforms are staged in the slabs each day overwrites
+        for part, part_rng in enumerate(rng):
+            steps[:, part] = part_rng.random((horizon, n_simulations))
+    
+    for i in range(horizon):
+        uniforms = rng.random((n_parts, n_simulations)) if shared_rng else steps[i]
+        draws = offsets + (uniforms * counts[:, None]).astype(int)
+        shocks = pool[rows, np.minimum(draws, n_days - 1)]
+        shocks[counts == 0] = 0
+        
+        deviation = running / window_size + shocks
+        steps[i] = deviation
+        running += deviation
+        if i >= window_size:
+            running -= steps[i - window_size]
+    
+    paths = steps.transpose(1, 2, 0)
+    paths += point[:, None, :]
+    np.maximum(paths, 0, out=paths)
+    return paths
+
+
+def map_demand_paths(data, part_names, task, part_arrays, n_outputs, min_horizon=1,
+                     lead_padding=0, window_size=30, n_simulations=2000,
+                     memory_budget_mb=256, n_jobs=1, random_seed=None):
+    """
+    Run a per-chunk simulation task over demand and lead-time paths.
+    
+    Builds the SMA forecasts, residual pools and per-part lead-time pools
+    once, splits the parts into chunks whose paths fit ``memory_budget_mb``
+    and maps ``task`` over them, in a process pool when ``n_jobs`` > 1.
+    
+    Each part needs a horizon of ``min_horizon`` days (scalar or per part)
+    and at least its longest observed lead time plus ``lead_padding``.
+    Parts are chunked in order of that need and every chunk is simulated
+    over the longest horizon among its own parts. Each part gets its own
+    seed, derived from ``random_seed`` and its name, so results do not
+    depend on ``n_jobs``, ``memory_budget_mb`` or the other parts requested.
+    
+    ``task`` receives a chunk tuple for ``simulate_demand_chunk`` and
+    returns (parts x n_outputs) metrics. ``part_arrays`` are per-part inputs
+    aligned with ``part_names`` and passed to the task chunk by chunk.
+    
+    Returns:
+    --------
+    np.ndarray
+        (len(part_names) x n_outputs) metrics; NaN for parts without history
+    """
+    
+    metrics = np.full((len(part_names), n_outputs), np.nan)
+    parts, values, lengths, history = build_demand_matrix(data, part_names)
+    
+    if len(parts) == 0:
+        return metrics
+    
+    rows = parts.get_indexer(part_names)
+    found = np.flatnonzero(rows >= 0)
+    positions = rows[found]
+    
+    # Lead-time pools: each part's observed lead times, in history order
+    if 'lead_time' in history:
+        lead_times = history['lead_time'].to_numpy(dtype=float)
+    else:
+        lead_times = np.zeros(len(history))
+    lead_starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    
+    arrays = []
+    for values_in in part_arrays + [np.broadcast_to(min_horizon, len(part_names))]:
+        aligned = np.zeros(len(parts), dtype=np.asarray(values_in).dtype)
+        aligned[positions] = np.asarray(values_in)[found]
+        arrays.append(aligned)
+    min_horizon = arrays.pop()
+    
+    longest_lead = np.maximum.reduceat(np.nan_to_num(lead_times), lead_starts)
+    needed = np.maximum(np.maximum(min_horizon, longest_lead + lead_padding), 1).astype(int)
+    point, residuals = sma_forecast_with_residuals(
+        values, lengths, window_size, int(needed.max())
+    )
+    
+    # One seed per part, keyed by name so it survives any chunking
+    root = np.random.SeedSequence(random_seed)
+    seeds = [
+        np.random.SeedSequence(root.entropy, spawn_key=(_part_seed_key(part_name),))
+        for part_name in parts
+    ]
+    
+    # Paths plus their cumulative sums cost 2 * 8 bytes per simulated day
+    budget = max(memory_budget_mb * 1024 * 1024 / (16 * n_simulations), 1)
+    order = np.argsort(needed, kind='stable')
+    
+    chunks = []
+    start = 0
+    while start < len(order):
+        # Needs are ascending, so the last part of a chunk sets its horizon
+        stop = start + 1
+        while stop < len(order) and (stop - start + 1) * needed[order[stop]] <= budget:
+            stop += 1
+        
+        members = order[start:stop]
+        horizon = int(needed[members[-1]])
+        counts = lengths[members]
+        lead_offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        lead_index = np.repeat(lead_starts[members] - lead_offsets, counts) + np.arange(counts.sum())
+        chunks.append((
+            point[members, :horizon], residuals[members], lead_times[lead_index],
+            lead_offsets, counts, [seeds[member] for member in members],
+            tuple(array[members] for array in arrays)
+        ))
+        start = stop
+    
+    if n_jobs == 1 or len(chunks) == 1:
+        results = [task(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            results = list(executor.map(task, chunks))
+    
+    part_metrics = np.empty((len(parts), n_outputs))
+    part_metrics[order] = np.concatenate(results)
+    metrics[found] = part_metrics[positions]
+    return metrics
+
+
+def _part_seed_key(part_name):
+    """Stable 64-bit integer derived from a part name, for seeding."""
+    
+    digest = hashlib.blake2b(str(part_name).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def simulate_demand_chunk(chunk, window_size, n_simulations):
+    """
+    Cumulative demand paths and lead-time draws for one chunk of parts.
+    
+    Returns:
+    --------
+    tuple
+        (paths, lead_time, arrays) where ``paths`` holds cumulative demand
+        as (parts x simulations x days), ``lead_time`` one lead time per path
+        drawn from the part's observed lead times, and ``arrays`` the chunk's
+        per-part inputs
+    """
+    
+    point, residuals, lead_times, lead_starts, lead_counts, seeds, arrays = chunk
+    rngs = [np.random.default_rng(seed) for seed in seeds]
+    
+    # Lead times are drawn first so a part's draws do not depend on the horizon
+    lead_uniforms = np.array([rng.random(n_simulations) for rng in rngs])
+    paths = bootstrap_paths(point, residuals, window_size, n_simulations, rngs)
+    np.cumsum(paths, axis=2, out=paths)
+    
+    draws = lead_starts[:, None] + (lead_uniforms * lead_counts[:, None]).astype(int)
+    lead_time = np.nan_to_num(lead_times[np.minimum(draws, len(lead_times) - 1)])
+    
+    return paths, lead_time, arrays
+
+
+def demand_over(paths, days):
+    """Cumulative demand of each path over its first ``days`` days."""
+    
+    days = np.clip(days, 1, paths.shape[2]).astype(int)
+    return np.take_along_axis(paths, days[:, :, None] - 1, axis=2)[:, :, 0]
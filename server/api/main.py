@@ -1,9 +1,21 @@
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List
+from functools import lru_cache
+import os
 import time
 import asyncio
 
+import numpy as np
+import pandas as pd
+
+from modules.analytics import (
+    calculate_correlation_matrix, clear_analytics_caches, find_correlated_parts,
+    get_analytics_cache_stats,
+)
+from modules.data_generator import generate_all_parts_data
+from modules.forecasting import compute_data_version, generate_cached_forecast, get_forecast_cache
+
 app = FastAPI(title="EVStockMaster API", version="0.1.0")
 
 app.add_middleware(
@@ -14,6 +26,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+DATA_PATH = "data/synthetic_parts_demand.csv"
+
+
+@lru_cache(maxsize=1)
+def load_inventory_data():
+    """Load the demand data once per process and compute its data version."""
+    if os.path.exists(DATA_PATH):
+        df = pd.read_csv(DATA_PATH)
+        df['date'] = pd.to_datetime(df['date'])
+    else:
+        df = generate_all_parts_data()
+    return df, compute_data_version(df)
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
@@ -42,7 +67,75 @@ def sentiment(symbol: str = Query(..., min_length=1)):
     return {"symbol": symbol.upper(), "score": 0.12, "trend": "rising", "keywords": ["LFP", "NACS", "4680"]}
 
 @app.post("/correlations")
-def correlations(symbols: List[str]):
-    n = len(symbols)
-    mat = [[1.0 if i==j else 0.3 for j in range(n)] for i in range(n)]
-    return {"symbols": symbols, "matrix": mat}
\ No newline at end of file
+def correlations(
+    symbols: List[str],
+    method: str = Query("pearson", pattern="^(pearson|spearman)$"),
+):
+    # Symbols are matched to part names; symbols without demand history, and
+    # the diagonal of constant series, get null
+    data, _ = load_inventory_data()
+    matrix = calculate_correlation_matrix(data, method=method, part_names=symbols)
+    values = matrix.reindex(index=symbols, columns=symbols).to_numpy()
+    mat = [[None if np.isnan(v) else round(float(v), 4) for v in row] for row in values]
+    return {"symbols": symbols, "method": method, "matrix": mat}
+
+@app.get("/correlations/neighbors")
+def correlation_neighbors(
+    part_name: str = Query(..., min_length=1),
+    k: int = Query(5, ge=1, le=100),
+    method: str = Query("pearson", pattern="^(pearson|spearman)$"),
+):
+    data, _ = load_inventory_data()
+    neighbors = find_correlated_parts(data, k=k, method=method, query_parts=[part_name])
+    if neighbors.empty and part_name not in set(data['part_name']):
+        raise HTTPException(status_code=404, detail=f"Unknown part: {part_name}")
+    return {
+        "part_name": part_name,
+        "method": method,
+        "neighbors": [
+            {"part_name": row.neighbor, "correlation": round(float(row.correlation), 4)}
+            for row in neighbors.itertuples(index=False)
+        ],
+    }
+
+@app.get("/forecast")
+def forecast(
+    part_name: str = Query(..., min_length=1),
+    window_size: int = Query(30, ge=7, le=90),
+    forecast_horizon: int = Query(30, ge=7, le=90),
+):
+    data, data_version = load_inventory_data()
+    forecast_df = generate_cached_forecast(
+        data, part_name, window_size, forecast_horizon, data_version=data_version
+    )
+    if forecast_df.empty:
+        raise HTTPException(status_code=404, detail=f"Unknown part: {part_name}")
+    rows = forecast_df.dropna(subset=['forecast'])
+    return {
+        "part_name": part_name,
+        "window_size": window_size,
+        "forecast_horizon": forecast_horizon,
+        "dates": rows['date'].dt.strftime('%Y-%m-%d').tolist(),
+        "forecast": rows['forecast'].round(2).tolist(),
+        "forecast_upper": rows['forecast_upper'].round(2).tolist(),
+        "forecast_lower": rows['forecast_lower'].round(2).tolist(),
+        "forecast_confidence": float(rows['forecast_confidence'].iloc[0]),
+    }
+
+@app.get("/forecast/cache")
+def forecast_cache_stats():
+    return get_forecast_cache().stats()
+
+@app.delete("/forecast/cache")
+def clear_forecast_cache():
+    get_forecast_cache().clear()
+    return get_forecast_cache().stats()
+
+@app.get("/analytics/cache")
+def analytics_cache_stats():
+    return get_analytics_cache_stats()
+
+@app.delete("/analytics/cache")
+def clear_analytics_cache():
+    clear_analytics_caches()
+    return get_analytics_cache_stats()
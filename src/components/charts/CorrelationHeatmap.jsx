@@ -1,6 +1,9 @@
 import React, { useEffect, useRef } from 'react'
 import * as d3 from 'd3'
 
+// Fill for pairs without a correlation (null), e.g. unknown names
+const MISSING_COLOR = '#e5e7eb'
+
 export default function CorrelationHeatmap({ symbols, matrix, size = 480 }) {
   const ref = useRef(null)
 
@@ -27,7 +30,7 @@ export default function CorrelationHeatmap({ symbols, matrix, size = 480 }) {
           .attr('width', cellSize)
           .attr('height', cellSize)
           .attr('rx', 2)
-          .attr('fill', color(matrix[i][j]))
+          .attr('fill', Number.isFinite(matrix[i][j]) ? color(matrix[i][j]) : MISSING_COLOR)
           .attr('opacity', i === j ? 0.4 : 1.0)
       }
     }
@@ -7,6 +7,7 @@ import KPIRow from '../components/analytics/KPIRow'
 import Tabs from '../components/analytics/Tabs'
 import Legend from '../components/analytics/Legend'
 import { THEMATIC_BASKETS } from '../utils/thematicBaskets'
+import { PART_BASKETS } from '../utils/partBaskets'
 import { 
   filterSankeyData, 
   computeKPIs, 
@@ -47,7 +48,7 @@ const sampleSankeyData = {
 }
 
 // Sample correlation data
-const sampleSymbols = ['TSLA', 'NIO', 'XPEV', 'LI', 'RIVN']
+const sampleSymbols = ['Battery Pack', 'Electric Motor', 'Charging Port', 'Control Unit', 'Cooling System']
 const sampleMatrix = [
   [1.0, 0.3, 0.2, 0.1, 0.4],
   [0.3, 1.0, 0.7, 0.6, 0.2],
@@ -64,7 +65,7 @@ export default function AnalyticsPage() {
   
   // UI state
   const [activeTab, setActiveTab] = useState('supplychain')
-  const [selectedBasket, setSelectedBasket] = useState('ChinaEV')
+  const [selectedPartBasket, setSelectedPartBasket] = useState('All Parts')
   const [correlationData, setCorrelationData] = useState({ symbols: sampleSymbols, matrix: sampleMatrix })
   
   // Data state
@@ -82,12 +83,13 @@ export default function AnalyticsPage() {
     setKPIs(computedKPIs)
   }, [selectedMaterials, selectedOEMs, minLinkThreshold])
 
-  const fetchCorrelations = async (symbols) => {
+  // The API correlates daily demand of the given part names
+  const fetchCorrelations = async (partNames) => {
     try {
       const response = await fetch('/api/correlations', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(symbols)
+        body: JSON.stringify(partNames)
       })
       const data = await response.json()
       setCorrelationData(data)
@@ -97,9 +99,9 @@ export default function AnalyticsPage() {
   }
 
   useEffect(() => {
-    const basketSymbols = THEMATIC_BASKETS[selectedBasket] || sampleSymbols
-    fetchCorrelations(basketSymbols)
-  }, [selectedBasket])
+    const basketParts = PART_BASKETS[selectedPartBasket] || sampleSymbols
+    fetchCorrelations(basketParts)
+  }, [selectedPartBasket])
 
   // Reset filters to defaults
   const handleResetFilters = () => {
@@ -158,15 +160,15 @@ export default function AnalyticsPage() {
         <div className="p-6">
           <div className="flex justify-between items-start mb-4">
             <div>
-              <h2 className="text-xl font-semibold heading-gradient">Stock Correlation Matrix</h2>
-              <p className="text-gray-600 mt-1">Correlation analysis for selected thematic basket</p>
+              <h2 className="text-xl font-semibold heading-gradient">Part Demand Correlation Matrix</h2>
+              <p className="text-gray-600 mt-1">Daily demand correlation for the selected part group</p>
             </div>
             <select 
-              value={selectedBasket}
-              onChange={(e) => setSelectedBasket(e.target.value)}
+              value={selectedPartBasket}
+              onChange={(e) => setSelectedPartBasket(e.target.value)}
               className="px-3 py-2 border border-gray-200 rounded-lg bg-white"
             >
-              {Object.keys(THEMATIC_BASKETS).map(basket => (
+              {Object.keys(PART_BASKETS).map(basket => (
                 <option key={basket} value={basket}>{basket}</option>
               ))}
             </select>
@@ -16,6 +16,19 @@ describe('CorrelationHeatmap', () => {
     expect(true).toBe(true)
   })
   
+  it('renders missing correlations in a neutral color', () => {
+    const symbols = ['Battery Pack', 'Unknown Part']
+    const matrix = [
+      [1.0, null],
+      [null, null]
+    ]
+    
+    const { container } = render(<CorrelationHeatmap symbols={symbols} matrix={matrix} />)
+    const fills = Array.from(container.querySelectorAll('rect')).map(rect => rect.getAttribute('fill'))
+    expect(fills).toHaveLength(4)
+    expect(fills.filter(fill => fill === '#e5e7eb')).toHaveLength(3)
+  })
+  
   it('handles empty data gracefully', () => {
     render(<CorrelationHeatmap symbols={[]} matrix={[]} />)
     // Should not crash with empty data
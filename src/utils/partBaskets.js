@@ -0,0 +1,7 @@
+// Part groups for the demand correlation view, by part family
+// (see EV_PARTS_CONFIG in modules/data_generator.py)
+export const PART_BASKETS = {
+  'All Parts': ['Battery Pack', 'Electric Motor', 'Charging Port', 'Control Unit', 'Cooling System'],
+  'Energy Storage': ['Battery Pack', 'Cooling System'],
+  Powertrain: ['Electric Motor', 'Control Unit'],
+}
@@ -0,0 +1,32 @@
+"""
+Shared fixtures for the backend module tests.
+"""
+
+import pandas as pd
+import pytest
+
+from modules.data_generator import generate_all_parts_data
+
+
+@pytest.fixture(scope="session")
+def parts_data():
+    """Three years of synthetic daily demand for every EV part."""
+    return generate_all_parts_data()
+
+
+@pytest.fixture(scope="session")
+def ragged_data(parts_data):
+    """
+    Shuffled demand data with uneven history lengths: one part starts late
+    and a tiny part has only five days.
+    """
+    data = parts_data[
+        ~((parts_data['part_name'] == 'Charging Port') & (parts_data['date'] < '2022-03-01'))
+    ]
+    tiny = pd.DataFrame({
+        'part_name': ['Tiny'] * 5,
+        'date': pd.date_range('2023-01-01', periods=5),
+        'demand': [3.0, 3.0, 3.0, 3.0, 3.0],
+        'lead_time': [1] * 5
+    })
+    return pd.concat([data, tiny], ignore_index=True).sample(frac=1, random_state=0)
@@ -0,0 +1,589 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from modules import analytics
+from modules.analytics import (
+    DemandStatisticsAccumulator,
+    PartStatisticsCache,
+    QuantileSketch,
+    build_leaderboard_metrics,
+    calculate_accumulator_statistics,
+    calculate_all_part_statistics,
+    calculate_correlation_matrix,
+    calculate_inventory_efficiency_metrics,
+    calculate_lagged_correlations,
+    calculate_part_statistics,
+    calculate_volatility_report,
+    clear_analytics_caches,
+    create_statistics_accumulators,
+    detect_demand_anomalies,
+    exclude_anomalous_days,
+    find_correlated_parts,
+    generate_leaderboard,
+    get_analytics_cache_stats,
+    get_leaderboard_cache,
+    rank_leaderboard,
+)
+from modules.forecasting import compute_data_version
+
+
+def assert_statistics_close(result, expected, path=''):
+    """Compare nested statistics dictionaries, ignoring the analysis timestamp."""
+    if isinstance(expected, dict):
+        assert set(result) == set(expected), (path, set(result) ^ set(expected))
+        for key in expected:
+            if key != 'analysis_date':
+                assert_statistics_close(result[key], expected[key], f'{path}/{key}')
+    elif expected is None or isinstance(expected, (str, bool)):
+        assert result == expected, path
+    elif np.isnan(expected):
+        assert np.isnan(result), path
+    else:
+        assert result == pytest.approx(expected, rel=1e-7, abs=1e-9), path
+
+
+@pytest.fixture
+def empty_caches():
+    clear_analytics_caches()
+    yield
+    clear_analytics_caches()
+
+
+@pytest.fixture(scope="module")
+def uneven_data(ragged_data):
+    battery = ragged_data[ragged_data['part_name'] == 'Battery Pack'].sort_values('date')
+    port = ragged_data[ragged_data['part_name'] == 'Charging Port'].sort_values('date')
+    data = pd.concat([
+        ragged_data,
+        battery.head(20).assign(part_name='Short'),
+        battery.head(1).assign(part_name='One'),
+        port.iloc[100:500].assign(part_name='Mid')
+    ], ignore_index=True)
+    data.loc[:2, 'demand'] = 0
+    return data
+
+
+def test_all_part_statistics_match_per_part(uneven_data):
+    statistics = calculate_all_part_statistics(uneven_data)
+    
+    assert list(statistics) == list(pd.unique(uneven_data['part_name']))
+    for part_name, part_statistics in statistics.items():
+        assert_statistics_close(part_statistics,
+                                calculate_part_statistics(uneven_data, part_name))
+
+
+def test_all_part_statistics_unknown_parts(uneven_data):
+    statistics = calculate_all_part_statistics(uneven_data, ['One', 'Unknown'])
+    
+    assert list(statistics) == ['One', 'Unknown']
+    assert statistics['Unknown'] == calculate_part_statistics(uneven_data, 'Unknown')
+
+
+def test_grouped_statistics_do_not_warn_on_short_histories(uneven_data):
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', RuntimeWarning)
+        calculate_all_part_statistics(uneven_data)
+        detect_demand_anomalies(uneven_data)
+
+
+def reference_leaderboard(data, sort_by):
+    """Leaderboard regenerated from scratch with per-part statistics."""
+    rows = []
+    for part_name in data['part_name'].unique():
+        statistics = calculate_part_statistics(data, part_name)
+        rows.append({
+            'part_name': part_name,
+            'avg_demand': round(statistics['basic_statistics']['mean'], 1),
+            'growth_rate': round(statistics['trend_analysis']['annual_growth_rate'], 2),
+            'volatility': round(
+                statistics['volatility_analysis']['overall_coefficient_of_variation'], 3
+            ),
+            'quality_score': round(statistics['data_quality']['quality_score'], 3),
+            'trend_strength': round(statistics['trend_analysis']['r_squared'], 3),
+            'data_points': statistics['basic_statistics']['count']
+        })
+    leaderboard = pd.DataFrame(rows).sort_values(sort_by, ascending=(sort_by == 'volatility'))
+    leaderboard.insert(0, 'rank', range(1, len(leaderboard) + 1))
+    leaderboard.insert(1, 'medal', ['🥇', '🥈', '🥉'] + [''] * (len(leaderboard) - 3))
+    return leaderboard
+
+
+@pytest.mark.parametrize("sort_by", ['avg_demand', 'growth_rate', 'volatility', 'quality_score'])
+def test_leaderboard_matches_regenerated_leaderboard(parts_data, empty_caches, sort_by):
+    pd.testing.assert_frame_equal(
+        generate_leaderboard(parts_data, sort_by).reset_index(drop=True),
+        reference_leaderboard(parts_data, sort_by).reset_index(drop=True),
+        check_dtype=False
+    )
+
+
+def test_leaderboard_metrics_are_cached_per_data_version(parts_data, empty_caches):
+    metrics = build_leaderboard_metrics(parts_data)
+    ranked = rank_leaderboard(metrics, 'growth_rate')
+    
+    pd.testing.assert_frame_equal(build_leaderboard_metrics(parts_data), metrics)
+    assert get_leaderboard_cache().stats()['hits'] == 1
+    assert 'rank' not in metrics.columns and list(ranked['rank']) == [1, 2, 3, 4, 5]
+    
+    changed = parts_data.copy()
+    changed.loc[changed.index[0], 'demand'] += 1
+    build_leaderboard_metrics(changed)
+    assert get_analytics_cache_stats()['leaderboard']['entries'] == 2
+    
+    clear_analytics_caches()
+    stats = get_analytics_cache_stats()
+    assert stats['leaderboard']['entries'] == 0 and stats['part_statistics']['entries'] == 0
+
+
+def test_leaderboard_from_supplied_statistics_bypasses_cache(parts_data, empty_caches):
+    full = build_leaderboard_metrics(parts_data)
+    subset = {'Battery Pack': calculate_part_statistics(parts_data, 'Battery Pack')}
+    
+    # Supplied statistics are used even when the data version is cached
+    assert generate_leaderboard(parts_data, statistics=subset)['part_name'].tolist() == [
+        'Battery Pack'
+    ]
+    
+    # ... and never stored under the full-data key
+    clear_analytics_caches()
+    generate_leaderboard(parts_data, statistics=subset)
+    assert get_leaderboard_cache().stats()['entries'] == 0
+    assert len(generate_leaderboard(parts_data)) == 5
+    pd.testing.assert_frame_equal(build_leaderboard_metrics(parts_data), full)
+
+
+def accumulators_for(data, part_name):
+    """The same part history fed to accumulators in every supported way."""
+    part_data = data[data['part_name'] == part_name].sort_values('date')
+    demand = part_data['demand'].to_numpy(dtype=float)
+    dates = part_data['date']
+    
+    one_by_one = DemandStatisticsAccumulator(part_name)
+    for value, date in zip(demand, dates):
+        one_by_one.update(value, date)
+    
+    first, second = len(demand) // 2, 3 * len(demand) // 4
+    merged = DemandStatisticsAccumulator(part_name)
+    merged.update_many(demand[:first], dates.iloc[first - 1])
+    tail = DemandStatisticsAccumulator(part_name)
+    tail.update_many(demand[first:second], dates.iloc[second - 1])
+    for value in demand[second:]:
+        tail.update(value)
+    merged.merge(tail)
+    
+    return [
+        one_by_one,
+        merged,
+        create_statistics_accumulators(data)[part_name],
+        DemandStatisticsAccumulator.from_history(data, part_name)
+    ]
+
+
+def test_accumulator_matches_batch_statistics(ragged_data):
+    part_data = ragged_data[ragged_data['part_name'] == 'Charging Port'].sort_values('date')
+    demand = part_data['demand'].to_numpy(dtype=float)
+    regression = stats.linregress(np.arange(len(demand)), demand)
+    
+    for accumulator in accumulators_for(ragged_data, 'Charging Port'):
+        basic = accumulator.basic_statistics()
+        assert basic['count'] == len(demand)
+        assert basic['mean'] == pytest.approx(demand.mean(), rel=1e-12)
+        assert basic['std'] == pytest.approx(demand.std(ddof=1), rel=1e-9)
+        assert (basic['min'], basic['max']) == (demand.min(), demand.max())
+        
+        trend = accumulator.trend_analysis()
+        assert trend['slope'] == pytest.approx(regression.slope, rel=1e-9)
+        assert trend['intercept'] == pytest.approx(regression.intercept, rel=1e-9)
+        assert trend['r_squared'] == pytest.approx(regression.rvalue ** 2, rel=1e-9)
+        assert trend['p_value'] == pytest.approx(regression.pvalue, rel=1e-6, abs=1e-300)
+        
+        assert accumulator.first_date == part_data['date'].iloc[0]
+        assert accumulator.last_date == part_data['date'].iloc[-1]
+
+
+def test_accumulator_statistics_match_part_statistics(ragged_data):
+    expected = calculate_part_statistics(ragged_data, 'Charging Port')
+    part_data = ragged_data[ragged_data['part_name'] == 'Charging Port']
+    
+    for accumulator in accumulators_for(ragged_data, 'Charging Port'):
+        result = calculate_accumulator_statistics(accumulator)
+        
+        assert set(result) == {'part_name', 'analysis_date', 'data_period',
+                               'basic_statistics', 'trend_analysis'}
+        assert result['data_period'] == expected['data_period']
+        assert_statistics_close(result['trend_analysis'], expected['trend_analysis'])
+        
+        # Quartiles come from the quantile sketch and are approximate
+        basic, exact = result['basic_statistics'], expected['basic_statistics']
+        for key, quantile in (('q25', 0.25), ('median', 0.5), ('q75', 0.75)):
+            rank = (part_data['demand'] <= basic[key]).mean()
+            assert rank == pytest.approx(quantile, abs=0.02)
+        for key in ('count', 'mean', 'std', 'min', 'max', 'range', 'cv'):
+            assert basic[key] == pytest.approx(exact[key], rel=1e-9)
+
+
+def test_accumulator_edge_cases():
+    empty = DemandStatisticsAccumulator('Empty')
+    assert 'error' in calculate_accumulator_statistics(empty)
+    assert 'error' in empty.trend_analysis()
+    
+    flat = DemandStatisticsAccumulator('Flat')
+    flat.update(3.0)
+    flat.update(3.0)
+    assert flat.trend_analysis()['trend_direction'] == 'stable'
+    assert flat.basic_statistics()['std'] == 0
+
+
+def rank_errors(sketch, values):
+    quantiles = np.linspace(0.01, 0.99, 99)
+    estimates = sketch.quantiles(quantiles)
+    ordered = np.sort(values)
+    return np.array([
+        abs(np.searchsorted(ordered, estimates[q]) / len(values) - q) for q in quantiles
+    ])
+
+
+def test_quantile_sketch_is_exact_below_capacity():
+    values = np.random.default_rng(0).lognormal(size=150)
+    sketch = QuantileSketch(200)
+    sketch.update_many(values)
+    
+    quantiles = [0.0, 0.1, 0.33, 0.5, 0.9, 1.0]
+    estimates = sketch.quantiles(quantiles)
+    np.testing.assert_allclose([estimates[q] for q in quantiles], np.quantile(values, quantiles))
+    assert np.isnan(QuantileSketch().quantile(0.5))
+
+
+def test_quantile_sketch_rank_error_within_bound():
+    values = np.random.default_rng(1).lognormal(size=50000)
+    
+    bulk = QuantileSketch(200, random_seed=0)
+    bulk.update_many(values)
+    
+    shards = [QuantileSketch(200, random_seed=seed) for seed in range(8)]
+    for shard, chunk in zip(shards, np.array_split(values, 8)):
+        shard.update_many(chunk)
+    merged = shards[0]
+    for shard in shards[1:]:
+        merged.merge(shard)
+    
+    mixed = QuantileSketch(200, random_seed=1)
+    for value in values[:5000]:
+        mixed.update(value)
+    mixed.update_many(values[5000:])
+    
+    for sketch in (bulk, merged, mixed):
+        assert sketch.count == len(values)
+        assert sketch.size() < 3 * 200
+        # 1.7 / k per query at 99% confidence; the worst of 99 queries may exceed it
+        errors = rank_errors(sketch, values)
+        assert errors.mean() < 1.7 / 200 and errors.max() < 3 / 200
+        assert sketch.quantile(0) == values.min() and sketch.quantile(1) == values.max()
+
+
+def test_sketch_outlier_bounds_track_exact_quartiles(parts_data):
+    spiked = parts_data[parts_data['part_name'] == 'Battery Pack'].copy()
+    spiked.loc[spiked.index[::40], 'demand'] *= 3
+    accumulator = DemandStatisticsAccumulator.from_history(spiked, 'Battery Pack')
+    
+    exact = calculate_part_statistics(spiked, 'Battery Pack')['data_quality']
+    sketched = calculate_part_statistics(spiked, 'Battery Pack', accumulator=accumulator)
+    
+    assert exact['outlier_rate'] > 0.02
+    assert sketched['data_quality']['outlier_rate'] == pytest.approx(
+        exact['outlier_rate'], abs=0.005
+    )
+
+
+def test_volatility_report_matches_pandas_rolling(ragged_data):
+    report = calculate_volatility_report(ragged_data, windows=(7, 14, 30))
+    
+    expected = []
+    for part_name in pd.unique(ragged_data['part_name']):
+        demand = ragged_data[ragged_data['part_name'] == part_name].sort_values('date')['demand']
+        for window in (7, 14, 30):
+            if len(demand) < window:
+                continue
+            cv = demand.rolling(window).std() / demand.rolling(window).mean()
+            expected.append({
+                'part_name': part_name, 'window': window, 'avg_cv': cv.mean(),
+                'max_cv': cv.max(), 'min_cv': cv.min(), 'current_cv': cv.iloc[-1],
+                'recent_cv': cv.tail(30).mean()
+            })
+    
+    pd.testing.assert_frame_equal(report, pd.DataFrame(expected), check_dtype=False, rtol=1e-7)
+
+
+def test_volatility_report_does_not_warn_on_short_histories(ragged_data):
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', RuntimeWarning)
+        report = calculate_volatility_report(ragged_data, windows=(7, 14, 30))
+    
+    assert 'Tiny' not in set(report['part_name'])
+
+
+@pytest.fixture(scope="module")
+def gappy_data(parts_data):
+    """Demand with randomly missing days and a part that starts late."""
+    data = parts_data.drop(parts_data.sample(500, random_state=0).index)
+    return data[~((data['part_name'] == 'Charging Port') & (data['date'] < '2022-01-01'))]
+
+
+@pytest.mark.parametrize("method", ['pearson', 'spearman'])
+def test_correlation_matrix_matches_pairwise_dataframe_corr(gappy_data, method):
+    correlation = calculate_correlation_matrix(gappy_data, method)
+    pivot = gappy_data.pivot(index='date', columns='part_name', values='demand')
+    
+    pd.testing.assert_frame_equal(
+        correlation, pivot[correlation.columns].corr(method=method),
+        check_names=False, rtol=1e-9
+    )
+
+
+@pytest.mark.parametrize("method", ['pearson', 'spearman'])
+def test_lagged_correlations_match_shifted_series(gappy_data, method):
+    lagged = calculate_lagged_correlations(gappy_data, lags=[0, 3], method=method)
+    pivot = gappy_data.pivot(index='date', columns='part_name', values='demand')
+    
+    for row in lagged.sample(12, random_state=0).itertuples():
+        leading = pivot[row.part_name]
+        following = pivot[row.lagged_part].shift(-row.lag)
+        assert row.correlation == pytest.approx(leading.corr(following, method=method))
+
+
+def test_top_k_neighbors_match_dense_matrix():
+    rng = np.random.default_rng(0)
+    n_parts, n_days = 60, 200
+    factors = rng.normal(size=(n_days, 6))
+    demand = factors[:, rng.integers(0, 6, n_parts)] + rng.normal(size=(n_days, n_parts))
+    data = pd.DataFrame({
+        'part_name': np.repeat([f'P{i}' for i in range(n_parts)], n_days),
+        'date': np.tile(pd.date_range('2021-01-01', periods=n_days), n_parts),
+        'demand': demand.T.ravel()
+    })
+    
+    neighbors = find_correlated_parts(data, k=4, block_size=16)
+    dense = calculate_correlation_matrix(data).to_numpy()
+    np.fill_diagonal(dense, -np.inf)
+    
+    np.testing.assert_allclose(
+        neighbors['correlation'].to_numpy().reshape(n_parts, 4),
+        np.sort(dense, axis=1)[:, ::-1][:, :4]
+    )
+    assert list(neighbors['rank'][:4]) == [1, 2, 3, 4]
+    
+    queried = find_correlated_parts(data, k=2, query_parts=['P3', 'Unknown'])
+    assert set(queried['part_name']) == {'P3'}
+
+
+def reference_efficiency_metrics(data, part_configs):
+    """The original per-part efficiency loop."""
+    rows = []
+    for part_name, config in part_configs.items():
+        part_data = data[data['part_name'] == part_name]
+        if part_data.empty:
+            continue
+        current_stock = config.get('current_stock', 0)
+        avg_demand = part_data['demand'].mean()
+        inventory_turnover = (avg_demand * 365) / max(current_stock, 1)
+        days_of_inventory = current_stock / max(avg_demand, 1)
+        high_demand_days = (part_data['demand'] > avg_demand * 1.5).sum()
+        service_level = 1 - (high_demand_days / len(part_data))
+        rows.append({
+            'part_name': part_name,
+            'current_stock': current_stock,
+            'avg_daily_demand': round(avg_demand, 1),
+            'inventory_turnover': round(inventory_turnover, 2),
+            'days_of_inventory': round(days_of_inventory, 1),
+            'estimated_service_level': round(service_level, 3),
+            'efficiency_score': round(
+                (inventory_turnover * service_level) / max(days_of_inventory, 1), 3
+            )
+        })
+    return pd.DataFrame(rows)
+
+
+def test_efficiency_metrics_match_per_part_loop(uneven_data):
+    part_configs = {
+        'Battery Pack': {'current_stock': 5000},
+        'Unknown': {'current_stock': 3},
+        'Control Unit': {},
+        'Charging Port': {'current_stock': 0},
+        'Short': {'current_stock': 12345}
+    }
+    expected = reference_efficiency_metrics(uneven_data, part_configs)
+    stock = pd.DataFrame(
+        {'current_stock': [config.get('current_stock', 0) for config in part_configs.values()]},
+        index=pd.Index(list(part_configs), name='part_name')
+    )
+    
+    for configs in (part_configs, stock, stock.reset_index()):
+        pd.testing.assert_frame_equal(
+            calculate_inventory_efficiency_metrics(uneven_data, configs), expected,
+            check_dtype=False
+        )
+    assert calculate_inventory_efficiency_metrics(uneven_data, {'Unknown': {}}).empty
+
+
+def test_part_statistics_cache_recomputes_only_changed_parts(parts_data, monkeypatch):
+    recomputed = []
+    calculate = analytics.calculate_all_part_statistics
+    
+    def spy(data, part_names=None, anomalies=None):
+        recomputed.append(list(part_names))
+        return calculate(data, part_names, anomalies)
+    
+    monkeypatch.setattr(analytics, 'calculate_all_part_statistics', spy)
+    cache = PartStatisticsCache()
+    cache.get_statistics(parts_data)
+    recomputed.clear()
+    
+    # Row order does not matter
+    cache.get_statistics(parts_data.sample(frac=1, random_state=0))
+    assert recomputed == []
+    
+    appended = pd.concat([parts_data, pd.DataFrame({
+        'part_name': ['Control Unit'], 'date': [pd.Timestamp('2024-01-02')],
+        'demand': [999], 'lead_time': [10]
+    })], ignore_index=True)
+    statistics = cache.get_statistics(appended)
+    assert recomputed == [['Control Unit']]
+    assert statistics['Control Unit']['basic_statistics']['count'] == 1097
+    assert_statistics_close(statistics['Control Unit'],
+                            calculate_part_statistics(appended, 'Control Unit'))
+    
+    # A corrected value or two swapped days keep the row count but move the hash
+    corrected = appended.copy()
+    corrected.loc[0, 'demand'] += 5
+    swapped = appended.copy()
+    rows = swapped.index[swapped['part_name'] == 'Charging Port'][:2]
+    swapped.loc[rows, 'demand'] = swapped.loc[rows[::-1], 'demand'].to_numpy()
+    
+    recomputed.clear()
+    cache.get_statistics(corrected)
+    cache.get_statistics(swapped)
+    assert recomputed == [['Battery Pack'], ['Battery Pack', 'Charging Port']]
+
+
+def test_part_statistics_cache_restamps_hits(parts_data, monkeypatch):
+    cache = PartStatisticsCache()
+    first = cache.get(parts_data, 'Battery Pack')
+    
+    class LaterDatetime(analytics.datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return analytics.datetime(2030, 1, 1, 12, 0, 0)
+    
+    monkeypatch.setattr(analytics, 'datetime', LaterDatetime)
+    second = cache.get(parts_data, 'Battery Pack')
+    
+    assert cache.stats()['hits'] == 1
+    assert second['analysis_date'] == '2030-01-01 12:00:00'
+    assert first['analysis_date'] != second['analysis_date']
+    assert second['basic_statistics'] == first['basic_statistics']
+
+
+def test_part_statistics_cache_rehashes_only_new_versions(parts_data, monkeypatch):
+    hashed = []
+    watermarks = analytics._part_watermarks
+    
+    def spy(data):
+        hashed.append(len(data))
+        return watermarks(data)
+    
+    monkeypatch.setattr(analytics, '_part_watermarks', spy)
+    cache = PartStatisticsCache()
+    version = compute_data_version(parts_data)
+    first = cache.get(parts_data, 'Battery Pack', data_version=version)
+    second = cache.get(parts_data, 'Battery Pack', data_version=version)
+    assert len(hashed) == 1
+    assert cache.stats()['hits'] == 1
+    assert second['basic_statistics'] == first['basic_statistics']
+    
+    changed = parts_data.copy()
+    changed.loc[changed['part_name'] == 'Battery Pack', 'demand'] += 1
+    statistics = cache.get(changed, 'Battery Pack', data_version=compute_data_version(changed))
+    assert len(hashed) == 2
+    assert_statistics_close(statistics, calculate_part_statistics(changed, 'Battery Pack'))
+    
+    # Without a version every lookup rehashes the data
+    cache.get(changed, 'Battery Pack')
+    assert len(hashed) == 3
+
+
+@pytest.fixture(scope="module")
+def spiked_data(parts_data):
+    """Demand with 40 tripled days after each part's first 60 days."""
+    rng = np.random.default_rng(0)
+    candidates = parts_data.index[parts_data.groupby('part_name').cumcount() > 60]
+    spikes = rng.choice(candidates, 40, replace=False)
+    data = parts_data.copy()
+    data.loc[spikes, 'demand'] *= 3
+    short = data[data['part_name'] == 'Battery Pack'].head(40).assign(part_name='Short')
+    return pd.concat([data, short]).sample(frac=1, random_state=2), data.loc[spikes]
+
+
+def reference_anomaly_scores(demand, window=28, season_length=7):
+    """Trailing-window robust z-scores, one day at a time."""
+    level = np.full(len(demand), np.nan)
+    for t in range(window, len(demand)):
+        level[t] = np.median(demand[t - window:t])
+    deviation = demand - level
+    
+    score = np.full(len(demand), np.nan)
+    for t in range(2 * window, len(demand)):
+        previous = deviation[t - window:t]
+        seasonal = np.median(deviation[t - season_length::-season_length][:window // season_length])
+        spread = np.abs(previous - np.median(previous))
+        scale = 1.4826 * np.median(spread) or 1.2533 * np.mean(spread)
+        score[t] = (deviation[t] - seasonal) / scale
+    return score
+
+
+def test_anomaly_scores_match_daily_loop(spiked_data):
+    data, _ = spiked_data
+    anomalies = detect_demand_anomalies(data)
+    
+    for part_name in ['Electric Motor', 'Short']:
+        demand = data[data['part_name'] == part_name].sort_values('date')['demand']
+        scores = anomalies[anomalies['part_name'] == part_name].sort_values('date')['score']
+        np.testing.assert_allclose(scores, reference_anomaly_scores(demand.to_numpy(float)))
+
+
+def test_anomaly_detection_finds_spikes_and_streams(spiked_data):
+    data, spikes = spiked_data
+    anomalies = detect_demand_anomalies(data)
+    
+    flagged = set(zip(anomalies['part_name'][anomalies['is_anomaly']],
+                      anomalies['date'][anomalies['is_anomaly']]))
+    planted = set(zip(spikes['part_name'], spikes['date']))
+    assert len(flagged & planted) >= 0.9 * len(planted)
+    assert len(flagged - planted) <= 0.01 * len(anomalies)
+    
+    streamed = detect_demand_anomalies(data, since='2023-10-01')
+    pd.testing.assert_frame_equal(
+        streamed.sort_values(['part_name', 'date']).reset_index(drop=True),
+        anomalies[anomalies['date'] > '2023-10-01']
+        .sort_values(['part_name', 'date']).reset_index(drop=True)
+    )
+    assert detect_demand_anomalies(data, since='2030-01-01').empty
+
+
+def test_excluded_anomalies_and_quality_scores(spiked_data):
+    data, _ = spiked_data
+    anomalies = detect_demand_anomalies(data)
+    n_flagged = anomalies['is_anomaly'].sum()
+    
+    assert len(exclude_anomalous_days(data, anomalies, 'drop')) == len(data) - n_flagged
+    cleaned = exclude_anomalous_days(data, anomalies)
+    assert (cleaned['demand'] != data['demand']).sum() <= n_flagged
+    assert cleaned['demand'].dtype == data['demand'].dtype
+    
+    single = calculate_part_statistics(data, 'Electric Motor', anomalies=anomalies)
+    grouped = calculate_all_part_statistics(data, anomalies=anomalies)['Electric Motor']
+    assert_statistics_close(grouped['data_quality'], single['data_quality'])
+    assert single['data_quality']['anomaly_rate'] > 0
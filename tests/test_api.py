@@ -0,0 +1,72 @@
+import pytest
+
+pytest.importorskip("fastapi.testclient")
+from fastapi.testclient import TestClient
+
+from modules.analytics import build_leaderboard_metrics, clear_analytics_caches
+from modules.forecasting import compute_data_version, get_forecast_cache
+from server.api import main
+from server.api.main import app, load_inventory_data
+
+
+@pytest.fixture
+def client():
+    get_forecast_cache().clear()
+    clear_analytics_caches()
+    return TestClient(app)
+
+
+def test_forecast_endpoint_uses_cache(client):
+    params = {'part_name': 'Battery Pack', 'forecast_horizon': 10}
+    first = client.get('/forecast', params=params)
+    second = client.get('/forecast', params=params)
+    
+    assert first.status_code == 200
+    assert first.json() == second.json()
+    assert len(first.json()['forecast']) == 10
+    
+    stats = client.get('/forecast/cache').json()
+    assert stats['hits'] == 1 and stats['misses'] == 1
+    
+    assert client.delete('/forecast/cache').json()['entries'] == 0
+
+
+def test_forecast_endpoint_unknown_part(client):
+    assert client.get('/forecast', params={'part_name': 'Unknown'}).status_code == 404
+
+
+def test_analytics_cache_endpoints(client):
+    build_leaderboard_metrics(*load_inventory_data())
+    stats = client.get('/analytics/cache').json()
+    assert stats['leaderboard']['entries'] == 1
+    assert stats['part_statistics']['entries'] > 0
+    
+    cleared = client.delete('/analytics/cache').json()
+    assert cleared['leaderboard']['entries'] == 0
+    assert cleared['part_statistics']['entries'] == 0
+
+
+@pytest.mark.parametrize("method", ['pearson', 'spearman'])
+def test_correlations_leave_unknown_parts_null(client, method):
+    symbols = ['Battery Pack', 'Unknown Part', 'Control Unit']
+    response = client.post('/correlations', params={'method': method}, json=symbols)
+    matrix = response.json()['matrix']
+    
+    assert response.status_code == 200
+    assert matrix[0][0] == 1.0 and matrix[2][2] == 1.0
+    assert matrix[1] == [None, None, None]
+    assert [row[1] for row in matrix] == [None, None, None]
+    assert matrix[0][2] == matrix[2][0] and -1 <= matrix[0][2] <= 1
+
+
+@pytest.mark.parametrize("method", ['pearson', 'spearman'])
+def test_correlations_leave_constant_series_null(client, monkeypatch, method):
+    data = load_inventory_data()[0].copy()
+    data.loc[data['part_name'] == 'Charging Port', 'demand'] = 5.0
+    monkeypatch.setattr(main, 'load_inventory_data', lambda: (data, compute_data_version(data)))
+    
+    symbols = ['Battery Pack', 'Charging Port']
+    matrix = client.post('/correlations', params={'method': method}, json=symbols).json()['matrix']
+    
+    assert matrix[0][0] == 1.0
+    assert matrix[1] == [None, None] and matrix[0][1] is None
@@ -0,0 +1,437 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.data_generator import get_part_families
+from modules.forecasting import (
+    ForecastCache,
+    IncrementalForecaster,
+    backtest_forecast,
+    calculate_forecast_accuracy,
+    compute_data_version,
+    detect_seasonality_batch,
+    estimate_seasonal_factors,
+    fit_exponential_smoothing,
+    generate_advanced_forecast,
+    generate_batch_exponential_forecast,
+    generate_cached_forecast,
+    generate_exponential_forecast,
+    generate_batch_forecast,
+    generate_forecast,
+    generate_hierarchical_forecast,
+    generate_probabilistic_forecast,
+    select_best_window_sizes,
+    select_forecast_models,
+)
+from modules.insight_engine import generate_insights
+from modules.kernels import build_demand_matrix
+
+
+def assert_frames_close(result, expected):
+    pd.testing.assert_frame_equal(
+        result.reset_index(drop=True), expected.reset_index(drop=True),
+        check_dtype=False, rtol=1e-7, atol=1e-6
+    )
+
+
+@pytest.mark.parametrize("window_size,forecast_horizon", [(30, 30), (7, 90), (90, 7), (5, 10)])
+def test_batch_forecast_matches_generate_forecast(ragged_data, window_size, forecast_horizon):
+    batch = generate_batch_forecast(ragged_data, window_size, forecast_horizon)
+    
+    assert set(batch['part_name']) == set(ragged_data['part_name'])
+    for part_name, part_forecast in batch.groupby('part_name', sort=False):
+        expected = generate_forecast(ragged_data, part_name, window_size, forecast_horizon)
+        assert_frames_close(part_forecast, expected)
+
+
+def test_batch_forecast_skips_unknown_parts(ragged_data):
+    batch = generate_batch_forecast(ragged_data, part_names=['Tiny', 'Battery Pack', 'Unknown'])
+    
+    assert list(batch['part_name'].unique()) == ['Tiny', 'Battery Pack']
+
+
+FORECAST_COLUMNS = ['part_name', 'date', 'demand', 'sma', 'sma_short', 'sma_long',
+                    'rolling_std', 'forecast', 'forecast_upper', 'forecast_lower',
+                    'trend_strength', 'forecast_confidence']
+
+
+@pytest.mark.parametrize("window_size", [7, 45])
+def test_incremental_forecaster_matches_generate_forecast(parts_data, window_size):
+    part_data = parts_data[parts_data['part_name'] == 'Electric Motor']
+    forecaster = IncrementalForecaster.from_history(
+        part_data.iloc[:-120], 'Electric Motor', window_size
+    )
+    for row in part_data.iloc[-120:].itertuples():
+        indicators = forecaster.update(row.demand, row.date)
+    
+    expected = generate_forecast(parts_data, 'Electric Motor', window_size, 40)
+    assert_frames_close(forecaster.forecast(40), expected[FORECAST_COLUMNS].tail(40))
+    
+    last_observed = expected.dropna(subset=['demand']).iloc[-1]
+    for name, value in indicators.items():
+        assert value == pytest.approx(last_observed[name])
+    
+    factors = estimate_seasonal_factors(parts_data, 40, window_size).loc['Electric Motor']
+    expected = generate_forecast(parts_data, 'Electric Motor', window_size, 40, factors)
+    assert_frames_close(forecaster.forecast(40, factors), expected[FORECAST_COLUMNS].tail(40))
+
+
+def test_incremental_forecaster_short_history(parts_data):
+    short = parts_data.groupby('part_name').head(5)
+    forecaster = IncrementalForecaster.from_history(short, 'Battery Pack', 30)
+    
+    expected = generate_forecast(short, 'Battery Pack', 30, 10)
+    assert_frames_close(forecaster.forecast(10), expected[FORECAST_COLUMNS].tail(10))
+
+
+def test_cached_forecast_hits_and_invalidates_on_data_change(parts_data):
+    cache = ForecastCache()
+    expected = generate_forecast(parts_data, 'Battery Pack')
+    
+    first = generate_cached_forecast(parts_data, 'Battery Pack', cache=cache)
+    first.loc[0, 'demand'] = -1
+    second = generate_cached_forecast(parts_data, 'Battery Pack', cache=cache)
+    
+    pd.testing.assert_frame_equal(second, expected)
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+    
+    changed = parts_data.copy()
+    changed.loc[changed.index[-1], 'demand'] += 1
+    assert compute_data_version(changed) != compute_data_version(parts_data)
+    generate_cached_forecast(changed, 'Battery Pack', cache=cache)
+    assert cache.stats()['misses'] == 2
+
+
+def test_forecast_cache_evicts_least_recently_used(parts_data):
+    entry_bytes = int(generate_forecast(parts_data, 'Battery Pack').memory_usage(deep=True).sum())
+    cache = ForecastCache(max_bytes=int(entry_bytes * 2.5))
+    version = compute_data_version(parts_data)
+    
+    for part_name in ['Battery Pack', 'Electric Motor', 'Battery Pack', 'Charging Port']:
+        generate_cached_forecast(parts_data, part_name, data_version=version, cache=cache)
+    
+    stats = cache.stats()
+    assert stats['entries'] == 2 and stats['current_bytes'] <= stats['max_bytes']
+    generate_cached_forecast(parts_data, 'Battery Pack', data_version=version, cache=cache)
+    assert cache.stats()['hits'] == 2
+
+
+def reference_holt_winters(y, alpha, beta, gamma, season_length, forecast_horizon):
+    """Scalar additive Holt-Winters recursion, one observation at a time."""
+    level = np.mean(y[:season_length])
+    trend = (np.mean(y[season_length:2 * season_length]) - level) / season_length
+    season = list(y[:season_length] - level)
+    sse = 0.0
+    for t in range(season_length, len(y)):
+        seasonal = season[t % season_length]
+        sse += (y[t] - (level + trend + seasonal)) ** 2
+        new_level = alpha * (y[t] - seasonal) + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        season[t % season_length] = gamma * (y[t] - new_level) + (1 - gamma) * seasonal
+        level = new_level
+    forecast = [
+        max(level + k * trend + season[(len(y) - 1 + k) % season_length], 0)
+        for k in range(1, forecast_horizon + 1)
+    ]
+    return np.array(forecast), sse
+
+
+def test_exponential_smoothing_matches_scalar_recursion(ragged_data):
+    parts, values, _, _ = build_demand_matrix(ragged_data)
+    fixed = fit_exponential_smoothing(values, 10, alphas=(0.3,), betas=(0.05,), gammas=(0.1,))
+    searched = fit_exponential_smoothing(values, 10)
+    
+    for i, part_name in enumerate(parts):
+        y = values[i][~np.isnan(values[i])]
+        if len(y) < 14:
+            assert np.isnan(searched['forecast'][i]).all()
+            continue
+        
+        forecast, sse = reference_holt_winters(y, 0.3, 0.05, 0.1, 7, 10)
+        np.testing.assert_allclose(fixed['forecast'][i], forecast)
+        assert fixed['sse'][i] == pytest.approx(sse)
+        
+        forecast, _ = reference_holt_winters(
+            y, searched['alpha'][i], searched['beta'][i], searched['gamma'][i], 7, 10
+        )
+        np.testing.assert_allclose(searched['forecast'][i], forecast)
+
+
+def test_batch_exponential_forecast_matches_single_part(ragged_data):
+    batch = generate_batch_exponential_forecast(ragged_data, 14)
+    
+    assert 'Tiny' not in set(batch['part_name'])
+    for part_name, part_forecast in batch.groupby('part_name', sort=False):
+        single = generate_exponential_forecast(ragged_data, part_name, 14).dropna(
+            subset=['forecast']
+        ).tail(14)
+        np.testing.assert_allclose(part_forecast['forecast'], single['forecast'])
+        np.testing.assert_array_equal(part_forecast['date'], single['date'])
+
+
+def test_backtest_sma_matches_truncated_forecasts(ragged_data):
+    results = backtest_forecast(ragged_data, window_sizes=(7, 30), forecast_horizon=14,
+                                n_origins=6)
+    
+    assert set(results['method']) == {'sma'}
+    for row in results.itertuples():
+        part_data = ragged_data[ragged_data['part_name'] == row.part_name].sort_values('date')
+        train = part_data[part_data['date'] <= row.cutoff]
+        test = part_data[part_data['date'] > row.cutoff].head(14)
+        forecast = generate_forecast(train, row.part_name, row.window_size, 14)
+        accuracy = calculate_forecast_accuracy(
+            test['demand'].to_numpy(), forecast['forecast'].dropna().to_numpy()
+        )
+        assert row.MAE == pytest.approx(accuracy['MAE'])
+        assert row.RMSE == pytest.approx(accuracy['RMSE'])
+        assert row.MAPE == pytest.approx(accuracy['MAPE'])
+    
+    best = select_best_window_sizes(results).set_index('part_name')
+    mean_mape = results.groupby(['part_name', 'window_size'])['MAPE'].mean().unstack()
+    for part_name, row in best.iterrows():
+        assert row['window_size'] == mean_mape.loc[part_name].idxmin()
+
+
+def test_backtest_is_independent_of_chunking(ragged_data):
+    kwargs = dict(window_sizes=(7, 30), forecast_horizon=14, n_origins=4,
+                  methods=('sma', 'exponential', 'trend'))
+    serial = backtest_forecast(ragged_data, **kwargs)
+    parallel = backtest_forecast(ragged_data, chunk_size=2, n_jobs=2, **kwargs)
+    
+    pd.testing.assert_frame_equal(serial, parallel)
+
+
+def test_model_selection_matches_holdout_refits(parts_data):
+    selection = select_forecast_models(parts_data, holdout_days=21, window_size=14)
+    cutoff = parts_data['date'].max() - pd.Timedelta(days=21)
+    train = parts_data[parts_data['date'] <= cutoff]
+    test = parts_data[parts_data['date'] > cutoff]
+    
+    for row in selection.itertuples():
+        actual = test.loc[test['part_name'] == row.part_name, 'demand'].to_numpy()
+        scores = {}
+        for method in ('sma', 'exponential', 'trend'):
+            forecast = generate_advanced_forecast(
+                train, row.part_name, method=method, window_size=14, forecast_horizon=21
+            )
+            predicted = forecast['forecast'].dropna().to_numpy()[-21:]
+            scores[method] = calculate_forecast_accuracy(actual, predicted)['MAPE']
+            assert getattr(row, f'{method}_mape') == pytest.approx(scores[method])
+        
+        assert row.best_method == min(scores, key=scores.get)
+    
+    auto = generate_advanced_forecast(parts_data, 'Battery Pack', method='auto',
+                                      holdout_days=21, window_size=14, forecast_horizon=10)
+    assert auto.attrs['model_selection']['best_method'] == (
+        selection.set_index('part_name').loc['Battery Pack', 'best_method']
+    )
+
+
+def test_seasonality_batch_matches_single_series_periodogram(parts_data):
+    result = detect_seasonality_batch(parts_data, max_period=60).set_index('part_name')
+    
+    for part_name, part_data in parts_data.groupby('part_name'):
+        demand = part_data.sort_values('date')['demand'].to_numpy()
+        days = np.arange(len(demand))
+        residual = demand - np.polyval(np.polyfit(days, demand, 1), days)
+        power = np.abs(np.fft.rfft(residual)) ** 2
+        frequencies = np.fft.rfftfreq(len(demand))
+        band = (frequencies > 0) & (frequencies >= 1 / 60) & (frequencies <= 1 / 2)
+        peak = np.flatnonzero(band)[np.argmax(power[band])]
+        
+        assert result.loc[part_name, 'dominant_period'] == pytest.approx(1 / frequencies[peak])
+        assert result.loc[part_name, 'dominant_strength'] == pytest.approx(
+            power[peak] / power[band].sum()
+        )
+
+
+def test_seasonality_batch_finds_planted_weekly_cycle():
+    rng = np.random.default_rng(0)
+    dates = pd.date_range('2021-01-01', periods=700)
+    noise = rng.normal(100, 10, len(dates))
+    data = pd.concat([
+        pd.DataFrame({'part_name': 'noise', 'date': dates, 'demand': noise}),
+        pd.DataFrame({'part_name': 'weekly', 'date': dates,
+                      'demand': noise + 15 * (dates.weekday >= 5)}),
+        pd.DataFrame({'part_name': 'tiny', 'date': dates[:20], 'demand': noise[:20]})
+    ])
+    
+    result = detect_seasonality_batch(data, max_period=30).set_index('part_name')
+    
+    assert result.loc['weekly', 'seasonal']
+    assert result.loc['weekly', 'dominant_period'] == pytest.approx(7, abs=0.05)
+    assert not result.loc['noise', 'seasonal']
+    assert not result.loc['tiny', 'seasonal']
+    assert np.isnan(result.loc['tiny', 'dominant_period'])
+
+
+def test_seasonal_factors_feed_batch_and_single_forecasts(parts_data):
+    factors = estimate_seasonal_factors(parts_data, forecast_horizon=20, window_size=30)
+    batch = generate_batch_forecast(parts_data, 30, 20, seasonal_factors=factors)
+    
+    for part_name, part_forecast in batch.groupby('part_name', sort=False):
+        expected = generate_forecast(parts_data, part_name, 30, 20,
+                                     seasonal_factors=factors.loc[part_name])
+        assert_frames_close(part_forecast, expected)
+
+
+@pytest.mark.parametrize("method", ['exponential', 'trend'])
+def test_advanced_forecast_ignores_sma_options_for_smoothing_methods(parts_data, method):
+    factors = estimate_seasonal_factors(parts_data, forecast_horizon=14)
+    
+    plain = generate_advanced_forecast(parts_data, 'Battery Pack', method=method,
+                                       forecast_horizon=14)
+    with_options = generate_advanced_forecast(
+        parts_data, 'Battery Pack', method=method, forecast_horizon=14, window_size=30,
+        seasonal_factors=factors.loc['Battery Pack']
+    )
+    pd.testing.assert_frame_equal(plain, with_options)
+
+
+def test_auto_forecast_passes_sma_options_to_the_selected_method(parts_data):
+    dates = pd.date_range('2021-01-01', periods=400)
+    weekly = pd.DataFrame({
+        'part_name': 'Weekly Part',
+        'date': dates,
+        'demand': 100 + 40 * (dates.weekday >= 5) + np.random.default_rng(1).normal(0, 3, 400)
+    })
+    data = pd.concat([parts_data, weekly], ignore_index=True)
+    factors = estimate_seasonal_factors(data, forecast_horizon=14)
+    
+    selected = set()
+    for part_name in ['Battery Pack', 'Weekly Part']:
+        kwargs = dict(forecast_horizon=14, window_size=30,
+                      seasonal_factors=factors.loc[part_name])
+        auto = generate_advanced_forecast(data, part_name, method='auto', **kwargs)
+        best_method = auto.attrs.pop('model_selection')['best_method']
+        expected = generate_advanced_forecast(data, part_name, method=best_method, **kwargs)
+        pd.testing.assert_frame_equal(auto, expected)
+        selected.add(best_method)
+    
+    assert 'sma' in selected and len(selected) == 2
+
+
+def test_probabilistic_forecast_bands_around_batch_forecast(ragged_data):
+    bands = generate_probabilistic_forecast(ragged_data, 30, 20, quantiles=(0.1, 0.5, 0.9),
+                                            n_simulations=500, random_seed=1)
+    batch = generate_batch_forecast(ragged_data, 30, 20).dropna(subset=['forecast'])
+    
+    merged = bands.merge(batch, on=['part_name', 'date'], suffixes=('', '_batch'))
+    assert len(merged) == len(bands) == len(batch)
+    np.testing.assert_allclose(merged['forecast'], merged['forecast_batch'])
+    assert (bands['p10'] <= bands['p50']).all() and (bands['p50'] <= bands['p90']).all()
+    
+    # Parts without a full window of residuals have no spread
+    tiny = bands[bands['part_name'] == 'Tiny']
+    np.testing.assert_allclose(tiny['p10'], tiny['p90'])
+    
+    # Spread grows with the horizon as simulated shocks accumulate
+    battery = bands[bands['part_name'] == 'Battery Pack']
+    spread = (battery['p90'] - battery['p10']).to_numpy()
+    assert spread[-5:].mean() > spread[:5].mean()
+
+
+def test_probabilistic_forecast_is_reproducible(parts_data):
+    first = generate_probabilistic_forecast(parts_data, n_simulations=300, random_seed=3)
+    second = generate_probabilistic_forecast(parts_data, n_simulations=300, random_seed=3)
+    
+    pd.testing.assert_frame_equal(first, second)
+
+
+@pytest.mark.parametrize("window_size", [7, 30, 90])
+def test_compact_forecast_matches_full_forecast(ragged_data, window_size):
+    string_dates = ragged_data.assign(date=ragged_data['date'].dt.strftime('%Y-%m-%d'))
+    
+    for data in (ragged_data, string_dates):
+        for part_name in ['Battery Pack', 'Charging Port', 'Tiny']:
+            expected = generate_forecast(data, part_name, window_size, 20)
+            compact = generate_forecast(data, part_name, window_size, 20, compact=True)
+            
+            assert_frames_close(compact.to_frame(), expected[FORECAST_COLUMNS])
+            for threshold_days in (14, 40):
+                assert (generate_insights(compact, 5000, threshold_days)
+                        == generate_insights(expected, 5000, threshold_days))
+
+
+def test_compact_forecast_views_sorted_history(parts_data):
+    compact = generate_forecast(parts_data, 'Battery Pack', compact=True)
+    
+    assert np.shares_memory(compact.history_demand, parts_data['demand'].to_numpy())
+    assert generate_forecast(parts_data, 'Unknown', compact=True).empty
+
+
+@pytest.mark.parametrize("method", ['exponential', 'trend', 'auto'])
+def test_compact_output_is_rejected_for_non_sma_methods(parts_data, method):
+    with pytest.raises(ValueError, match="only available for method 'sma'"):
+        generate_advanced_forecast(parts_data, 'Battery Pack', method=method, compact=True)
+
+
+@pytest.mark.parametrize("method", ['bottom_up', 'ols', 'mint'])
+def test_hierarchical_forecast_is_coherent(parts_data, method):
+    result = generate_hierarchical_forecast(parts_data, method=method)
+    reconciled = result.pivot_table(index='date', columns='node', values='reconciled_forecast')
+    
+    families = pd.Series(get_part_families())
+    for family, members in families.groupby(families).groups.items():
+        np.testing.assert_allclose(reconciled[family], reconciled[list(members)].sum(axis=1))
+    np.testing.assert_allclose(reconciled['Total'],
+                               reconciled[families.unique().tolist()].sum(axis=1))
+
+
+@pytest.mark.parametrize("method", ['bottom_up', 'ols', 'mint'])
+def test_hierarchical_forecast_handles_histories_ending_early(parts_data, method):
+    data = parts_data[(parts_data['part_name'] != 'Battery Pack')
+                      | (parts_data['date'] <= '2023-12-01')]
+    result = generate_hierarchical_forecast(data, method=method)
+    base = result.pivot_table(index='date', columns='node', values='base_forecast')
+    reconciled = result.pivot_table(index='date', columns='node', values='reconciled_forecast')
+    
+    assert np.isfinite(base.to_numpy()).all()
+    assert np.isfinite(reconciled.to_numpy()).all()
+    expected = generate_forecast(data, 'Battery Pack', 30, 30)['forecast'].dropna()
+    np.testing.assert_allclose(base['Battery Pack'].to_numpy(), expected.to_numpy())
+    
+    families = pd.Series(get_part_families())
+    for family, members in families.groupby(families).groups.items():
+        np.testing.assert_allclose(reconciled[family], reconciled[list(members)].sum(axis=1))
+
+
+@pytest.mark.parametrize("method", ['bottom_up', 'ols', 'mint'])
+def test_hierarchical_forecast_contains_non_finite_series(parts_data, method):
+    data = parts_data.copy()
+    last = (data['part_name'] == 'Charging Port') & (data['date'] == data['date'].max())
+    data.loc[last, 'demand'] = np.inf
+    result = generate_hierarchical_forecast(data, method=method)
+    reconciled = result.pivot_table(index='date', columns='node', values='reconciled_forecast',
+                                    dropna=False)
+    
+    healthy = reconciled.drop(columns=['Charging Port'])
+    assert np.isfinite(healthy.to_numpy()).all()
+
+
+def test_hierarchical_base_forecasts_match_aggregated_series(parts_data):
+    result = generate_hierarchical_forecast(parts_data, window_size=14, forecast_horizon=10,
+                                            method='ols')
+    base = result.pivot_table(index='node', columns='date', values='base_forecast', sort=False)
+    
+    families = get_part_families()
+    aggregated = pd.concat([
+        parts_data,
+        parts_data.assign(part_name=parts_data['part_name'].map(families)),
+        parts_data.assign(part_name='Total')
+    ]).groupby(['part_name', 'date'], as_index=False)['demand'].sum()
+    for node in base.index:
+        expected = generate_forecast(aggregated, node, 14, 10)['forecast'].dropna()
+        np.testing.assert_allclose(base.loc[node].to_numpy(), expected.to_numpy())
+    
+    # OLS reconciliation is the orthogonal projection onto coherent forecasts
+    nodes = base.index.to_numpy()
+    parts = nodes[np.isin(nodes, list(families))]
+    summing = np.array([
+        [node == 'Total' or families[part] == node or part == node for part in parts]
+        for node in nodes
+    ], dtype=float)
+    expected = summing @ np.linalg.lstsq(summing, base.to_numpy(), rcond=None)[0]
+    reconciled = result.pivot_table(index='node', columns='date', values='reconciled_forecast',
+                                    sort=False)
+    np.testing.assert_allclose(reconciled.loc[nodes].to_numpy(), expected)
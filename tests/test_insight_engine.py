@@ -0,0 +1,246 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import modules.insight_engine as insight_engine
+from modules.forecasting import detect_seasonality, generate_forecast
+from modules.insight_engine import (
+    analyze_demand_volatility,
+    calculate_reorder_plan,
+    evaluate_what_if_scenarios,
+    generate_batch_supply_chain_insights,
+    generate_insights,
+    generate_reorder_recommendations,
+    generate_supply_chain_insights,
+    lookup_what_if_insights,
+    simulate_stockout_risk,
+)
+
+
+PRIORITY = {'Critical': 3, 'Warning': 2, 'Healthy': 1, 'Unknown': 0}
+
+
+def reference_recommendation(data, part_name, config):
+    """One part's recommendation from generate_forecast and generate_insights."""
+    insights = generate_insights(
+        generate_forecast(data, part_name, config.get('window_size', 30),
+                          config.get('forecast_horizon', 30)),
+        config['current_stock'],
+        config.get('reorder_threshold_days', 14)
+    )
+    return {
+        'part_name': part_name,
+        'current_stock': config['current_stock'],
+        'status': insights['status'],
+        'recommendation': insights['recommendation'],
+        'days_of_stock': insights['metrics'].get('days_of_stock', 0),
+        'recommended_order': insights['metrics'].get('recommended_order_quantity', 0),
+        'priority': PRIORITY[insights['status']]
+    }
+
+
+def test_reorder_recommendations_match_generate_insights(ragged_data):
+    part_names = ['Battery Pack', 'Electric Motor', 'Charging Port', 'Control Unit',
+                  'Cooling System', 'Tiny', 'Unknown']
+    rng = np.random.default_rng(0)
+    
+    for _ in range(6):
+        part_configs = {
+            part_name: {
+                'current_stock': int(rng.choice([0, 10, 2000, 8000, 30000, 100000])),
+                'reorder_threshold_days': int(rng.choice([7, 14, 40])),
+                'window_size': int(rng.choice([7, 30])),
+                'forecast_horizon': int(rng.choice([10, 30]))
+            }
+            for part_name in part_names
+        }
+        expected = pd.DataFrame([
+            reference_recommendation(ragged_data, part_name, config)
+            for part_name, config in part_configs.items()
+        ]).sort_values('priority', ascending=False)
+        
+        pd.testing.assert_frame_equal(
+            generate_reorder_recommendations(ragged_data, part_configs), expected,
+            check_dtype=False
+        )
+
+
+def test_reorder_plan_covers_every_status(ragged_data):
+    plan = calculate_reorder_plan(
+        ragged_data, ['Battery Pack', 'Battery Pack', 'Battery Pack', 'Unknown'],
+        current_stock=[100, 10000, 10 ** 6, 100], reorder_threshold_days=14
+    )
+    
+    assert list(plan['status']) == ['Critical', 'Warning', 'Healthy', 'Unknown']
+    assert plan['recommendation'][0].startswith('URGENT: Order ')
+    assert plan['recommendation'][1].startswith('Reorder recommended: ')
+    for row in plan.itertuples():
+        if row.status != 'Unknown':
+            metrics = generate_insights(
+                generate_forecast(ragged_data, row.part_name), row.current_stock, 14
+            )['metrics']
+            assert row.avg_daily_demand == pytest.approx(metrics['avg_daily_demand'])
+            assert row.safety_stock == pytest.approx(metrics['safety_stock'])
+
+
+@pytest.mark.parametrize("window_size", [7, 30])
+def test_volatility_matches_pandas_rolling(ragged_data, window_size):
+    for part_name in ['Battery Pack', 'Charging Port', 'Tiny']:
+        demand = ragged_data[ragged_data['part_name'] == part_name].sort_values('date')['demand']
+        result = analyze_demand_volatility(ragged_data, part_name, window_size)
+        
+        if len(demand) < window_size:
+            assert result == {'volatility': 'insufficient_data'}
+            continue
+        cv = demand.rolling(window_size).std() / demand.rolling(window_size).mean()
+        assert result['recent_cv'] == pytest.approx(cv.tail(30).mean(), abs=1e-3)
+        assert result['overall_cv'] == pytest.approx(demand.std() / demand.mean(), abs=1e-3)
+
+
+def test_seasonality_matches_calendar_group_means(ragged_data):
+    for part_name in ['Battery Pack', 'Charging Port']:
+        part_data = ragged_data[ragged_data['part_name'] == part_name]
+        monthly = part_data.groupby(part_data['date'].dt.month)['demand'].mean()
+        weekly = part_data.groupby(part_data['date'].dt.weekday)['demand'].mean()
+        
+        result = detect_seasonality(ragged_data, part_name)
+        assert result['monthly_cv'] == pytest.approx(monthly.std() / monthly.mean())
+        assert result['weekly_cv'] == pytest.approx(weekly.std() / weekly.mean())
+    
+    assert detect_seasonality(ragged_data, 'Tiny')['pattern'] == 'insufficient_data'
+
+
+def test_supply_chain_insights_match_separate_analyses(ragged_data):
+    part_configs = {
+        'Battery Pack': {'current_stock': 500, 'lead_time_days': 7},
+        'Charging Port': {'current_stock': 20000, 'lead_time_days': 14},
+        'Cooling System': {'current_stock': 5000, 'lead_time_days': 30},
+        'Unknown': {'current_stock': 10}
+    }
+    batch = generate_batch_supply_chain_insights(ragged_data, part_configs)
+    
+    assert list(batch) == list(part_configs)
+    for part_name, config in part_configs.items():
+        lead_time_days = config.get('lead_time_days', 14)
+        single = generate_supply_chain_insights(ragged_data, part_name, config['current_stock'],
+                                                lead_time_days)
+        assert batch[part_name] == single
+        
+        forecast = generate_forecast(ragged_data, part_name, forecast_horizon=lead_time_days * 2)
+        insights = generate_insights(forecast, config['current_stock'], lead_time_days)
+        assert single['basic_insights'] == insights
+        if not forecast.empty:
+            volatility = analyze_demand_volatility(ragged_data, part_name)
+            assert single['volatility_analysis'] == volatility
+            assert single['seasonality_analysis'] == detect_seasonality(ragged_data, part_name)
+            lead_time_demand = forecast['forecast'].dropna().head(lead_time_days).sum()
+            assert single['lead_time_analysis']['lead_time_demand'] == round(lead_time_demand, 0)
+    
+    assert batch['Unknown']['basic_insights']['status'] == 'Unknown'
+
+
+STOCKOUT_PARTS = ['Battery Pack', 'Electric Motor', 'Charging Port', 'Control Unit',
+                  'Cooling System', 'Ghost']
+STOCKOUT_STOCK = [5000, 20000, 30000, 15000, 2000, 10]
+
+
+def test_stockout_risk_is_invariant_to_chunking_and_request(parts_data):
+    options = {'n_simulations': 300, 'random_seed': 1}
+    result = simulate_stockout_risk(parts_data, STOCKOUT_PARTS, STOCKOUT_STOCK, 14, **options)
+    
+    assert result['part_name'].tolist() == STOCKOUT_PARTS
+    assert result.iloc[-1].drop(['part_name', 'current_stock',
+                                 'reorder_threshold_days']).isna().all()
+    assert result['stockout_probability'].iloc[:-1].between(0, 1).all()
+    
+    chunked = simulate_stockout_risk(parts_data, STOCKOUT_PARTS, STOCKOUT_STOCK, 14,
+                                     memory_budget_mb=0.05, n_jobs=2, **options)
+    pd.testing.assert_frame_equal(chunked, result)
+    
+    # A part's paths depend only on the seed and its name
+    subset = simulate_stockout_risk(parts_data, STOCKOUT_PARTS[3:1:-1], STOCKOUT_STOCK[3:1:-1],
+                                    14, **options)
+    pd.testing.assert_frame_equal(subset, result.iloc[[3, 2]].reset_index(drop=True))
+    
+    # A longer window for one part lengthens the horizon without moving the others
+    longer = simulate_stockout_risk(parts_data, STOCKOUT_PARTS, STOCKOUT_STOCK,
+                                    [14, 60, 14, 14, 14, 14], **options)
+    pd.testing.assert_frame_equal(longer.iloc[[0, 2, 3, 4, 5]], result.iloc[[0, 2, 3, 4, 5]])
+    
+    reseeded = simulate_stockout_risk(parts_data, STOCKOUT_PARTS, STOCKOUT_STOCK, 14,
+                                      n_simulations=300, random_seed=2)
+    assert not reseeded['expected_demand'].iloc[:-1].equals(result['expected_demand'].iloc[:-1])
+
+
+def test_stockout_risk_matches_path_by_path_loop(parts_data, monkeypatch):
+    captured = []
+    simulate = insight_engine.simulate_demand_chunk
+    
+    def spy(chunk, window_size, n_simulations):
+        simulated = simulate(chunk, window_size, n_simulations)
+        captured.append(simulated)
+        return simulated
+    
+    monkeypatch.setattr(insight_engine, 'simulate_demand_chunk', spy)
+    
+    # Stock near each part's expected demand, so stockouts are uncertain
+    stocks = [8500, 9000, 42500, 9000, 6200]
+    for part_name, stock, threshold in zip(STOCKOUT_PARTS[:-1], stocks, [14, 7, 30, 0, 14]):
+        captured.clear()
+        result = simulate_stockout_risk(parts_data, [part_name], stock, threshold,
+                                        n_simulations=200, random_seed=3).iloc[0]
+        (paths, lead_time, _), = captured
+        
+        # Stock has to last through the reorder window or until replenishment
+        demands = []
+        for path, lead in zip(paths[0], lead_time[0]):
+            exposure = int(max(threshold, 1, lead))
+            demands.append(path[min(exposure, len(path)) - 1])
+        demands = np.array(demands)
+        shortfalls = np.maximum(demands - stock, 0)
+        
+        assert paths.shape[2] >= max(threshold, lead_time.max())
+        assert result['expected_demand'] == round(demands.mean(), 2)
+        assert result['demand_p95'] == round(np.quantile(demands, 0.95), 2)
+        assert result['mean_lead_time'] == round(lead_time.mean(), 2)
+        assert 0 < result['stockout_probability'] < 1
+        assert result['stockout_probability'] == pytest.approx((shortfalls > 0).mean())
+        assert result['expected_shortfall'] == round(shortfalls.mean(), 2)
+
+
+@pytest.mark.parametrize('forecast_horizon', [7, 30, 90])
+def test_what_if_grid_matches_generate_insights(parts_data, forecast_horizon):
+    stock_levels = np.arange(0, 50001, 2500)
+    thresholds = np.arange(1, 31, 3)
+    
+    for part_name in ['Battery Pack', 'Charging Port']:
+        forecast = generate_forecast(parts_data, part_name, 30, forecast_horizon)
+        scenarios = evaluate_what_if_scenarios(forecast, stock_levels, thresholds)
+        assert len(scenarios) == len(stock_levels) * len(thresholds)
+        
+        for row in scenarios.itertuples():
+            stock, threshold = int(row.current_stock), int(row.reorder_threshold_days)
+            insights = generate_insights(forecast, stock, threshold)
+            assert lookup_what_if_insights(scenarios, stock, threshold) == insights
+            assert row.status == insights['status']
+            metrics = insights['metrics']
+            assert round(row.recommended_order, 0) == metrics['recommended_order_quantity']
+            assert round(row.avg_daily_demand, 2) == metrics['avg_daily_demand']
+        
+        assert len(set(scenarios['status'])) > 1
+        assert lookup_what_if_insights(scenarios, 1234, 14) is None
+
+
+def test_what_if_grid_falls_back_to_history(parts_data):
+    forecast = generate_forecast(parts_data, 'Battery Pack')
+    history_only = forecast.assign(forecast=np.nan)
+    scenarios = evaluate_what_if_scenarios(history_only, [0, 5000, 20000], [1, 14, 30])
+    
+    for stock in [0, 5000, 20000]:
+        for threshold in [1, 14, 30]:
+            assert (lookup_what_if_insights(scenarios, stock, threshold)
+                    == generate_insights(history_only, stock, threshold))
+    
+    empty = evaluate_what_if_scenarios(pd.DataFrame(), [0, 5000], [14])
+    assert empty.empty
+    assert lookup_what_if_insights(empty, 0, 14) is None
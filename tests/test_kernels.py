@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.kernels import bootstrap_paths, project_forecast, rolling_cv, rolling_moments
+
+
+def reference_projection(level, trend_slope, forecast_horizon, seasonal_factors=None):
+    """The original per-day forecast loop of generate_forecast."""
+    values = []
+    for i in range(forecast_horizon):
+        if seasonal_factors is None:
+            seasonal_factor = 0.1 * np.sin(2 * np.pi * i / 365.25)
+        else:
+            seasonal_factor = seasonal_factors[i]
+        values.append(max((level + trend_slope * i) * (1 + seasonal_factor), 0))
+    return np.array(values)
+
+
+@pytest.mark.parametrize("level,trend_slope", [(500.0, 1.5), (20.0, -3.0), (0.0, 0.0)])
+def test_project_forecast_matches_daily_loop(level, trend_slope):
+    np.testing.assert_allclose(
+        project_forecast(level, trend_slope, 400),
+        reference_projection(level, trend_slope, 400)
+    )
+
+
+def test_project_forecast_grid_matches_per_part_loop():
+    levels = np.array([500.0, 20.0, 120.0])
+    slopes = np.array([1.5, -3.0, 0.2])
+    seasonal_factors = np.random.default_rng(0).normal(0, 0.2, (3, 45))
+    
+    grid = project_forecast(levels, slopes, 45, seasonal_factors)
+    
+    assert grid.shape == (3, 45)
+    for i in range(3):
+        np.testing.assert_allclose(
+            grid[i], reference_projection(levels[i], slopes[i], 45, seasonal_factors[i])
+        )
+
+
+def reference_bootstrap_path(point, pool, window_size, uniforms):
+    """One simulated path: resampled shocks fed back through the moving average."""
+    deviations = []
+    running = 0.0
+    for i, uniform in enumerate(uniforms):
+        shock = pool[int(uniform * len(pool))] if len(pool) else 0.0
+        deviation = running / window_size + shock
+        deviations.append(deviation)
+        running += deviation
+        if i >= window_size:
+            running -= deviations[i - window_size]
+    return np.maximum(point + np.array(deviations), 0)
+
+
+def test_bootstrap_paths_match_scalar_simulation():
+    rng = np.random.default_rng(0)
+    point = np.array([[50.0] * 12, [5.0] * 12, [80.0] * 12])
+    residuals = np.full((3, 40), np.nan)
+    residuals[0, 10:] = rng.normal(0, 10, 30)
+    residuals[1, 35:] = rng.normal(0, 8, 5)
+    
+    generators = [np.random.default_rng(seed) for seed in range(3)]
+    paths = bootstrap_paths(point, residuals, 4, 50, generators)
+    
+    assert paths.shape == (3, 50, 12)
+    for part in range(3):
+        uniforms = np.random.default_rng(part).random((12, 50))
+        pool = residuals[part][~np.isnan(residuals[part])]
+        for simulation in range(50):
+            np.testing.assert_allclose(
+                paths[part, simulation],
+                reference_bootstrap_path(point[part], pool, 4, uniforms[:, simulation])
+            )
+
+
+@pytest.fixture
+def padded_matrix():
+    """Right-aligned series of different lengths with NaN padding in front."""
+    rng = np.random.default_rng(2)
+    values = np.full((3, 200), np.nan)
+    values[0] = rng.normal(1000, 50, 200)
+    values[1, 150:] = rng.normal(20, 4, 50)
+    values[2, 197:] = [5.0, 5.0, 7.0]
+    return values
+
+
+@pytest.mark.parametrize("min_periods", [None, 1, 3])
+def test_rolling_moments_match_pandas(padded_matrix, min_periods):
+    moments = rolling_moments(padded_matrix, [3, 7, 30], min_periods=min_periods)
+    
+    for window, (mean, std) in moments.items():
+        for row, series in enumerate(padded_matrix):
+            observed = pd.Series(series[~np.isnan(series)])
+            rolling = observed.rolling(window, min_periods=min_periods)
+            start = len(series) - len(observed)
+            np.testing.assert_allclose(mean[row, start:], rolling.mean(), rtol=1e-9)
+            np.testing.assert_allclose(std[row, start:], rolling.std(), rtol=1e-7)
+            assert np.isnan(mean[row, :start]).all()
+
+
+def test_rolling_cv_matches_pandas(padded_matrix):
+    cv = rolling_cv(padded_matrix, [7, 14, 60])
+    
+    for window, values in cv.items():
+        for row, series in enumerate(padded_matrix):
+            observed = pd.Series(series[~np.isnan(series)])
+            expected = observed.rolling(window).std() / observed.rolling(window).mean()
+            np.testing.assert_allclose(values[row, -len(observed):], expected, rtol=1e-7)
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import modules.policy_optimizer as policy_optimizer
+from modules.policy_optimizer import optimize_reorder_policies
+
+
+POLICY_PARTS = ['Battery Pack', 'Electric Motor', 'Charging Port', 'Control Unit',
+                'Cooling System']
+
+
+def reference_policy(samples, exposure, holding, stockout, ordering, service_level,
+                     n_reorder_points=25, order_multipliers=np.geomspace(0.25, 4, 17)):
+    """Cheapest (s, Q) policy by evaluating every candidate pair one at a time."""
+    samples = np.sort(samples)
+    n_simulations = len(samples)
+    mean = samples.mean()
+    daily_demand = max(mean / exposure.mean(), 1e-9)
+    eoq = max(np.sqrt(2 * daily_demand * ordering / holding), 1)
+    
+    best = None
+    for level in np.linspace(service_level, max(0.999, service_level), n_reorder_points):
+        rank = min(max(int(np.ceil(level * n_simulations - 1e-9)) - 1, 0), n_simulations - 1)
+        reorder_point = samples[rank]
+        shortage = np.maximum(samples - reorder_point, 0).mean()
+        for multiplier in order_multipliers:
+            quantity = max(eoq * multiplier, 1)
+            cost = (ordering * daily_demand / quantity
+                    + holding * (quantity / 2 + reorder_point - mean + shortage)
+                    + stockout * shortage * daily_demand / quantity)
+            if best is None or cost < best['total_cost']:
+                best = {'total_cost': cost, 'reorder_point': reorder_point,
+                        'order_quantity': quantity, 'shortage': shortage,
+                        'service_level': (rank + 1) / n_simulations}
+    
+    best['eoq'] = eoq
+    best['avg_daily_demand'] = daily_demand
+    best['lead_time_demand'] = mean
+    return best
+
+
+@pytest.mark.parametrize('review_period', [0, 7])
+def test_policies_match_brute_force_grid(parts_data, monkeypatch, review_period):
+    captured = []
+    simulate = policy_optimizer.simulate_demand_chunk
+    
+    def spy(chunk, window_size, n_simulations):
+        simulated = simulate(chunk, window_size, n_simulations)
+        captured.append(simulated)
+        return simulated
+    
+    monkeypatch.setattr(policy_optimizer, 'simulate_demand_chunk', spy)
+    
+    costs = [(0.1, 10, 100, 0.9), (0.2, 5, 50, 0.95), (0.05, 50, 500, 0.5),
+             (1.0, 2, 20, 0.99), (0.5, 0, 0, 0.8)]
+    for part_name, (holding, stockout, ordering, service_level) in zip(POLICY_PARTS, costs):
+        captured.clear()
+        result = optimize_reorder_policies(
+            parts_data, [part_name], holding, stockout, ordering, service_level,
+            review_period=review_period, n_simulations=300, random_seed=0
+        ).iloc[0]
+        (paths, lead_time, _), = captured
+        
+        exposure = np.maximum(lead_time[0] + review_period, 1).astype(int)
+        samples = np.array([path[day - 1] for path, day in zip(paths[0], exposure)])
+        best = reference_policy(samples, exposure, holding, stockout, ordering, service_level)
+        
+        assert best['service_level'] >= service_level
+        assert result['service_level'] == round(best['service_level'], 2)
+        assert result['reorder_point'] == round(best['reorder_point'])
+        assert result['order_quantity'] == round(best['order_quantity'])
+        assert result['eoq'] == round(best['eoq'], 2)
+        assert result['avg_daily_demand'] == round(best['avg_daily_demand'], 2)
+        assert result['lead_time_demand'] == round(best['lead_time_demand'], 2)
+        assert result['total_cost'] == pytest.approx(best['total_cost'], abs=0.005)
+        
+        parts = result[['holding_cost', 'ordering_cost', 'stockout_cost']].sum()
+        assert parts == pytest.approx(result['total_cost'], abs=0.02)
+        fill_rate = np.clip(1 - best['shortage'] / best['order_quantity'], 0, 1)
+        assert result['fill_rate'] == round(fill_rate, 2)
+
+
+def test_policies_are_invariant_to_chunking_and_request(parts_data):
+    parts = POLICY_PARTS + ['Ghost']
+    options = {'n_simulations': 300, 'random_seed': 0}
+    result = optimize_reorder_policies(parts_data, parts, 0.05, 20, 500, **options)
+    
+    assert result['part_name'].tolist() == parts
+    assert result.iloc[-1].drop('part_name').isna().all()
+    
+    known = result.iloc[:-1]
+    assert known['fill_rate'].between(0, 1).all()
+    assert (known['order_up_to'] == known['reorder_point'] + known['order_quantity']).all()
+    assert (known['service_level'] >= 0.95).all()
+    
+    chunked = optimize_reorder_policies(parts_data, parts, 0.05, 20, 500,
+                                        memory_budget_mb=0.05, n_jobs=2, **options)
+    pd.testing.assert_frame_equal(chunked, result)
+    
+    subset = optimize_reorder_policies(parts_data, parts[3:1:-1], 0.05, 20, 500, **options)
+    pd.testing.assert_frame_equal(subset, result.iloc[[3, 2]].reset_index(drop=True))
+
+
+def test_policies_validate_inputs(parts_data):
+    with pytest.raises(ValueError, match='lead_time'):
+        optimize_reorder_policies(parts_data.drop(columns='lead_time'), POLICY_PARTS, 1, 1, 1)
+    with pytest.raises(ValueError, match='Holding costs'):
+        optimize_reorder_policies(parts_data, POLICY_PARTS, [1, 1, 0, 1, 1], 1, 1)
+    with pytest.raises(ValueError, match='must not be negative'):
+        optimize_reorder_policies(parts_data, POLICY_PARTS, 1, -1, 1)
+    with pytest.raises(ValueError, match='must not be negative'):
+        optimize_reorder_policies(parts_data, POLICY_PARTS, 1, 1, -1)
+    for service_level in [0, 1, 1.5]:
+        with pytest.raises(ValueError, match='Service levels'):
+            optimize_reorder_policies(parts_data, POLICY_PARTS, 1, 1, 1, service_level)